@@ -0,0 +1,99 @@
+"""
+bench_dealing.py
+
+Microbenchmark of per-trial dealing: the list-based path (random.sample into a
+new list and a new board per trial) against Dealer (an in-place partial
+Fisher-Yates over a buffer built once, writing into a reused board).
+
+    python -m benchmarks.bench_dealing [--trials N] [--villains N] [--board N]
+
+For each path it reports trials per second and the heap memory allocated per
+trial, measured with tracemalloc as the peak above the live size around every
+single deal.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from board_setup.board_setup import BoardSetup, Dealer
+from evaluator.hand import Card, cards_mask
+
+
+def _list_path(live, board, num_villains, rng):
+    # The per-trial dealing the engine used before Dealer: a fresh sample and
+    # a fresh board list every trial
+    num_villain_cards = 2 * num_villains
+    num_cards = num_villain_cards + 5 - len(board)
+
+    def deal():
+        dealt = rng.sample(live, num_cards)
+        return dealt[:num_villain_cards], board + dealt[num_villain_cards:]
+    return deal
+
+
+def _dealer_path(live, board, num_villains, rng):
+    dealer = Dealer(live)
+    known = len(board)
+    dealt = board + [0] * (2 * num_villains + 5 - known)
+    count = len(dealt) - known
+
+    def deal():
+        dealer.deal_into(dealt, known, count, rng)
+    return deal
+
+
+def trials_per_second(deal, trials: int) -> float:
+    start = time.perf_counter()
+    for _ in range(trials):
+        deal()
+    return trials / (time.perf_counter() - start)
+
+
+def bytes_per_trial(deal, trials: int):
+    """(mean, max) heap bytes allocated by one deal, freed or not."""
+    deal()  # warm up caches and free lists
+    tracemalloc.start()
+    total = 0
+    worst = 0
+    try:
+        for _ in range(trials):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            deal()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+            worst = max(worst, peak - before)
+    finally:
+        tracemalloc.stop()
+    return total / trials, worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-trial dealing cost: list rebuilds vs the reusable Dealer")
+    parser.add_argument("--trials", type=int, default=200000)
+    parser.add_argument("--villains", type=int, default=1)
+    parser.add_argument("--board", type=int, default=0, choices=[0, 3, 4, 5], help="known board cards")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    setup = BoardSetup()
+    hero = [Card.from_str("As").id, Card.from_str("Kd").id]
+    board = [Card.from_str(c).id for c in ["7h", "8h", "9c", "2s", "3d"][:args.board]]
+    live = setup.live_deck(cards_mask(hero + board))
+
+    paths = {
+        "list (rng.sample)": _list_path(live, board, args.villains, random.Random(args.seed)),
+        "Dealer (in place)": _dealer_path(live, board, args.villains, random.Random(args.seed)),
+    }
+    print(f"{args.villains} villain(s), {args.board} board cards, {args.trials} trials")
+    print(f"{'path':<20}{'trials/s':>12}{'bytes/trial':>14}{'max bytes':>12}")
+    for name, deal in paths.items():
+        rate = trials_per_second(deal, args.trials)
+        mean, worst = bytes_per_trial(deal, min(args.trials, 20000))
+        print(f"{name:<20}{rate:>12,.0f}{mean:>14.1f}{worst:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+regression.py
+
+Throughput and memory benchmarks for the evaluator and the equity engine, with
+a JSON baseline to catch regressions.
+
+    python -m benchmarks.regression                    # run and compare to the baseline
+    python -m benchmarks.regression --save             # run and record a new baseline
+    python -m benchmarks.regression --filter equity --threshold 0.3
+
+Every case times a fixed batch of work (hands, showdowns, deals or Monte Carlo
+trials over seeded random inputs) and keeps the best of several repeats, which
+is the least noisy estimate of what the code can do. Peak memory is measured in
+a separate tracemalloc run, so tracing does not slow the timed ones.
+
+Each call of a case is followed by a fixed pure-Python calibration loop, and
+every case records the median over its repeats of its speed relative to that
+loop. The baseline stores and compares these relative speeds, so a faster or
+busier machine shifts both sides alike. The run exits with status 1 when a case
+is slower, relative to the calibration loop, than the baseline by more than the
+threshold (20% by default).
+
+A baseline from another Python implementation or version, or one without
+relative speeds, is only a warning. Regenerate it with --save after a change
+that is meant to move the numbers, or when moving to another interpreter.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from board_setup.board_setup import BoardSetup
+from equity.equity_calc import EquityCalculator
+from evaluator.evaluator import _evaluate_5, best_hand, compare_hands
+from evaluator.hand import DECK, Hand
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+
+BATCH = 2000          # hands, showdowns or deals per timed call
+TRIALS = 4000         # Monte Carlo trials per equity query
+STREETS = {"preflop": 0, "flop": 3, "turn": 4}
+CALIBRATION_LOOPS = 20000  # iterations of the reference loop per call
+
+
+class Case(NamedTuple):
+    name: str
+    unit: str                       # "hands/s" or "trials/s"
+    ops: int                        # units of work per call of run
+    run: Callable[[], object]
+
+
+def _deals(rng: random.Random, count: int, num_cards: int) -> List[List]:
+    """count lists of num_cards distinct random Cards."""
+    return [rng.sample(DECK, num_cards) for _ in range(count)]
+
+
+def _evaluator_cases(rng: random.Random) -> List[Case]:
+    fives = _deals(rng, BATCH, 5)
+    sevens = [Hand(cards) for cards in _deals(rng, BATCH, 7)]
+
+    def evaluate_5():
+        for cards in fives:
+            _evaluate_5(cards)
+
+    def best():
+        for hand in sevens:
+            best_hand(hand)
+
+    cases = [Case("evaluate_5", "hands/s", BATCH, evaluate_5),
+             Case("best_hand", "hands/s", BATCH, best)]
+    for players in range(2, 10):
+        showdowns = []
+        for cards in _deals(rng, BATCH // players, 5 + 2 * players):
+            board = cards[:5]
+            showdowns.append([Hand(cards[5 + 2 * p:7 + 2 * p] + board) for p in range(players)])
+
+        def compare(showdowns=showdowns):
+            for hands in showdowns:
+                compare_hands(*hands)
+
+        cases.append(Case(f"compare_hands_{players}p", "hands/s", len(showdowns) * players, compare))
+    return cases
+
+
+def _dealing_cases(rng: random.Random) -> List[Case]:
+    setup = BoardSetup()
+    cases = []
+    for street, known in STREETS.items():
+        for players in (2, 6, 9):
+            spots = []
+            for cards in _deals(rng, 64, 2 + known):
+                spots.append((cards[:2], cards[2:]))
+
+            def deal(spots=spots, villains=players - 1):
+                for i in range(BATCH):
+                    hero, board = spots[i & 63]
+                    setup.setup_and_deal(hero, board, villains)
+
+            cases.append(Case(f"setup_and_deal_{street}_{players}p", "trials/s", BATCH, deal))
+    return cases
+
+
+def _equity_cases(rng: random.Random) -> List[Case]:
+    # Monte Carlo throughput: no preflop table lookups and no exact enumeration
+    calc = EquityCalculator(max_enumerations=0)
+    calc.preflop_table = None
+    cases = []
+    for street, known in STREETS.items():
+        for players in (2, 6, 9):
+            cards = [str(c) for c in rng.sample(DECK, 2 * players + known)]
+            hero = cards[:2]
+            villains = [cards[2 + 2 * v:4 + 2 * v] for v in range(players - 1)]
+            board = cards[2 * players:] or None
+
+            def equity(hero=hero, villains=villains, board=board):
+                calc.calculate_equity(hero, villains, board, num_simulations=TRIALS, exact=False, seed=1)
+
+            cases.append(Case(f"calculate_equity_{street}_{players}p", "trials/s", TRIALS, equity))
+    return cases
+
+
+def cases(seed: int = 2024) -> List[Case]:
+    """Every benchmark case, over inputs drawn from seed."""
+    rng = random.Random(seed)
+    return _evaluator_cases(rng) + _dealing_cases(rng) + _equity_cases(rng)
+
+
+def _calibrate():
+    """Interpreter-bound reference work: list indexing, integer ops and a loop."""
+    table = list(range(1024))
+    total = 0
+    for i in range(CALIBRATION_LOOPS):
+        total += table[(i * 7) & 1023] ^ i
+    return total
+
+
+def _time_calls(run: Callable[[], object], min_time: float) -> Tuple[float, float]:
+    """
+    Call run, each time followed by the calibration loop, until run has taken
+    at least min_time seconds.
+
+    Returns:
+        Seconds per call of run, and the calibration loop's time over run's
+    """
+    clock = time.perf_counter
+    elapsed = reference = 0.0
+    calls = 0
+    while elapsed < min_time or not calls:
+        start = clock()
+        run()
+        middle = clock()
+        _calibrate()
+        # Interleaved, so a change in machine load hits both timings alike
+        elapsed += middle - start
+        reference += clock() - middle
+        calls += 1
+    return elapsed / calls, reference / elapsed
+
+
+def measure(case: Case, repeats: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Time a case, alongside the calibration loop, and trace its memory.
+
+    Args:
+        case: Case to run
+        repeats: Timed repeats; the fastest counts
+        min_time: Each repeat calls case.run until at least this many seconds pass
+
+    Returns:
+        Dict with the case's unit, "rate" (units per second), "relative"
+        (median over the repeats of rate per calibration loop per second) and
+        "peak_kib" (peak memory traced during one call, in KiB)
+    """
+    case.run()  # warm up tables and caches
+    best = float("inf")
+    ratios = []
+    for _ in range(repeats):
+        elapsed, ratio = _time_calls(case.run, min_time)
+        best = min(best, elapsed)
+        ratios.append(ratio)
+
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    relative = case.ops / CALIBRATION_LOOPS * statistics.median(ratios)
+    return {"unit": case.unit, "rate": round(case.ops / best), "relative": float(f"{relative:.4g}"),
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def run(selected: List[Case], repeats: int = 5, min_time: float = 0.2, progress=None) -> dict:
+    """Measure every case and return the report (what --save writes as the baseline)."""
+    results = {}
+    for case in selected:
+        results[case.name] = measure(case, repeats, min_time)
+        if progress:
+            progress(case.name, results[case.name])
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def _speed(result: dict, base: dict) -> str:
+    # Relative speeds when both sides have them, raw rates for older reports
+    return "relative" if "relative" in result and "relative" in base else "rate"
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Cases whose throughput fell below (1 - threshold) times the baseline's,
+    compared relative to the calibration loop where both sides record it.
+
+    Cases missing from either side are not compared.
+
+    Returns:
+        One message per regression (empty if there are none)
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        speed = _speed(result, base)
+        ratio = result[speed] / base[speed]
+        if ratio < 1 - threshold:
+            regressions.append(f"{name}: {result['rate']:,.0f} {result['unit']}, "
+                               f"{1 - ratio:.0%} below the baseline's {base[speed]:,.4g} ({speed})")
+    return regressions
+
+
+def foreign(report: dict, baseline: dict) -> Optional[str]:
+    """
+    Why the baseline cannot be checked against this run, or None if it can.
+
+    Relative speeds still differ between interpreters, and a baseline without
+    them only holds another machine's absolute rates.
+    """
+    here = (report["implementation"], report["python"].rsplit(".", 1)[0])
+    there = (baseline.get("implementation"), str(baseline.get("python", "")).rsplit(".", 1)[0])
+    if here != there:
+        return f"baseline was recorded on {' '.join(map(str, there))}, this is {' '.join(here)}"
+    if any("relative" not in r for r in baseline.get("results", {}).values()):
+        return "baseline has no relative speeds"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluator and equity throughput benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON (default: %(default)s)")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a case is this fraction slower than the baseline (default: %(default)s)")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed repeat")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    base_results = baseline["results"] if baseline else {}
+
+    def progress(name, result):
+        line = f"{name:<34}{result['rate']:>14,.0f} {result['unit']:<9}{result['peak_kib']:>9.1f} KiB"
+        if name in base_results:
+            speed = _speed(result, base_results[name])
+            line += f"  {result[speed] / base_results[name][speed] - 1:+.1%}"
+        print(line, file=sys.stderr)
+
+    selected = [c for c in cases() if args.filter in c.name]
+    report = run(selected, args.repeats, args.min_time, progress)
+
+    for path in ([args.baseline] if args.save else []) + ([args.output] if args.output else []):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if baseline is None:
+        if not args.save:
+            print(f"No baseline at {args.baseline}; run with --save to record one", file=sys.stderr)
+        return 0
+
+    reason = foreign(report, baseline)
+    if reason:
+        print(f"WARNING {reason}; not checking for regressions. "
+              f"Record a baseline for this interpreter with --save", file=sys.stderr)
+        return 0
+    regressions = compare(report, baseline, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
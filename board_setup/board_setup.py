@@ -1,6 +1,98 @@
 import random
-from typing import List, Optional, Tuple
-from evaluator.hand import Card
+from bisect import bisect_right
+from math import comb
+from typing import Iterator, List, Optional, Tuple
+from evaluator.hand import CARD_MASKS, DECK, Card
+
+# Board-completion strategies for Monte Carlo (see BoardSetup.runouts)
+SAMPLING_STRATEGIES = ("random", "stratified", "without_replacement", "quasi")
+
+# Additive-recurrence step of the quasi-random sequence (golden ratio)
+_GOLDEN = (5 ** 0.5 - 1) / 2
+
+# BINOMIALS[i][c] = comb(c, i), for unranking runout indexes
+BINOMIALS = [[comb(c, i) for c in range(53)] for i in range(6)]
+
+def unrank_runout(index: int, live: List[int], num_cards: int) -> List[int]:
+    """
+    The index-th num_cards-subset of live in colexicographic order
+    (0 <= index < comb(len(live), num_cards)).
+    """
+    runout = []
+    top = len(live)
+    for i in range(num_cards, 0, -1):
+        # Largest c < top with comb(c, i) <= index
+        c = bisect_right(BINOMIALS[i], index, 0, top) - 1
+        runout.append(live[c])
+        index -= BINOMIALS[i][c]
+        top = c
+    return runout
+
+class Dealer:
+    def __init__(self, live: List[int]):
+        """
+        A live deck built once per query into a preallocated buffer, dealt from
+        with an in-place partial Fisher-Yates shuffle. Dealing a trial allocates
+        nothing: the buffer is only permuted, and the dealt cards are written
+        straight into the caller's lists.
+
+        Args:
+            live: Live card ids (from BoardSetup.live_deck)
+        """
+        self.cards = list(live)
+        self.size = len(live)
+        self._rng = None
+        self._random = None
+
+    def deal_into(self,
+                  out: list,
+                  start: int,
+                  num_cards: int,
+                  rng: random.Random = random,
+                  skip_mask: int = 0):
+        """
+        Write num_cards distinct random cards into out[start:start + num_cards].
+
+        The first positions of the buffer are swapped with random later ones,
+        one card at a time. Cards in skip_mask (e.g. ones given to villains this
+        trial) are passed over, which leaves the others uniformly distributed.
+
+        Raises:
+            ValueError: If fewer than num_cards cards are left outside skip_mask
+        """
+        # Looking up rng.random allocates a bound method, so keep the last one
+        if rng is not self._rng:
+            self._rng = rng
+            self._random = rng.random
+        random_ = self._random
+        cards = self.cards
+        size = self.size
+        if not skip_mask:
+            if num_cards > size:
+                raise ValueError("Not enough cards remaining to deal")
+            # A while loop: even a range() iterator would be a heap allocation
+            i = 0
+            while i < num_cards:
+                j = i + int(random_() * (size - i))
+                card = cards[j]
+                cards[j] = cards[i]
+                cards[i] = card
+                out[start + i] = card
+                i += 1
+            return
+        i = 0
+        placed = 0
+        while placed < num_cards:
+            if i == size:
+                raise ValueError("Not enough cards remaining to deal")
+            j = i + int(random_() * (size - i))
+            card = cards[j]
+            cards[j] = cards[i]
+            cards[i] = card
+            i += 1
+            if not CARD_MASKS[card] & skip_mask:
+                out[start + placed] = card
+                placed += 1
 
 class BoardSetup:
     def __init__(self):
@@ -8,65 +100,171 @@ class BoardSetup:
         Initialize the board setup.
         Creates a fresh deck of 52 cards using standard poker ranks and suits.
         """
-        self.deck = [Card(r, s) for r in '23456789TJQKA' for s in 'shdc']
+        self.deck = list(DECK)
+
+    def live_deck(self, dead_mask: int) -> List[int]:
+        """
+        Card ids still in the deck once the cards in dead_mask are removed.
 
-    def _handle_cards(self, 
-                     cards_to_remove: List[Card], 
+        Args:
+            dead_mask: 64-bit mask of known cards (see evaluator.hand)
+
+        Returns:
+            List of live card ids, in deck order
+        """
+        return [i for i in range(52) if not CARD_MASKS[i] & dead_mask]
+
+    def _handle_cards(self,
+                     cards_to_remove: List[Card],
                      num_to_deal: Optional[int] = None) -> List[Card]:
         """
         Handle card operations: removing cards and optionally dealing new ones.
-        
+
         Args:
             cards_to_remove: Cards to remove from the deck
             num_to_deal: Optional number of cards to deal from remaining deck
-            
+
         Returns:
             If num_to_deal is specified, returns dealt cards
             Otherwise, returns remaining deck after removal
         """
-        # Create set of removed card strings for efficient lookup
-        removed_cards = {(c.rank + c.suit) for c in cards_to_remove}
-        
-        # Filter available cards
-        available_cards = [
-            card for card in self.deck 
-            if (card.rank + card.suit) not in removed_cards
-        ]
-        
+        dead_mask = 0
+        for c in cards_to_remove:
+            dead_mask |= c.mask
+        available_cards = [self.deck[i] for i in self.live_deck(dead_mask)]
+
         if num_to_deal is not None:
             if num_to_deal > len(available_cards):
                 raise ValueError("Not enough cards remaining to deal")
             return random.sample(available_cards, num_to_deal)
         return available_cards
 
+    def deal_villains(self,
+                      villains: list,
+                      rng: random.Random = random) -> Tuple[Optional[List[int]], float, List[int]]:
+        """
+        Give every villain a holding for one trial. Fixed holdings are used as is;
+        ranges (equity.ranges.CompiledRange) are sampled around the cards already
+        given to earlier villains.
+        
+        Args:
+            villains: Per villain, either two card ids or a CompiledRange
+            rng: Random source
+            
+        Returns:
+            Tuple of (villain card ids, trial weight, card ids drawn from ranges).
+            Villain ids are None when some range has no holding left.
+        """
+        villain_ids = []
+        drawn = []
+        drawn_mask = 0
+        weight = 1.0
+        for villain in villains:
+            if isinstance(villain, list):
+                villain_ids.extend(villain)
+                continue
+            index, share = villain.sample(rng, drawn, drawn_mask)
+            if index is None:
+                return None, 0.0, drawn
+            combo = villain.combos[index]
+            villain_ids.extend(combo)
+            drawn.extend(combo)
+            drawn_mask |= villain.masks[index]
+            weight *= share
+        return villain_ids, weight, drawn
+
+    def runouts(self,
+                live: List[int],
+                num_cards: int,
+                num_trials: int,
+                strategy: str = "random",
+                rng: random.Random = random) -> Iterator[List[int]]:
+        """
+        Board completions for a run of trials. Every strategy deals each trial a
+        uniformly distributed completion, so estimates stay unbiased, but the
+        trials are spread over the runouts more evenly than independent draws:
+        
+        - "random": independent draws
+        - "stratified": stratified on the next card. Each block of len(live)
+          trials gives every live card the first slot once, in random order, and
+          draws the other cards at random
+        - "without_replacement": distinct runouts across the trials, cycling
+          through all of them when there are more trials than runouts
+        - "quasi": a randomly shifted golden-ratio (low-discrepancy) sequence
+          over the runouts in colexicographic order, which spreads the trials
+          evenly over the high cards of the runout
+        
+        Args:
+            live: Live card ids (from live_deck)
+            num_cards: Cards to deal per trial
+            num_trials: Number of trials
+            strategy: One of SAMPLING_STRATEGIES
+            rng: Random source
+            
+        Yields:
+            List of num_cards card ids per trial
+            
+        Raises:
+            ValueError: If the strategy is unknown
+        """
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {strategy}")
+        total = comb(len(live), num_cards)
+        if strategy == "random" or num_cards == 0:
+            for _ in range(num_trials):
+                yield rng.sample(live, num_cards)
+        elif strategy == "stratified":
+            size = len(live)
+            for i in range(num_trials):
+                if i % size == 0:
+                    strata = rng.sample(live, size)
+                first = strata[i % size]
+                # Over-draw one card and drop the stratum card if it came up
+                rest = rng.sample(live, num_cards)
+                if first in rest:
+                    rest.remove(first)
+                yield [first] + rest[:num_cards - 1]
+        elif strategy == "without_replacement":
+            done = 0
+            while done < num_trials:
+                n = min(total, num_trials - done)
+                for index in rng.sample(range(total), n):
+                    yield unrank_runout(index, live, num_cards)
+                done += n
+        else:
+            u = rng.random()
+            for _ in range(num_trials):
+                yield unrank_runout(int(u * total), live, num_cards)
+                u += _GOLDEN
+                if u >= 1.0:
+                    u -= 1.0
+
     def setup_and_deal(self,
                       hero_cards: List[Card],
                       board: List[Card],
                       num_villains: int) -> Tuple[List[Card], List[Card], List[Card]]:
         """
         Setup simulation and deal all necessary cards.
-        
+
         Args:
             hero_cards: Hero's hole cards
             board: Current board cards
             num_villains: Number of villains
-            
+
         Returns:
             Tuple of (villain_cards, final_board, remaining_cards)
         """
-        # Get available cards after removing known cards
-        available_cards = self._handle_cards(hero_cards + board)
-        
-        # Deal villain cards
-        villain_cards = []
-        for _ in range(num_villains):
-            villain_hand = self._handle_cards(hero_cards + board + villain_cards, 2)
-            villain_cards.extend(villain_hand)
-        
-        # Complete board if needed
-        remaining_cards = [c for c in available_cards if c not in villain_cards]
-        remaining_board = 5 - len(board)
-        final_board = (board + self._handle_cards(hero_cards + board + villain_cards, 
-                                                remaining_board)) if remaining_board > 0 else board
-        
-        return villain_cards, final_board, remaining_cards 
\ No newline at end of file
+        dead_mask = 0
+        for c in hero_cards + board:
+            dead_mask |= c.mask
+        dealer = Dealer(self.live_deck(dead_mask))
+        num_dealt = 2 * num_villains + 5 - len(board)
+        dealt = [0] * num_dealt
+        dealer.deal_into(dealt, 0, num_dealt)
+
+        # The dealt cards are now the first num_dealt of the buffer and the
+        # rest of the deck follows them (put back in deck order)
+        villain_cards = [self.deck[i] for i in dealt[:2 * num_villains]]
+        final_board = board + [self.deck[i] for i in dealt[2 * num_villains:]]
+        remaining_cards = [self.deck[i] for i in sorted(dealer.cards[num_dealt:])]
+        return villain_cards, final_board, remaining_cards
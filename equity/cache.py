@@ -0,0 +1,138 @@
+"""
+cache.py
+
+Two-tier cache of equity results, keyed by canonical situation (see canonical.py).
+
+- Memory tier: an LRU of the most recent entries.
+- Disk tier (optional): a sqlite database that survives restarts and can be
+  shared by several processes.
+
+Every entry keeps the precision it was computed with. An exact result answers
+any request; a Monte Carlo result answers requests that need no more trials
+(or, with target_stderr, no smaller standard error) than it has. A better
+entry for the same key replaces a worse one.
+"""
+
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Optional
+
+from equity.result import EquityResult
+
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def _better(new: EquityResult, old: EquityResult) -> bool:
+    if new.exact != old.exact:
+        return new.exact
+    return not new.exact and new.trials > old.trials
+
+
+def satisfies(result: EquityResult,
+              exact: bool,
+              num_simulations: int,
+              target_stderr: Optional[float]) -> bool:
+    """
+    Whether a cached result is precise enough for a request.
+
+    Args:
+        result: Cached result
+        exact: The request needs an exact answer
+        num_simulations: Trials the request would run
+        target_stderr: The request's target standard error, if adaptive
+    """
+    if result.exact:
+        return True
+    if exact:
+        return False
+    if target_stderr is not None:
+        return max(result.stderr) <= target_stderr
+    return result.trials >= num_simulations
+
+
+class EquityCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            path: sqlite file for the disk tier (memory only when omitted)
+            max_entries: Capacity of the in-memory LRU tier
+        """
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS equity ("
+                "key TEXT PRIMARY KEY, exact INTEGER, trials INTEGER, "
+                "equities TEXT, stderr TEXT)"
+            )
+            self.db.commit()
+
+    def _load(self, key: str) -> Optional[EquityResult]:
+        row = self.db.execute(
+            "SELECT exact, trials, equities, stderr FROM equity WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        exact, trials, equities, stderr = row
+        return EquityResult(json.loads(equities), json.loads(stderr), trials, bool(exact))
+
+    def _remember(self, key: str, result: EquityResult):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self,
+            key: str,
+            exact: bool = False,
+            num_simulations: int = 0,
+            target_stderr: Optional[float] = None) -> Optional[EquityResult]:
+        """
+        Look up a result precise enough for the request (see satisfies()).
+
+        Returns:
+            The cached EquityResult in canonical player order, or None
+        """
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory.move_to_end(key)
+        elif self.db is not None:
+            result = self._load(key)
+            if result is not None:
+                self._remember(key, result)
+        if result is not None and satisfies(result, exact, num_simulations, target_stderr):
+            self.hits += 1
+            return result
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: EquityResult):
+        """
+        Store a result (in canonical player order) unless a better one is cached.
+        """
+        current = self.memory.get(key)
+        if current is None and self.db is not None:
+            current = self._load(key)
+        if current is not None and not _better(result, current):
+            return
+        self._remember(key, result)
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO equity VALUES (?, ?, ?, ?, ?)",
+                (key, int(result.exact), result.trials,
+                 json.dumps(result.equities), json.dumps(result.stderr)),
+            )
+            self.db.commit()
+
+    def close(self):
+        """Close the disk tier."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,268 @@
+"""
+canonical.py
+
+Canonical forms of equity situations under suit isomorphism.
+
+Relabelling the four suits never changes anyone's equity, and neither does
+listing the villains in a different order. canonicalize() maps a situation
+(hero, villains, board) to a key shared by every relabelling and villain order,
+together with the villain order it settled on, so cached results can be
+translated back to the caller's order.
+
+Within one situation, most runouts differ only in suits that cannot matter:
+a suit in which nobody can reach five cards never makes a flush, so its cards
+only count by rank. runout_classes() groups the runouts that agree on every
+rank and on the cards of the flush-capable suits; each class ranks every
+player the same way and needs evaluating once, with its size as the weight.
+
+A situation can also be symmetric itself: swapping two suits that the known
+cards and ranges treat alike (hearts and diamonds against AsKs vs QhQd, or
+every suit for a full range preflop) maps it onto itself, and each runout onto
+one that every player ranks the same way. suit_symmetries() finds those
+permutations; runout_classes() merges the classes they relate, and
+runout_orbits() enumerates one runout per orbit with the orbit size as its
+weight.
+
+canonical_flops() lists one flop per suit-isomorphism class, with the class
+size, for work that runs over every flop (see distribution.cluster_flops).
+"""
+
+from hashlib import blake2b
+from itertools import combinations, permutations
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+SUIT_PERMUTATIONS = list(permutations(range(4)))
+
+# Card id map for every suit permutation (ids are rank * 4 + suit)
+CARD_MAPS = [[(c // 4) * 4 + perm[c % 4] for c in range(52)] for perm in SUIT_PERMUTATIONS]
+_CARD_BITS = [1 << c for c in range(52)]
+
+
+class CanonicalSituation(NamedTuple):
+    key: str                  # digest shared by all isomorphic situations
+    villain_order: List[int]  # original villain index at each canonical position
+
+
+def _pair(card_map, a, b):
+    a, b = card_map[a], card_map[b]
+    return (a, b) if a < b else (b, a)
+
+
+def _range_encoding(card_map, villain):
+    return tuple(sorted((_pair(card_map, a, b), w)
+                        for (a, b), w in zip(villain.combos, villain.weights)))
+
+
+def canonicalize(hero_ids: List[int], villains: list, board_ids: List[int]) -> CanonicalSituation:
+    """
+    Canonical key of a situation.
+
+    Args:
+        hero_ids: Hero's hole card ids
+        villains: Per villain, either two card ids or a CompiledRange
+        board_ids: Board card ids (order does not matter)
+
+    Returns:
+        CanonicalSituation with the key and the canonical villain order
+    """
+    fixed = [i for i, v in enumerate(villains) if isinstance(v, list)]
+    ranged = [i for i, v in enumerate(villains) if not isinstance(v, list)]
+
+    # Narrow the permutations down one component at a time (hero, board, exact
+    # hands, then ranges), keeping those that give the smallest encoding so far
+    def narrow(card_maps, encode):
+        encoded = [(encode(m), m) for m in card_maps]
+        smallest = min(e for e, _ in encoded)
+        return smallest, [m for e, m in encoded if e == smallest]
+
+    hero, card_maps = narrow(CARD_MAPS, lambda m: _pair(m, *hero_ids))
+    board, card_maps = narrow(card_maps, lambda m: tuple(sorted(m[c] for c in board_ids)))
+    holes, card_maps = narrow(card_maps, lambda m: tuple(sorted(_pair(m, *villains[i]) for i in fixed)))
+    best_prefix = (hero, board, holes)
+    candidates = [(m, sorted((_pair(m, *villains[i]), i) for i in fixed)) for m in card_maps]
+
+    best = None
+    for card_map, holes in candidates:
+        ranges = sorted((_range_encoding(card_map, villains[i]), i) for i in ranged)
+        encoding = tuple(r for r, _ in ranges)
+        if best is None or encoding < best[0]:
+            best = (encoding, [i for _, i in holes] + [i for _, i in ranges])
+
+    digest = blake2b(repr((best_prefix, best[0])).encode(), digest_size=16).hexdigest()
+    return CanonicalSituation(digest, best[1])
+
+
+def to_canonical_order(values: Sequence, villain_order: List[int]) -> list:
+    """Reorder per-player values (hero first) from caller order to canonical order."""
+    return [values[0]] + [values[1 + i] for i in villain_order]
+
+
+def from_canonical_order(values: Sequence, villain_order: List[int]) -> list:
+    """Reorder per-player values (hero first) from canonical order back to caller order."""
+    result = list(values)
+    for position, i in enumerate(villain_order):
+        result[1 + i] = values[1 + position]
+    return result
+
+
+def flush_suits(holes: Sequence[int], board_ids: Sequence[int], num_cards: int) -> int:
+    """
+    Suits in which some player could still make a flush.
+
+    Args:
+        holes: Hole card ids of all players, two per player, concatenated
+        board_ids: Known board card ids
+        num_cards: Board cards still to come
+
+    Returns:
+        Bit mask with bit s set for every such suit s
+    """
+    counts = [0] * 4
+    for c in board_ids:
+        counts[c & 3] += 1
+    suits = 0
+    for i in range(0, len(holes), 2):
+        for suit in range(4):
+            held = (holes[i] & 3 == suit) + (holes[i + 1] & 3 == suit)
+            if counts[suit] + num_cards + held >= 5:
+                suits |= 1 << suit
+    return suits
+
+
+def suit_symmetries(holes: Sequence[int],
+                    board_ids: Sequence[int],
+                    ranges: Sequence = (),
+                    card_maps: Sequence[List[int]] = CARD_MAPS) -> List[List[int]]:
+    """
+    Suit permutations that map a situation onto itself.
+
+    Args:
+        holes: Hole card ids of the players with exact hands, two per player,
+               concatenated; each hand must map onto itself
+        board_ids: Known board card ids; the board must map onto itself
+        ranges: CompiledRanges (or HandRanges) that must map onto themselves,
+                weights included
+        card_maps: Permutations to choose from (CARD_MAPS by default), e.g. the
+                symmetries of a situation to narrow down further
+
+    Returns:
+        The card maps among card_maps that qualify, in order (the identity is
+        the first of CARD_MAPS)
+    """
+    hands = [_pair(CARD_MAPS[0], holes[i], holes[i + 1]) for i in range(0, len(holes), 2)]
+    board = sorted(board_ids)
+    symmetries = []
+    for card_map in card_maps:
+        if [_pair(card_map, a, b) for a, b in hands] != hands:
+            continue
+        if sorted(card_map[c] for c in board) != board:
+            continue
+        if card_map != CARD_MAPS[0] and not all(_maps_onto(card_map, r) for r in ranges):
+            continue
+        symmetries.append(card_map)
+    return symmetries
+
+
+def _maps_onto(card_map, villain) -> bool:
+    weights = villain.pair_weights if hasattr(villain, "pair_weights") else villain.combos
+    return all(weights.get(_pair(card_map, a, b)) == w for (a, b), w in weights.items())
+
+
+def runout_orbits(live: Sequence[int], num_cards: int,
+                  card_maps: Sequence[List[int]]) -> Iterator[Tuple[Tuple[int, ...], int]]:
+    """
+    One runout per orbit of a situation's suit symmetries.
+
+    Args:
+        live: Live card ids (mapped onto themselves by every card map)
+        num_cards: Cards per runout
+        card_maps: The situation's symmetries, identity first (see suit_symmetries)
+
+    Yields:
+        (runout, orbit size) pairs; the runout is the member of its orbit with
+        the smallest card-id bitmask, and the sizes add up to the number of runouts
+    """
+    group = len(card_maps)
+    if group == 1:
+        for runout in combinations(live, num_cards):
+            yield runout, 1
+        return
+    # Compare runouts as card-id bitmasks: one C-level sum per card map
+    bit = _CARD_BITS.__getitem__
+    images = [[1 << m[c] for c in range(52)].__getitem__ for m in card_maps[1:]]
+    for runout in combinations(live, num_cards):
+        mask = sum(map(bit, runout))
+        fixed = 1
+        for image in images:
+            mapped = sum(map(image, runout))
+            if mapped < mask:
+                break
+            fixed += mapped == mask
+        else:
+            yield runout, group // fixed
+
+
+def runout_classes(live: Sequence[int], num_cards: int, suits: int,
+                   card_maps: Optional[Sequence[List[int]]] = None) -> List[List[Tuple[int, ...]]]:
+    """
+    Group every num_cards-card runout from live into classes that are equal up
+    to the suits outside `suits`.
+
+    Cards of a suit outside `suits` stand for their rank only; cards of a suit
+    in `suits` keep their identity. With suits from flush_suits(), every runout
+    in a class gives every player the same hand rank. With card_maps, the
+    symmetries of the situation (see suit_symmetries), classes that one of them
+    maps onto another are merged as well.
+
+    Args:
+        live: Live card ids
+        num_cards: Cards per runout
+        suits: Bit mask of the flush-capable suits
+        card_maps: Optional suit symmetries of the situation
+
+    Returns:
+        List of classes, each a list of runouts (tuples of card ids)
+    """
+    # A card's class: itself in a flush-capable suit, otherwise just its rank
+    label = [c if suits >> (c & 3) & 1 else -1 - (c >> 2) for c in range(52)]
+    classes = {}
+    for runout in combinations(live, num_cards):
+        if num_cards == 2:
+            a, b = label[runout[0]], label[runout[1]]
+            key = (a, b) if a <= b else (b, a)
+        else:
+            key = tuple(sorted(label[c] for c in runout))
+        members = classes.get(key)
+        if members is None:
+            classes[key] = [runout]
+        else:
+            members.append(runout)
+    if card_maps is None or len(card_maps) < 2:
+        return list(classes.values())
+
+    # The symmetries keep the flush-capable suits among themselves, so a class
+    # maps onto a class; rank labels (negative) stay as they are
+    orbits = {}
+    for key, members in classes.items():
+        smallest = min(tuple(sorted(m[c] if c >= 0 else c for c in key)) for m in card_maps)
+        orbit = orbits.get(smallest)
+        if orbit is None:
+            orbits[smallest] = members
+        else:
+            orbit.extend(members)
+    return list(orbits.values())
+
+
+def canonical_flops() -> List[Tuple[Tuple[int, ...], int]]:
+    """
+    One flop per suit-isomorphism class (1,755 of the 22,100 flops).
+
+    Returns:
+        (flop, number of flops in its class) pairs; each flop is the class's
+        smallest relabelling, as a sorted tuple of card ids
+    """
+    counts = {}
+    for flop in combinations(range(52), 3):
+        key = min(tuple(sorted(m[c] for c in flop)) for m in CARD_MAPS)
+        counts[key] = counts.get(key, 0) + 1
+    return sorted(counts.items())
@@ -0,0 +1,293 @@
+"""
+distribution.py
+
+Hand-strength distributions: how often each player ends up with each
+HAND_RANKS category, and how their share of the pot is spread, rather than
+just the mean equity.
+
+- Histograms: fixed-size arrays per player, filled by the trial loop (or the
+  enumeration, or the numpy backend) from the ranks and pot shares it has
+  already worked out, so collecting them costs a few additions per player per
+  trial. Ask for them with estimate_equity(..., buckets=10); they are merged
+  across chunks like a Tally.
+- Distribution: one player's normalized histograms (result.distributions).
+- flop_features() / cluster_flops(): the bulk mode, on NumPy. For every flop,
+  sampled turn-and-river runouts are dealt and every holding is ranked on each
+  of them at once; a holding's equity on a runout is its share against a
+  random other holding (card removal between the two holdings is ignored). The
+  histogram of those equities, and of the categories made, describes the flop.
+  Flops are then grouped by k-means on the cumulative equity histograms (for
+  1-D histograms, distances between cumulative ones track the earth mover's
+  distance) together with the category histograms.
+
+Equity buckets split [0, 1] into equal parts; a pot share of exactly 1 falls in
+the last one. With exact hands a trial's share is 0, 1/k or 1; with ranges, or
+against a range in range_equity grids, the buckets fill in between.
+"""
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from evaluator.evaluator import HAND_RANKS, rank_tables
+from evaluator.tables import CARD_KEYS, SUIT_BITS, SUIT_MASK
+from equity.canonical import canonical_flops
+
+DEFAULT_BUCKETS = 10
+
+# Holdings that avoid a complete board: two of the other 47 cards
+PER_RUNOUT = 1081
+
+
+def bucket(share: float, buckets: int) -> int:
+    """Equity bucket of a pot share (or equity) between 0 and 1."""
+    index = int(share * buckets)
+    return index if index < buckets else buckets - 1
+
+
+@dataclass
+class Distribution:
+    categories: List[float]   # probability of ending with each HAND_RANKS category
+    equity: List[float]       # probability of each pot-share bucket
+
+    def by_category(self) -> Dict[str, float]:
+        """Category probabilities by HAND_RANKS name."""
+        return dict(zip(HAND_RANKS, self.categories))
+
+
+class Histograms:
+    def __init__(self, num_players: int, buckets: int = DEFAULT_BUCKETS):
+        """Empty weighted histograms for num_players players."""
+        self.buckets = buckets
+        self.categories = [[0.0] * len(HAND_RANKS) for _ in range(num_players)]
+        self.equity = [[0.0] * buckets for _ in range(num_players)]
+        self.weight = 0.0
+        self._categories = rank_tables().categories
+        # Bucket of each winner's share, by the number of tied winners
+        self._split_buckets = [0] + [bucket(1.0 / ties, buckets) for ties in range(1, num_players + 1)]
+
+    def add_trial(self, ranks: Sequence[int], weight: float,
+                  shares: Optional[Sequence[Tuple[int, float]]] = None):
+        """
+        Add one showdown.
+
+        Args:
+            ranks: Hand rank of every player
+            weight: Weight of the trial
+            shares: (player, pot share) for every winner, as SidePots.split
+                    settled them; None when the best hands split one pot
+        """
+        categories = self.categories
+        equity = self.equity
+        category_of = self._categories
+        if shares is None:
+            best = max(ranks)
+            top = self._split_buckets[ranks.count(best)]
+            p = 0
+            for rank in ranks:
+                categories[p][category_of[rank]] += weight
+                equity[p][top if rank == best else 0] += weight
+                p += 1
+        else:
+            won = dict(shares)
+            for p, rank in enumerate(ranks):
+                categories[p][category_of[rank]] += weight
+                equity[p][bucket(won.get(p, 0.0), self.buckets)] += weight
+        self.weight += weight
+
+    def add_batch(self, ranks: "np.ndarray", shares: "np.ndarray", weights: Optional["np.ndarray"] = None):
+        """Add a batch of showdowns: (players, N) ranks and pot shares, and optional (N,) weights."""
+        categories = np.asarray(self._categories)
+        for p in range(len(self.categories)):
+            counts = np.bincount(categories[ranks[p]], weights=weights, minlength=len(HAND_RANKS))
+            spread = np.bincount(np.minimum((shares[p] * self.buckets).astype(np.intp), self.buckets - 1),
+                                 weights=weights, minlength=self.buckets)
+            self.categories[p] = [a + b for a, b in zip(self.categories[p], counts.tolist())]
+            self.equity[p] = [a + b for a, b in zip(self.equity[p], spread.tolist())]
+        self.weight += float(weights.sum()) if weights is not None else ranks.shape[1]
+
+    def merge(self, other: "Histograms") -> "Histograms":
+        """Add another set of histograms into these (in place) and return self."""
+        for mine, theirs in zip(self.categories + self.equity, other.categories + other.equity):
+            for i, value in enumerate(theirs):
+                mine[i] += value
+        self.weight += other.weight
+        return self
+
+    def distributions(self) -> List[Distribution]:
+        """Normalized histograms of every player."""
+        total = self.weight or 1.0
+        return [Distribution([c / total for c in categories], [e / total for e in equity])
+                for categories, equity in zip(self.categories, self.equity)]
+
+
+@dataclass
+class FlopClusters:
+    flops: List[Tuple[int, ...]]   # card ids of each flop
+    weights: List[int]             # flops each one stands for (suit isomorphs)
+    features: "np.ndarray"         # (flops, buckets + categories) feature rows
+    labels: "np.ndarray"           # cluster of each flop
+    centers: "np.ndarray"          # (k, features) weighted cluster means
+
+    def members(self, cluster: int) -> List[Tuple[int, ...]]:
+        """Flops in one cluster."""
+        return [f for f, label in zip(self.flops, self.labels.tolist()) if label == cluster]
+
+
+def flop_features(flops: Sequence[Sequence[int]],
+                  buckets: int = DEFAULT_BUCKETS,
+                  runouts: int = 32,
+                  seed: Optional[int] = None,
+                  block: int = 64) -> "np.ndarray":
+    """
+    Hand-strength features of flops.
+
+    For each flop, `runouts` distinct turn-and-river pairs are drawn and every
+    holding that avoids the board is ranked on each. The features are the
+    cumulative histogram of the holdings' equities against a random holding,
+    followed by the histogram of the categories they make.
+
+    Args:
+        flops: Flops as three card ids each
+        buckets: Equity buckets
+        runouts: Runouts sampled per flop (at most 1,176)
+        seed: Seed for the runout draws
+        block: Flops processed together
+
+    Returns:
+        (len(flops), buckets + len(HAND_RANKS)) array
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    if np is None:
+        raise ImportError("Flop features require NumPy (pip install numpy)")
+    tables = rank_tables()
+    rank_table = np.frombuffer(tables.rank_table, dtype=np.uint16)
+    flush_table = np.frombuffer(tables.flush_table, dtype=np.uint16)
+    flush_suit = np.array(tables.flush_suit, dtype=np.int8)
+    categories = np.asarray(tables.categories, dtype=np.intp)
+    card_keys = np.array(CARD_KEYS, dtype=np.int64)
+    rank_bits = np.array([1 << (c >> 2) for c in range(52)], dtype=np.int64)
+
+    holdings = np.array(list(combinations(range(52), 2)))
+    hole_keys = card_keys[holdings].sum(axis=1)
+    pairs = np.array(list(combinations(range(49), 2)))
+    runouts = min(runouts, len(pairs))
+    rng = np.random.default_rng(seed)
+    features = np.empty((len(flops), buckets + len(HAND_RANKS)))
+
+    for start in range(0, len(flops), block):
+        chunk = np.array(flops[start:start + block], dtype=np.intp)
+        # Each flop's 49 live cards, and runouts drawn from them without replacement
+        dead = np.zeros((len(chunk), 52), dtype=bool)
+        dead[np.arange(len(chunk))[:, None], chunk] = True
+        live = np.nonzero(~dead)[1].reshape(len(chunk), 49)
+        chosen = np.argsort(rng.random((len(chunk), len(pairs))), axis=1)[:, :runouts]
+        turn_river = np.take_along_axis(live, pairs[chosen.reshape(-1)].reshape(len(chunk), runouts * 2), axis=1)
+        boards = np.concatenate([np.repeat(chunk, runouts, axis=0), turn_river.reshape(-1, 2)], axis=1)
+
+        # Every (runout, holding) pair whose holding avoids the board
+        on_board = np.zeros((len(boards), 52), dtype=bool)
+        on_board[np.arange(len(boards))[:, None], boards] = True
+        rows, cols = np.nonzero(~(on_board[:, holdings[:, 0]] | on_board[:, holdings[:, 1]]))
+        key = card_keys[boards].sum(axis=1)[rows] + hole_keys[cols]
+        ranks = rank_table[key >> SUIT_BITS].astype(np.int64)
+        suit = flush_suit[key & SUIT_MASK]
+        flush = np.flatnonzero(suit >= 0)
+        if len(flush):
+            # Rank bits of the flush suit's cards among the board and the holding
+            cards = np.concatenate([boards[rows[flush]], holdings[cols[flush]]], axis=1)
+            lane = np.where(cards & 3 == suit[flush, None], rank_bits[cards], 0).sum(axis=1)
+            ranks[flush] = flush_table[lane]
+
+        # Equity against a random holding on the same runout: the holdings
+        # below, and half of the others at the same rank. Sorted by runout then
+        # rank, each runout's PER_RUNOUT holdings sit together, and a rank's
+        # position and run length give both counts.
+        ordered = np.sort(rows * 8192 + ranks)
+        first = np.empty(len(ordered), dtype=bool)
+        first[0] = True
+        np.not_equal(ordered[1:], ordered[:-1], out=first[1:])
+        starts = np.flatnonzero(first)
+        level = np.cumsum(first) - 1
+        lengths = np.diff(np.append(starts, len(ordered)))[level]
+        below = starts[level] % PER_RUNOUT
+        equity = (below + (lengths - 1) / 2) / (PER_RUNOUT - 1)
+        ranks = ordered & 8191
+
+        flop_index = (ordered >> 13) // runouts
+        per_flop = runouts * PER_RUNOUT
+        spread = np.bincount(flop_index * buckets + np.minimum((equity * buckets).astype(np.intp), buckets - 1),
+                             minlength=len(chunk) * buckets).reshape(len(chunk), buckets)
+        made = np.bincount(flop_index * len(HAND_RANKS) + categories[ranks],
+                           minlength=len(chunk) * len(HAND_RANKS)).reshape(len(chunk), len(HAND_RANKS))
+        features[start:start + len(chunk), :buckets] = np.cumsum(spread, axis=1) / per_flop
+        features[start:start + len(chunk), buckets:] = made / per_flop
+    return features
+
+
+def cluster_flops(k: int = 8,
+                  flops: Optional[Sequence[Sequence[int]]] = None,
+                  buckets: int = DEFAULT_BUCKETS,
+                  runouts: int = 32,
+                  iterations: int = 50,
+                  seed: Optional[int] = None) -> FlopClusters:
+    """
+    Group flops by their hand-strength features (see flop_features) with
+    weighted k-means.
+
+    Args:
+        k: Number of clusters
+        flops: Flops as three card ids each (one per suit-isomorphism class,
+               weighted by class size, when omitted)
+        buckets: Equity buckets of the features
+        runouts: Runouts sampled per flop
+        iterations: Cap on k-means iterations
+        seed: Seed for the runout draws and the initial centers
+
+    Returns:
+        FlopClusters
+
+    Raises:
+        ValueError: If there are fewer flops than clusters
+        ImportError: If NumPy is not installed
+    """
+    if flops is None:
+        classes = canonical_flops()
+        flops = [flop for flop, _ in classes]
+        weights = [count for _, count in classes]
+    else:
+        flops = [tuple(sorted(flop)) for flop in flops]
+        weights = [1] * len(flops)
+    if len(flops) < k:
+        raise ValueError(f"Cannot make {k} clusters of {len(flops)} flops")
+    features = flop_features(flops, buckets, runouts, seed)
+    w = np.array(weights, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding, then Lloyd iterations until the labels settle
+    centers = [features[rng.choice(len(flops), p=w / w.sum())]]
+    for _ in range(1, k):
+        distance = ((features[:, None, :] - np.array(centers)[None]) ** 2).sum(axis=2).min(axis=1)
+        odds = w * distance
+        centers.append(features[rng.choice(len(flops), p=odds / odds.sum())
+                                if odds.sum() > 0 else rng.integers(len(flops))])
+    centers = np.array(centers)
+    labels = None
+    for _ in range(iterations):
+        distance = ((features[:, None, :] - centers[None]) ** 2).sum(axis=2)
+        new_labels = distance.argmin(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = labels == c
+            if members.any():
+                centers[c] = np.average(features[members], axis=0, weights=w[members])
+    return FlopClusters(list(flops), weights, features, labels, centers)
@@ -1,72 +1,532 @@
+import hashlib
 import random
-from typing import List, Optional, Tuple, Dict
-from collections import Counter
-from evaluator.hand import Card, Hand
-from evaluator.evaluator import hand_strength, compare_hands
-from board_setup.board_setup import BoardSetup
+import secrets
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+from typing import Callable, List, Optional, Tuple, Dict, Union
+from evaluator.hand import CARD_MASKS, Card, parse_cards
+from evaluator.evaluator import rank_showdown
+from board_setup.board_setup import SAMPLING_STRATEGIES, BoardSetup, Dealer
+from equity.cache import EquityCache
+from equity.distribution import Histograms
+from equity.grid import EquityGrid, GridTally, enumerate_grid, simulate_grid
+from equity.canonical import (canonicalize, flush_suits, from_canonical_order, runout_classes,
+                              runout_orbits, suit_symmetries, to_canonical_order)
+from equity.pots import SidePots
+from equity.preflop import PreflopTable
+from equity.ranges import HandRange, to_range
+from equity.result import EquityResult, Tally
+from equity.stats import DEFAULT_SAMPLE_EVERY, EquityStats, TrialTimings
+from equity.simulator import VectorSimulator
+
+# Largest number of board completions enumerated exactly by default. A heads-up
+# flop has 990 runouts; a heads-up preflop spot has 1,712,304.
+DEFAULT_MAX_ENUMERATIONS = 20000
+
+# Trial cap for adaptive (target_stderr) simulation
+DEFAULT_MAX_SIMULATIONS = 1000000
+
+BACKENDS = ("python", "numpy")
+
+# Trials per seeded chunk. Fixed per backend so that results never depend on
+# how the chunks are spread over workers.
+CHUNK_SIZES = {"python": 2048, "numpy": 1 << 16}
+
+def chunk_seed(seed: int, index: int) -> int:
+    """Independent 64-bit seed for chunk `index` of a run seeded with `seed`."""
+    digest = hashlib.blake2b(f"{seed}:{index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def _is_cards(value) -> bool:
+    # A sequence of card strings (a string itself is not one)
+    return (isinstance(value, Sequence) and not isinstance(value, str)
+            and all(isinstance(c, str) for c in value))
+
+def _check_request(request):
+    """
+    Check the shape of one calculate_equity_many request before parsing it.
+    
+    Raises:
+        ValueError: If it is not (hero_cards, villain_ranges[, board]) with card
+            strings, range strings or HandRanges where each belongs
+    """
+    if not isinstance(request, Sequence) or isinstance(request, str) or len(request) not in (2, 3):
+        raise ValueError("Each request is (hero_cards, villain_ranges[, board])")
+    if not _is_cards(request[0]):
+        raise ValueError("Hero cards must be a sequence of card strings")
+    villains = request[1]
+    if (not isinstance(villains, Sequence) or isinstance(villains, str)
+            or not all(isinstance(v, (str, HandRange)) or _is_cards(v) for v in villains)):
+        raise ValueError("Each villain must be card strings, a range string or a HandRange")
+    if len(request) == 3 and request[2] is not None and not _is_cards(request[2]):
+        raise ValueError("Board must be a sequence of card strings")
+
+# One calculator per backend in each worker process
+_WORKER_CALCULATORS = {}
+
+def _run_chunk(task) -> Tally:
+    backend, *args = task
+    calc = _WORKER_CALCULATORS.get(backend)
+    if calc is None:
+        calc = _WORKER_CALCULATORS[backend] = EquityCalculator(backend=backend)
+    return calc._simulate_chunk(*args)
 
 class EquityCalculator:
-    def __init__(self):
+    def __init__(self,
+                 max_enumerations: int = DEFAULT_MAX_ENUMERATIONS,
+                 backend: str = "python",
+                 cache: Optional[EquityCache] = None,
+                 preflop_table: Optional[PreflopTable] = None,
+                 instrument: bool = False,
+                 on_stats: Optional[Callable[[EquityStats], None]] = None):
         """
         Initialize the equity calculator.
+        
+        Args:
+            max_enumerations: Runout budget below which equity is enumerated exactly
+            backend: Monte Carlo engine, "python" (trial loop) or "numpy"
+                     (batched, see equity/simulator.py)
+            cache: Optional EquityCache for results of repeated (or suit-isomorphic)
+                   situations. Cached simulations are reused whatever seed is asked for.
+            preflop_table: Exact heads-up preflop table (see equity/preflop.py); the
+                   table at the default location is used if it has been built
+            instrument: Count trials, evaluations and cache hits and time each phase
+                   of every query (see equity/stats.py). Results then carry an
+                   EquityStats, and self.stats sums them over all queries.
+            on_stats: Optional callback receiving each query's EquityStats (implies
+                   instrument)
+            
+        Raises:
+            ValueError: If the backend is unknown
+            ImportError: If the numpy backend is requested without NumPy installed
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
         self.board_setup = BoardSetup()
+        self.max_enumerations = max_enumerations
+        self.backend = backend
+        self.simulator = VectorSimulator() if backend == "numpy" else None
+        self.cache = cache
+        self.preflop_table = preflop_table if preflop_table is not None else PreflopTable.load_default()
+        self._pool = None
+        self._pool_workers = 0
+        self.instrument = instrument or on_stats is not None
+        self.on_stats = on_stats
+        self.sample_every = DEFAULT_SAMPLE_EVERY
+        self.stats = EquityStats() if self.instrument else None
 
     def _evaluate_hands_and_winners(self,
-                                  hero_cards: List[Card],
-                                  villain_cards: List[Card],
-                                  board: List[Card]) -> Dict[int, float]:
+                                  hero_cards: List[int],
+                                  villain_cards: List[int],
+                                  board: List[int],
+                                  pots: Optional[SidePots] = None,
+                                  histograms: Optional[Histograms] = None,
+                                  weight: float = 1.0) -> Dict[int, float]:
         """
         Evaluate all hands and determine winners with pot shares.
         
         Args:
-            hero_cards: Hero's hole cards
-            villain_cards: List of all villain cards
-            board: Complete board
+            hero_cards: Hero's hole card ids
+            villain_cards: List of all villain card ids
+            board: Complete board card ids
+            pots: Side pots to settle instead of one pot shared by all players
+            histograms: Optional Histograms to add the showdown to, with weight
             
         Returns:
             Dictionary mapping player indices to their pot shares
         """
-        # Create and evaluate all hands
-        all_hands = []
-        hero_hand = Hand(hero_cards + board)
-        all_hands.append(hero_hand)
-        
-        # Create villain hands
-        for i in range(0, len(villain_cards), 2):
-            villain_hand = Hand(villain_cards[i:i+2] + board)
-            all_hands.append(villain_hand)
-            
-        # Get hand strengths
-        hand_scores = [hand_strength(h) for h in all_hands]
+        # Sum the board once; each player then only adds two hole cards
+        hand_scores = rank_showdown(board, hero_cards + villain_cards)
             
-        # Find winners
+        # Find winners (usually just one)
         max_score = max(hand_scores)
+        if hand_scores.count(max_score) == 1:
+            winner = hand_scores.index(max_score)
+            if pots is None or pots.covers[winner]:
+                if histograms is not None:
+                    histograms.add_trial(hand_scores, weight)
+                return {winner: 1.0}
+        if pots is not None:
+            won = pots.split(hand_scores)
+            if histograms is not None:
+                histograms.add_trial(hand_scores, weight, won)
+            return dict(won)
+        if histograms is not None:
+            histograms.add_trial(hand_scores, weight)
         winners = [i for i, score in enumerate(hand_scores) if score == max_score]
         
         # Calculate pot shares (equal split among winners)
         pot_share = 1.0 / len(winners)
         return {winner: pot_share for winner in winners}
 
-    def calculate_equity(self, 
-                        hero_cards: List[str],
-                        villain_ranges: List[List[str]],
-                        board: Optional[List[str]] = None,
-                        num_simulations: int = 10000) -> List[float]:
+    def _simulate_chunk(self,
+                        hero_ids: List[int],
+                        villains: list,
+                        board_ids: List[int],
+                        live: List[int],
+                        num_simulations: int,
+                        seed: int,
+                        sampling: str = "random",
+                        sample_every: int = 0,
+                        pots: Optional[SidePots] = None,
+                        buckets: int = 0) -> Tally:
         """
-        Calculate equity using Monte Carlo simulation.
+        Monte Carlo: sample villain holdings and board completions with a private
+        RNG and tally weighted pot shares.
         
         Args:
-            hero_cards: List of two cards for the hero (e.g., ["As", "Kh"])
-            villain_ranges: List of possible hand ranges for villains
-            board: Current board cards (None for preflop)
-            num_simulations: Number of Monte Carlo simulations to run
+            villains: Per villain, either two card ids or a CompiledRange
+            sampling: Board-completion strategy (see BoardSetup.runouts)
+            sample_every: If non-zero, time the phases of every sample_every-th
+                   trial into tally.timings
+            pots: Side pots to settle instead of one pot shared by all players
+            buckets: If non-zero, fill tally.histograms with every player's hand
+                   categories and pot shares in this many equity buckets
         
         Returns:
-            List of equity percentages for each player
+            Tally over num_simulations trials
+        """
+        if self.simulator is not None:
+            return self.simulator.simulate([hero_ids] + villains, board_ids, live,
+                                           num_simulations, rng=self.simulator.make_rng(seed), pots=pots,
+                                           buckets=buckets)
+        
+        rng = random.Random(seed)
+        players = len(villains) + 1
+        tally = Tally(players)
+        shares, shares_w, shares_sq = tally.shares, tally.shares_w, tally.shares_sq
+        runouts = None
+        if sampling != "random":
+            runouts = self.board_setup.runouts(live, 5 - len(board_ids), num_simulations, sampling, rng)
+        timings = None
+        if sample_every:
+            timings = tally.timings = TrialTimings(sample_every)
+            clock = time.perf_counter
+        histograms = None
+        if buckets:
+            histograms = tally.histograms = Histograms(players, buckets)
+
+        # Buffers reused by every trial: the live deck to deal from, the board
+        # (known cards, then the runout), every player's hole cards and ranks
+        dealer = Dealer(live)
+        known = len(board_ids)
+        to_come = 5 - known
+        final_board = board_ids + [0] * to_come
+        holes = hero_ids + [0] * (2 * len(villains))
+        ranks = [0] * players
+        fixed = all(isinstance(v, list) for v in villains)
+        if fixed:
+            holes[2:] = [c for v in villains for c in v]
+        covers = pots.covers if pots is not None else None
+
+        for trial in range(num_simulations):
+            timed = timings is not None and not trial % sample_every
+            if timed:
+                started = clock()
+            runout = next(runouts) if runouts is not None else None
+            # Give villains their holdings, then complete the board around them
+            weight = 1.0
+            drawn_mask = 0
+            if not fixed:
+                villain_ids, weight, drawn = self.board_setup.deal_villains(villains, rng)
+                if villain_ids is None:
+                    if timings is not None:
+                        timings.skipped += 1
+                    continue
+                holes[2:] = villain_ids
+                for c in drawn:
+                    drawn_mask |= CARD_MASKS[c]
+            if runout is None:
+                dealer.deal_into(final_board, known, to_come, rng, drawn_mask)
+            elif drawn_mask and any(CARD_MASKS[c] & drawn_mask for c in runout):
+                # The runout was chosen before the ranges were dealt; one that
+                # clashes gets zero weight (every other one the same weight)
+                if timings is not None:
+                    timings.skipped += 1
+                continue
+            else:
+                final_board[known:] = runout
+            if timed:
+                dealt = clock()
+
+            # Evaluate hands and update pot shares (usually a single winner)
+            rank_showdown(final_board, holes, ranks)
+            if timed:
+                evaluated = clock()
+            best = max(ranks)
+            ties = ranks.count(best)
+            player = ranks.index(best)
+            won = None      # side pots as settled, when they were
+            if ties == 1 and (covers is None or covers[player]):
+                shares[player] += weight
+                shares_w[player] += weight * weight
+                shares_sq[player] += weight * weight
+            elif pots is None:
+                weighted = weight / ties
+                for player in range(players):
+                    if ranks[player] == best:
+                        shares[player] += weighted
+                        shares_w[player] += weighted * weight
+                        shares_sq[player] += weighted * weighted
+            else:
+                # Side pots, all settled from the same ranks
+                won = pots.split(ranks, player if ties == 1 else -1)
+                for player, share in won:
+                    weighted = share * weight
+                    shares[player] += weighted
+                    shares_w[player] += weighted * weight
+                    shares_sq[player] += weighted * weighted
+            if histograms is not None:
+                histograms.add_trial(ranks, weight, won)
+            tally.weight += weight
+            tally.weight_sq += weight * weight
+            if timed:
+                timings.samples += 1
+                timings.deal += dealt - started
+                timings.evaluate += evaluated - dealt
+                timings.aggregate += clock() - evaluated
+        tally.trials = num_simulations
+        return tally
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_workers != workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+            self._pool_workers = workers
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _simulate(self,
+                  hero_ids: List[int],
+                  villains: list,
+                  board_ids: List[int],
+                  live: List[int],
+                  num_simulations: int,
+                  seed: Optional[int] = None,
+                  workers: int = 1,
+                  target_stderr: Optional[float] = None,
+                  prior: Optional[Tally] = None,
+                  deadline: Optional[float] = None,
+                  sampling: str = "random",
+                  sample_every: int = 0,
+                  pots: Optional[SidePots] = None,
+                  buckets: int = 0) -> Tally:
+        """
+        Monte Carlo: split the trials into fixed-size chunks, each with its own
+        RNG stream derived from seed, and merge the chunk tallies in chunk order.
+        Chunking does not depend on workers, so a seed gives identical results
+        for any worker count.
+        
+        With target_stderr, the merged tally is checked after every chunk and the
+        run stops as soon as every player's standard error is at most the target
+        (num_simulations is then the cap). With a deadline, the run also stops at
+        the first chunk boundary past it, after at least one chunk.
+        
+        Args:
+            prior: Tally of earlier trials of the same situation to merge the new
+                   chunks into (it is updated in place)
+            deadline: time.monotonic() value to stop by
+            sampling: Board-completion strategy (see BoardSetup.runouts)
+            sample_every: Trial-loop timing interval (see _simulate_chunk)
+            pots: Side pots (see _simulate_chunk)
+            buckets: Hand-strength histogram buckets (see _simulate_chunk)
+        
+        Returns:
+            Tally over all merged chunks
+        """
+        tasks = self._chunk_tasks(hero_ids, villains, board_ids, live, num_simulations, seed,
+                                  sampling, sample_every, pots, buckets)
+        # Without a target or deadline every chunk is needed; with one, run a round
+        # of chunks per worker at a time so little work is wasted past the stopping point
+        adaptive = target_stderr is not None or deadline is not None
+        round_size = max(workers, 1) if adaptive else len(tasks)
+        
+        tally = Tally(len(villains) + 1) if prior is None else prior
+        for start in range(0, len(tasks), round_size):
+            batch = tasks[start:start + round_size]
+            if workers > 1 and len(batch) > 1:
+                results = self._get_pool(workers).map(_run_chunk, batch)
+            else:
+                results = (self._simulate_chunk(*task[1:]) for task in batch)
+            for chunk in results:
+                tally.merge(chunk)
+                if (target_stderr is not None and tally.weight > 0
+                        and max(tally.stderr()) <= target_stderr):
+                    return tally
+                if deadline is not None and time.monotonic() >= deadline:
+                    return tally
+        return tally
+
+    def _chunk_tasks(self,
+                     hero_ids: List[int],
+                     villains: list,
+                     board_ids: List[int],
+                     live: List[int],
+                     num_simulations: int,
+                     seed: Optional[int] = None,
+                     sampling: str = "random",
+                     sample_every: int = 0,
+                     pots: Optional[SidePots] = None,
+                     buckets: int = 0) -> list:
+        """The fixed-size chunks of a simulation, as _run_chunk tasks in chunk order."""
+        if seed is None:
+            seed = secrets.randbits(64)
+        chunk_size = CHUNK_SIZES[self.backend]
+        return [
+            (self.backend, hero_ids, villains, board_ids, live,
+             min(chunk_size, num_simulations - start), chunk_seed(seed, index),
+             sampling, sample_every, pots, buckets)
+            for index, start in enumerate(range(0, num_simulations, chunk_size))
+        ]
+
+    def _villain_assignments(self, villains: list, index: int = 0, dealt_mask: int = 0):
+        """
+        Yield every compatible combination of villain holdings.
+        
+        Yields:
+            Tuples of (villain card ids, weight, mask of the cards drawn from ranges)
+        """
+        if index == len(villains):
+            yield [], 1.0, dealt_mask
+            return
+        villain = villains[index]
+        if isinstance(villain, list):
+            choices = [(villain, 1.0, 0)]
+        else:
+            choices = [(list(c), w, m) for c, w, m in zip(villain.combos, villain.weights, villain.masks)
+                       if not m & dealt_mask]
+        for ids, weight, mask in choices:
+            for rest, rest_weight, rest_mask in self._villain_assignments(
+                    villains, index + 1, dealt_mask | mask):
+                yield ids + rest, weight * rest_weight, rest_mask
+
+    def _count_runouts(self, villains: list, board_ids: List[int], live: List[int]) -> int:
+        """Number of (villain holdings, board completion) pairs to enumerate, or an upper bound."""
+        count = 1
+        num_drawn = 0
+        for villain in villains:
+            if not isinstance(villain, list):
+                count *= len(villain)
+                num_drawn += 2
+        return count * comb(len(live) - num_drawn, 5 - len(board_ids))
+
+    def _enumerate(self,
+                   hero_ids: List[int],
+                   villains: list,
+                   board_ids: List[int],
+                   live: List[int],
+                   pots: Optional[SidePots] = None,
+                   buckets: int = 0) -> Tally:
+        """
+        Exact: visit every combination of villain holdings and every completion
+        of the board once. With two cards or fewer to come, runouts that differ
+        only in suits nobody can make a flush in are evaluated once per class
+        (see runout_classes). Runouts that a suit symmetry of the dealt hands
+        and board relates (see suit_symmetries) are evaluated once as well.
+        
+        Args:
+            pots: Side pots to settle instead of one pot shared by all players
+            buckets: Hand-strength histogram buckets (see _simulate_chunk)
+        
+        Returns:
+            Tally with one trial per enumerated runout
+        """
+        tally = Tally(len(villains) + 1)
+        if buckets:
+            tally.histograms = Histograms(len(villains) + 1, buckets)
+        river = len(board_ids) == 5
+        # Suit permutations that fix hero, the exact villains and the board; with
+        # ranges, each assignment keeps those that also fix its holdings
+        symmetries = None
+        if not river:
+            symmetries = suit_symmetries(hero_ids + [c for v in villains if isinstance(v, list) for c in v],
+                                         board_ids)
+        ranged = not all(isinstance(v, list) for v in villains)
+        for villain_ids, weight, drawn_mask in self._villain_assignments(villains):
+            remaining = [] if river else [c for c in live if not CARD_MASKS[c] & drawn_mask]
+            card_maps = symmetries
+            if ranged and len(symmetries or ()) > 1:
+                card_maps = suit_symmetries(villain_ids, (), card_maps=symmetries)
+            for runout, count in self._runouts(hero_ids + villain_ids, board_ids, remaining, card_maps):
+                class_weight = weight * count
+                pot_shares = self._evaluate_hands_and_winners(
+                    hero_ids, villain_ids, board_ids + list(runout), pots,
+                    tally.histograms, class_weight
+                )
+                for player, share in pot_shares.items():
+                    tally.shares[player] += share * class_weight
+                tally.weight += class_weight
+                tally.trials += count
+        return tally
+
+    def _runout_classes(self,
+                        holes: List[int],
+                        board_ids: List[int],
+                        remaining: List[int],
+                        card_maps: Optional[List[List[int]]] = None):
+        """
+        Runouts to enumerate, grouped into classes that rank every player alike.
+        
+        Args:
+            card_maps: Suit symmetries of the dealt hands and board (see
+                   canonical.suit_symmetries); classes they relate are merged
+        """
+        num_cards = 5 - len(board_ids)
+        if not num_cards:
+            return [[()]]
+        if num_cards > 2:
+            # Flush suits are rarely ruled out this early; grouping would not pay
+            return ([runout] for runout in combinations(remaining, num_cards))
+        return runout_classes(remaining, num_cards, flush_suits(holes, board_ids, num_cards), card_maps)
+
+    def _runouts(self,
+                 holes: List[int],
+                 board_ids: List[int],
+                 remaining: List[int],
+                 card_maps: Optional[List[List[int]]] = None):
+        """
+        Runouts to enumerate as (runout, count) pairs: one runout per class (see
+        _runout_classes), or per orbit of the suit symmetries with three or more
+        cards to come, and the number of runouts it stands for.
+        """
+        if 5 - len(board_ids) > 2 and card_maps is not None and len(card_maps) > 1:
+            return runout_orbits(remaining, 5 - len(board_ids), card_maps)
+        return ((members[0], len(members))
+                for members in self._runout_classes(holes, board_ids, remaining, card_maps))
+
+    def _prepare(self,
+                 hero_cards: List[str],
+                 villain_ranges: List[Union[List[str], str, HandRange]],
+                 board: Optional[List[str]],
+                 parsed_ranges: Optional[Dict[str, HandRange]] = None
+                 ) -> Tuple[List[int], list, List[int], int]:
+        """
+        Parse and validate a request once, at the API boundary.
+        
+        Args:
+            parsed_ranges: Range strings already parsed, by text; new ones are
+                   added to it (calculate_equity_many shares one across a batch)
+        
+        Returns:
+            Tuple of (hero card ids, villains, board card ids, mask of known cards),
+            where each villain is either two card ids or a CompiledRange
             
         Raises:
-            ValueError: If inputs are invalid (duplicate cards, invalid format, wrong board length)
+            ValueError: If inputs are invalid
         """
         # Validate input lengths
         if len(hero_cards) != 2:
@@ -74,42 +534,428 @@ class EquityCalculator:
         if board and len(board) not in [3, 4, 5]:
             raise ValueError("Board must have 3 (flop), 4 (turn), or 5 (river) cards")
             
-        # Convert inputs to Card objects and validate format
+        # Convert inputs to card ids and validate format
         try:
-            hero_cards = [Card.from_str(c) for c in hero_cards]
-            board = [Card.from_str(c) for c in board] if board else []
-            villain_cards = []
-            for villain_range in villain_ranges:
-                if len(villain_range) != 2:
+            hero_ids = parse_cards(hero_cards)
+            board_ids = parse_cards(board) if board else []
+            villain_specs = []
+            for v in villain_ranges:
+                if isinstance(v, str) and parsed_ranges is not None:
+                    spec = parsed_ranges.get(v)
+                    if spec is None:
+                        spec = parsed_ranges[v] = HandRange.parse(v)
+                elif isinstance(v, (str, HandRange)):
+                    spec = to_range(v)
+                elif len(v) != 2:
                     raise ValueError("Each villain must have exactly 2 cards")
-                villain_cards.extend([Card.from_str(c) for c in villain_range])
-        except (AssertionError, ValueError) as e:
+                else:
+                    spec = parse_cards(v)
+                villain_specs.append(spec)
+        except ValueError as e:
             raise ValueError(f"Invalid card format: {str(e)}")
             
         # Check for duplicate cards
-        all_cards = hero_cards + board + villain_cards
-        card_strs = [(c.rank + c.suit) for c in all_cards]
-        if len(set(card_strs)) != len(card_strs):
+        all_ids = hero_ids + board_ids + [c for v in villain_specs if isinstance(v, list) for c in v]
+        dead_mask = 0
+        for c in all_ids:
+            dead_mask |= CARD_MASKS[c]
+        if bin(dead_mask).count('1') != len(all_ids):
             raise ValueError("Duplicate cards detected")
             
-        num_players = len(villain_ranges) + 1
+        # Ranges lose every combo that clashes with a known card
+        villains = []
+        for spec in villain_specs:
+            if isinstance(spec, list):
+                villains.append(spec)
+            else:
+                compiled = spec.compile(dead_mask)
+                if not len(compiled):
+                    raise ValueError("Villain range has no holdings left after card removal")
+                villains.append(compiled)
+        return hero_ids, villains, board_ids, dead_mask
+
+    def _preflop_lookup(self,
+                        hero_ids: List[int],
+                        villains: list,
+                        board_ids: List[int]) -> Optional[EquityResult]:
+        """Exact result from the preflop table for heads-up preflop between exact hands."""
+        if self.preflop_table is None or board_ids or len(villains) != 1 \
+                or not isinstance(villains[0], list):
+            return None
+        counts = self.preflop_table.lookup(hero_ids, villains[0])
+        if counts is None:
+            return None
+        wins, ties, boards = counts
+        hero_equity = (wins + ties / 2) / boards * 100
+        return EquityResult([hero_equity, 100 - hero_equity], [0.0, 0.0], boards, True)
+
+    def calculate_equity(self, 
+                        hero_cards: List[str],
+                        villain_ranges: List[Union[List[str], str, HandRange]],
+                        board: Optional[List[str]] = None,
+                        num_simulations: int = 10000,
+                        **options) -> List[float]:
+        """
+        Calculate equity by exact enumeration of the remaining board cards, or by
+        Monte Carlo simulation when there are too many runouts to enumerate.
         
-        # Initialize results
-        wins = [0.0] * num_players
+        Args:
+            hero_cards: List of two cards for the hero (e.g., ["As", "Kh"])
+            villain_ranges: Per villain, either an exact hand (e.g., ["Qs", "Qd"]),
+                            a range string (e.g., "QQ+, AKs, 76s-54s:0.5") or a HandRange
+            board: Current board cards (None for preflop)
+            num_simulations: Number of Monte Carlo simulations to run
+            **options: Any other keyword argument of estimate_equity
         
-        # Run simulations
-        for _ in range(num_simulations):
-            # Setup and deal all cards
-            villain_cards, final_board, _ = self.board_setup.setup_and_deal(
-                hero_cards, board, len(villain_ranges)
-            )
+        Returns:
+            List of equity percentages for each player
             
-            # Evaluate hands and update win counts
-            pot_shares = self._evaluate_hands_and_winners(
-                hero_cards, villain_cards, final_board
-            )
-            for player, share in pot_shares.items():
-                wins[player] += share
+        Raises:
+            ValueError: If inputs are invalid (duplicate cards, invalid format, wrong board
+                        length, malformed or empty ranges)
+        """
+        return self.estimate_equity(hero_cards, villain_ranges, board,
+                                    num_simulations, **options).equities
+
+    def estimate_equity(self,
+                        hero_cards: List[str],
+                        villain_ranges: List[Union[List[str], str, HandRange]],
+                        board: Optional[List[str]] = None,
+                        num_simulations: int = 10000,
+                        exact: Optional[bool] = None,
+                        max_enumerations: Optional[int] = None,
+                        seed: Optional[int] = None,
+                        workers: int = 1,
+                        target_stderr: Optional[float] = None,
+                        max_simulations: int = DEFAULT_MAX_SIMULATIONS,
+                        deadline: Optional[float] = None,
+                        sampling: str = "random",
+                        contributions: Optional[List[float]] = None,
+                        buckets: int = 0) -> EquityResult:
+        """
+        Like calculate_equity, but also report the precision of the answer.
+        
+        Args:
+            hero_cards: List of two cards for the hero (e.g., ["As", "Kh"])
+            villain_ranges: Per villain, either an exact hand (e.g., ["Qs", "Qd"]),
+                            a range string (e.g., "QQ+, AKs, 76s-54s:0.5") or a HandRange
+            board: Current board cards (None for preflop)
+            num_simulations: Number of Monte Carlo simulations to run
+            exact: True to always enumerate, False to always simulate, None (default)
+                   to enumerate whenever the runout count fits max_enumerations
+            max_enumerations: Runout budget for exact=None (defaults to
+                   self.max_enumerations)
+            seed: Seed for reproducible simulation (random when omitted)
+            workers: Number of processes to spread the simulation over
+            target_stderr: Stop simulating once every player's standard error is at
+                   most this many percentage points (e.g. 0.1); num_simulations is
+                   then ignored in favour of max_simulations
+            max_simulations: Cap on trials when target_stderr is set
+            deadline: time.monotonic() value by which a simulation should finish; it
+                   stops at the next chunk boundary and returns fewer trials (and a
+                   larger standard error). Enumeration is not interrupted.
+            sampling: How simulated boards are completed (python backend only):
+                   "random" (independent draws), or a variance-reducing strategy:
+                   "stratified", "without_replacement" or "quasi" (see
+                   BoardSetup.runouts). The reported stderr assumes independent
+                   draws, so it overstates the error of these strategies.
+            contributions: Chips each player put in, hero first, for a multiway
+                   all-in with side pots (see equity/pots.py). Equities are then
+                   percentages of the total pot, and result.chips holds each
+                   player's expected chips.
+            buckets: Also collect every player's hand-strength distribution - the
+                   HAND_RANKS categories made and pot shares in this many equity
+                   buckets (see equity/distribution.py) - into result.distributions.
+                   The preflop table and the result cache are bypassed.
+        
+        Returns:
+            EquityResult with equities, standard errors and the trial count
+            
+        Raises:
+            ValueError: If inputs are invalid (duplicate cards, invalid format, wrong board
+                        length, malformed or empty ranges)
+        """
+        if sampling not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {sampling}")
+        if sampling != "random" and self.backend != "python":
+            raise ValueError("Variance-reduced sampling needs the python backend")
+        stats = EquityStats(queries=1) if self.instrument else None
+        if stats is not None:
+            lap = time.perf_counter()
+        hero_ids, villains, board_ids, dead_mask = self._prepare(hero_cards, villain_ranges, board)
+        live = self.board_setup.live_deck(dead_mask)
+        pots = None
+        if contributions is not None:
+            if len(contributions) != len(villains) + 1:
+                raise ValueError("Need one contribution per player")
+            pots = SidePots(contributions)
+        if stats is not None:
+            lap = stats.lap("parse", lap)
+        
+        # Heads-up preflop between exact hands: look the answer up
+        if exact is not False and pots is None and not buckets:
+            result = self._preflop_lookup(hero_ids, villains, board_ids)
+            if result is not None:
+                if stats is not None:
+                    stats.table_hits += 1
+                    stats.lap("lookup", lap)
+                return self._finish(result, stats)
+        
+        if exact is None:
+            budget = self.max_enumerations if max_enumerations is None else max_enumerations
+            exact = self._count_runouts(villains, board_ids, live) <= budget
+        
+        if target_stderr is not None:
+            num_simulations = max_simulations
+        
+        # Serve isomorphic repeats from the cache when it is precise enough
+        situation = None
+        if self.cache is not None and not buckets:
+            situation = canonicalize(hero_ids, villains, board_ids)
+            key = situation.key
+            if pots is not None:
+                key += f":{to_canonical_order(pots.contributions, situation.villain_order)}"
+            cached = self.cache.get(key, exact, num_simulations, target_stderr)
+            if stats is not None:
+                stats.cache_hits += cached is not None
+                stats.cache_misses += cached is None
+            if cached is not None:
+                order = situation.villain_order
+                result = EquityResult(from_canonical_order(cached.equities, order),
+                                      from_canonical_order(cached.stderr, order),
+                                      cached.trials, cached.exact)
+                if stats is not None:
+                    stats.lap("lookup", lap)
+                return self._finish(result, stats, pots)
+        if stats is not None:
+            lap = stats.lap("lookup", lap)
+        
+        if exact:
+            tally = self._enumerate(hero_ids, villains, board_ids, live, pots, buckets)
+        else:
+            tally = self._simulate(hero_ids, villains, board_ids, live,
+                                   num_simulations, seed, workers, target_stderr,
+                                   deadline=deadline, sampling=sampling,
+                                   sample_every=self.sample_every if stats is not None else 0,
+                                   pots=pots, buckets=buckets)
+        if stats is not None:
+            lap = stats.lap("enumerate" if exact else "simulate", lap)
+            stats.trials = tally.trials
+            skipped = tally.timings.skipped if tally.timings is not None else 0
+            stats.evaluations = (tally.trials - skipped) * len(tally.shares)
+            if tally.timings is not None:
+                stats.add_timings(tally.timings, tally.trials)
+        if tally.weight == 0:
+            raise ValueError("Villain ranges leave no possible holdings")
         
         # Calculate final equities
-        return [win / num_simulations * 100 for win in wins]
+        stderr = [0.0] * len(tally.shares) if exact else tally.stderr()
+        result = EquityResult(tally.equities(), stderr, tally.trials, bool(exact))
+        if tally.histograms is not None:
+            result.distributions = tally.histograms.distributions()
+        if situation is not None:
+            order = situation.villain_order
+            self.cache.put(key, EquityResult(to_canonical_order(result.equities, order),
+                                             to_canonical_order(result.stderr, order),
+                                             result.trials, result.exact))
+            if stats is not None:
+                stats.lap("store", lap)
+        return self._finish(result, stats, pots)
+
+    def calculate_equity_many(self,
+                              requests: List[tuple],
+                              num_simulations: int = 10000,
+                              exact: Optional[bool] = None,
+                              max_enumerations: Optional[int] = None,
+                              seed: Optional[int] = None,
+                              workers: int = 1) -> List[Union[EquityResult, ValueError]]:
+        """
+        Answer a batch of requests together.
+        
+        Every request is parsed and validated first, with the range strings
+        that recur across the batch parsed once; a request that fails, malformed
+        ones included, gets a ValueError in place of a result rather than
+        stopping the batch. The
+        preflop table and the cache answer what they can and exact requests are
+        enumerated, then the chunks of every simulated request go to the worker
+        pool in one pass, so a batch of small requests keeps all workers busy.
+        With a seed, each request gets the result estimate_equity gives it with
+        that seed, whatever the batch.
+        
+        Args:
+            requests: Per request, (hero_cards, villain_ranges) or (hero_cards,
+                      villain_ranges, board), as for calculate_equity
+            num_simulations: Number of Monte Carlo simulations per simulated request
+            exact: True to always enumerate, False to always simulate, None (default)
+                   to enumerate whenever the runout count fits max_enumerations
+            max_enumerations: Runout budget for exact=None (defaults to
+                   self.max_enumerations)
+            seed: Seed for reproducible simulation (random when omitted)
+            workers: Number of processes to spread the simulations over
+        
+        Returns:
+            Per request, in order, an EquityResult or the ValueError that rejected it
+        """
+        budget = self.max_enumerations if max_enumerations is None else max_enumerations
+        parsed_ranges: Dict[str, HandRange] = {}
+        results: List[Union[EquityResult, ValueError, None]] = [None] * len(requests)
+        simulated = []      # (request index, players, chunk count, cache key, villain order)
+        tasks = []
+        for index, request in enumerate(requests):
+            try:
+                _check_request(request)
+                board = request[2] if len(request) == 3 else None
+                hero_ids, villains, board_ids, dead_mask = self._prepare(
+                    request[0], request[1], board, parsed_ranges)
+            except ValueError as e:
+                results[index] = e
+                continue
+            except TypeError as e:
+                # Anything the shape check let through still fails alone
+                results[index] = ValueError(f"Invalid request: {e}")
+                continue
+            
+            if exact is not False:
+                result = self._preflop_lookup(hero_ids, villains, board_ids)
+                if result is not None:
+                    results[index] = result
+                    continue
+            live = self.board_setup.live_deck(dead_mask)
+            enumerate_it = exact
+            if enumerate_it is None:
+                enumerate_it = self._count_runouts(villains, board_ids, live) <= budget
+            
+            key = order = None
+            if self.cache is not None:
+                situation = canonicalize(hero_ids, villains, board_ids)
+                key, order = situation.key, situation.villain_order
+                cached = self.cache.get(key, enumerate_it, num_simulations, None)
+                if cached is not None:
+                    results[index] = EquityResult(from_canonical_order(cached.equities, order),
+                                                  from_canonical_order(cached.stderr, order),
+                                                  cached.trials, cached.exact)
+                    continue
+            
+            if enumerate_it:
+                tally = self._enumerate(hero_ids, villains, board_ids, live)
+                results[index] = self._batch_result(tally, True, key, order)
+            else:
+                chunks = self._chunk_tasks(hero_ids, villains, board_ids, live, num_simulations, seed)
+                simulated.append((index, len(villains) + 1, len(chunks), key, order))
+                tasks.extend(chunks)
+        
+        if workers > 1 and len(tasks) > 1:
+            chunks = iter(self._get_pool(workers).map(_run_chunk, tasks))
+        else:
+            chunks = (self._simulate_chunk(*task[1:]) for task in tasks)
+        for index, players, num_chunks, key, order in simulated:
+            tally = Tally(players)
+            for _ in range(num_chunks):
+                tally.merge(next(chunks))
+            results[index] = self._batch_result(tally, False, key, order)
+        return results
+
+    def _batch_result(self,
+                      tally: Tally,
+                      exact: bool,
+                      key: Optional[str],
+                      order: Optional[list]) -> Union[EquityResult, ValueError]:
+        """A batched request's result from its tally, stored in the cache under key."""
+        if tally.weight == 0:
+            return ValueError("Villain ranges leave no possible holdings")
+        stderr = [0.0] * len(tally.shares) if exact else tally.stderr()
+        result = EquityResult(tally.equities(), stderr, tally.trials, exact)
+        if key is not None:
+            self.cache.put(key, EquityResult(to_canonical_order(result.equities, order),
+                                             to_canonical_order(result.stderr, order),
+                                             result.trials, result.exact))
+        return result
+
+    def range_equity(self,
+                     villain_range: Union[List[str], str, HandRange],
+                     board: Optional[List[str]] = None,
+                     hero_range: Optional[Union[List[str], str, HandRange]] = None,
+                     num_simulations: int = 10000,
+                     exact: Optional[bool] = None,
+                     max_enumerations: Optional[int] = None,
+                     seed: Optional[int] = None,
+                     buckets: int = 0) -> EquityGrid:
+        """
+        Hero's equity for every holding in a range against one villain range,
+        dealing and ranking each runout once for all holdings (see equity/grid.py).
+        
+        Args:
+            villain_range: An exact hand, a range string or a HandRange
+            board: Current board cards (None for preflop)
+            hero_range: Hero's holdings, in the same forms (all 1326 when omitted)
+            num_simulations: Number of runouts to simulate
+            exact: True to always enumerate, False to always simulate, None (default)
+                   to enumerate whenever the runout count fits max_enumerations
+            max_enumerations: Runout budget for exact=None (defaults to
+                   self.max_enumerations)
+            seed: Seed for reproducible simulation (random when omitted)
+            buckets: Also collect each holding's hand-strength distribution over
+                   the runouts, with this many equity buckets
+        
+        Returns:
+            EquityGrid with one equity per hero holding that can face the villain range
+            
+        Raises:
+            ValueError: If inputs are invalid (duplicate board cards, invalid format,
+                        wrong board length, malformed or empty ranges)
+        """
+        if board and len(board) not in [3, 4, 5]:
+            raise ValueError("Board must have 3 (flop), 4 (turn), or 5 (river) cards")
+        try:
+            board = [Card.from_str(c) for c in board] if board else []
+            specs = [to_range(villain_range),
+                     to_range(hero_range) if hero_range is not None else None]
+        except ValueError as e:
+            raise ValueError(f"Invalid card format: {str(e)}")
+        dead_mask = 0
+        for c in board:
+            dead_mask |= c.mask
+        if bin(dead_mask).count('1') != len(board):
+            raise ValueError("Duplicate cards detected")
+        
+        ranges = []
+        for spec in specs:
+            if spec is None:
+                spec = HandRange({combo: 1.0 for combo in combinations(range(52), 2)})
+            elif isinstance(spec, list):
+                a, b = sorted(c.id for c in spec)
+                spec = HandRange({(a, b): 1.0})
+            compiled = spec.compile(dead_mask)
+            if not len(compiled):
+                raise ValueError("Range has no holdings left after card removal")
+            ranges.append(compiled)
+        villain, hero = ranges
+        
+        board_ids = [c.id for c in board]
+        live = self.board_setup.live_deck(dead_mask)
+        symmetries = suit_symmetries([], board_ids, [hero, villain])
+        if exact is None:
+            budget = self.max_enumerations if max_enumerations is None else max_enumerations
+            # Roughly one runout per orbit is ranked (see enumerate_grid)
+            exact = comb(len(live), 5 - len(board_ids)) <= budget * len(symmetries)
+        tally = GridTally(hero, villain, buckets, symmetries)
+        if exact:
+            enumerate_grid(tally, board_ids, live)
+        else:
+            simulate_grid(tally, board_ids, Dealer(live), num_simulations, random.Random(seed))
+        return tally.result(bool(exact))
+
+    def _finish(self,
+                result: EquityResult,
+                stats: Optional[EquityStats],
+                pots: Optional[SidePots] = None) -> EquityResult:
+        """Attach expected chips and a query's stats to a result, and report the stats."""
+        if pots is not None:
+            result.chips = pots.chips(result.equities)
+        if stats is None:
+            return result
+        result.stats = stats
+        self.stats.merge(stats)
+        if self.on_stats is not None:
+            self.on_stats(stats)
+        return result
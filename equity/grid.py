@@ -0,0 +1,330 @@
+"""
+grid.py
+
+Hero's equity for every holding in a range against a villain range, in one
+pass over the runouts (EquityCalculator.range_equity).
+
+Asking calculate_equity once per holding deals and ranks the same runouts
+1326 times over. Here each runout is dealt once and every live holding of
+either range is ranked on it in a single rank_showdown call. The holdings are
+then sorted by rank and swept from worst to best, keeping the villain weight
+seen so far in total and per card. A hero holding wins against the weight
+below it and ties with the weight of its own rank, less the villain combos
+that share one of its cards (card removal, by inclusion-exclusion), so the
+whole matrix of holdings against the range costs a sort and a linear sweep
+per runout rather than one showdown per pair.
+
+With buckets, each holding also gets a Distribution (see distribution.py): the
+categories it makes and its equity against the range, runout by runout - the
+hand-strength histograms used to bucket holdings on a board.
+
+Each holding's equity is a ratio: the weight it beats (ties count half) over
+the weight it can face, both summed over the runouts. Monte Carlo runouts are
+drawn uniformly from the live deck, which makes every compatible (villain
+combo, runout) pair equally likely, so the ratio is consistent and its
+standard error follows from the delta method, as for Tally.
+
+When a suit permutation maps the board and both ranges onto themselves (see
+canonical.suit_symmetries), a holding does on a runout what its image does on
+the image runout. Exact enumeration then ranks one runout per orbit, weighted
+by the orbit size, and every holding's sums are averaged with those of its
+images at the end - up to 24 times fewer runouts for suit-symmetric ranges
+preflop and 6 on a monotone flop. Monte Carlo sums are averaged the same way,
+which only lowers their variance; the reported standard error does not count
+that gain.
+"""
+
+from dataclasses import dataclass
+from math import sqrt
+from typing import Dict, List, Optional, Tuple
+
+from evaluator.evaluator import HAND_RANKS, rank_showdown, rank_tables
+from evaluator.hand import CARD_MASKS, RANKS, Card
+from equity.canonical import CARD_MAPS, runout_orbits
+from equity.distribution import Distribution, bucket
+from equity.ranges import Combo, CompiledRange
+
+
+def combo_class(combo: Combo) -> str:
+    """Hand class of a combo, e.g. "AKs", "T9o" or "77"."""
+    low, high = sorted(combo)
+    label = RANKS[high >> 2] + RANKS[low >> 2]
+    if high >> 2 == low >> 2:
+        return label
+    return label + ("s" if high & 3 == low & 3 else "o")
+
+
+@dataclass
+class EquityGrid:
+    combos: List[Combo]     # hero holdings, (low card id, high card id)
+    equities: List[float]   # hero equity percentage per holding against the villain range
+    stderr: List[float]     # standard error per holding in percentage points (0 when exact)
+    weights: List[float]    # hero weight times the villain weight each holding faced
+    trials: int             # simulated runouts, or enumerated runouts when exact
+    exact: bool
+    distributions: Optional[List[Distribution]] = None   # per holding, when buckets are asked for
+
+    def __len__(self):
+        return len(self.combos)
+
+    def equity(self, hand: List[str]) -> float:
+        """
+        Equity of one holding, e.g. grid.equity(["Ah", "Kh"]).
+
+        Raises:
+            KeyError: If the holding is not in the grid (not in hero's range,
+                      blocked by the board, or facing no villain holding)
+        """
+        a, b = (Card.from_str(c).id for c in hand)
+        combo = (min(a, b), max(a, b))
+        if combo not in self.combos:
+            raise KeyError(f"No equity for {''.join(hand)}")
+        return self.equities[self.combos.index(combo)]
+
+    def by_class(self) -> Dict[str, float]:
+        """
+        Equity per hand class ("AA", "AKs", "AKo", ...), averaging the class's
+        holdings by their weights.
+        """
+        sums: Dict[str, List[float]] = {}
+        for combo, equity, weight in zip(self.combos, self.equities, self.weights):
+            total = sums.setdefault(combo_class(combo), [0.0, 0.0])
+            total[0] += equity * weight
+            total[1] += weight
+        return {label: s / w for label, (s, w) in sums.items() if w > 0}
+
+    def matrix(self) -> List[List[Optional[float]]]:
+        """
+        The 13x13 grid of class equities, aces first: pairs on the diagonal,
+        suited hands above it and offsuit hands below it (None where the class
+        has no holdings).
+        """
+        classes = self.by_class()
+        grid = []
+        for i in range(12, -1, -1):
+            row = []
+            for j in range(12, -1, -1):
+                if i == j:
+                    label = RANKS[i] * 2
+                elif j < i:
+                    label = RANKS[i] + RANKS[j] + "s"
+                else:
+                    label = RANKS[j] + RANKS[i] + "o"
+                row.append(classes.get(label))
+            grid.append(row)
+        return grid
+
+
+class GridTally:
+    def __init__(self,
+                 hero: CompiledRange,
+                 villain: CompiledRange,
+                 buckets: int = 0,
+                 symmetries: Optional[List[List[int]]] = None):
+        """
+        Per-holding sums over runouts for hero's range against villain's.
+
+        Holdings are indexed over the union of both ranges; a combo in both is
+        ranked once per role, which is cheaper than mapping ranks between them.
+        With buckets, each hero holding also gets histograms of the category it
+        makes and of its equity against the range on each runout, weighted by
+        the villain weight it faces there.
+        
+        symmetries are suit permutations (card maps, identity first) that map
+        the board and both ranges onto themselves; see enumerate_grid.
+        """
+        index: Dict[Combo, int] = {}
+        for combo in list(hero.combos) + list(villain.combos):
+            index.setdefault(combo, len(index))
+        self.combos = list(index)
+        self.hero_weights = [0.0] * len(index)
+        self.villain_weights = [0.0] * len(index)
+        for combo, weight in zip(hero.combos, hero.weights):
+            self.hero_weights[index[combo]] = weight
+        for combo, weight in zip(villain.combos, villain.weights):
+            self.villain_weights[index[combo]] = weight
+        self.masks = [CARD_MASKS[a] | CARD_MASKS[b] for a, b in self.combos]
+        self.heroes = [index[c] for c in hero.combos]
+        self.villains = [index[c] for c in villain.combos]
+
+        self.won = [0.0] * len(index)       # sum of beaten weight (ties half)
+        self.faced = [0.0] * len(index)     # sum of compatible villain weight
+        self.won_sq = [0.0] * len(index)    # sums of squares and products, for stderr
+        self.won_faced = [0.0] * len(index)
+        self.faced_sq = [0.0] * len(index)
+        self.trials = 0
+        self.buckets = buckets
+        self.category_counts = [[0.0] * len(HAND_RANKS) for _ in index] if buckets else None
+        self.equity_counts = [[0.0] * buckets for _ in index] if buckets else None
+        self._categories = rank_tables().categories
+        self.symmetries = symmetries or [CARD_MAPS[0]]
+
+        # Villain weight per card: in total, below the current rank and at it
+        self._total_card = [0.0] * 52
+        self._below_card = [0.0] * 52
+        self._tied_card = [0.0] * 52
+
+    def add_runout(self, board: List[int], board_mask: int, moments: bool = False, count: int = 1):
+        """
+        Rank every holding that avoids the completed board and add one runout.
+
+        Args:
+            board: The 5 board card ids
+            board_mask: Mask of the runout cards (holdings that clash with the
+                        known board were left out of the ranges already)
+            moments: Also keep the sums behind the standard error (Monte Carlo)
+            count: Number of runouts this one stands for (an orbit size when
+                   enumerating, see enumerate_grid)
+        """
+        combos = self.combos
+        masks = self.masks
+        heroes = [i for i in self.heroes if not masks[i] & board_mask]
+        villains = [i for i in self.villains if not masks[i] & board_mask]
+        num_heroes = len(heroes)
+        ranks = rank_showdown(board, [c for i in heroes + villains for c in combos[i]])
+        hero_order = sorted(range(num_heroes), key=ranks.__getitem__)
+        villain_order = sorted(range(num_heroes, len(ranks)), key=ranks.__getitem__)
+
+        villain_weights = self.villain_weights
+        buckets = self.buckets
+        total_card = self._total_card
+        below_card = self._below_card
+        tied_card = self._tied_card
+        total = 0.0
+        for i in villains:
+            w = villain_weights[i]
+            a, b = combos[i]
+            total += w
+            total_card[a] += w
+            total_card[b] += w
+
+        # Walk the heroes up by rank, moving the villains they pass from tied
+        # to below
+        won, faced = self.won, self.faced
+        below = 0.0
+        tied = 0.0
+        tied_players = []
+        v = 0
+        num_villains = len(villain_order)
+        previous = -1
+        for k in hero_order:
+            rank = ranks[k]
+            if rank != previous:
+                for i in tied_players:
+                    w = villain_weights[i]
+                    a, b = combos[i]
+                    below_card[a] += w
+                    below_card[b] += w
+                    tied_card[a] = 0.0
+                    tied_card[b] = 0.0
+                below += tied
+                tied = 0.0
+                tied_players = []
+                while v < num_villains and ranks[villain_order[v]] < rank:
+                    i = villains[villain_order[v] - num_heroes]
+                    w = villain_weights[i]
+                    a, b = combos[i]
+                    below += w
+                    below_card[a] += w
+                    below_card[b] += w
+                    v += 1
+                while v < num_villains and ranks[villain_order[v]] == rank:
+                    i = villains[villain_order[v] - num_heroes]
+                    w = villain_weights[i]
+                    a, b = combos[i]
+                    tied += w
+                    tied_card[a] += w
+                    tied_card[b] += w
+                    tied_players.append(i)
+                    v += 1
+                previous = rank
+            i = heroes[k]
+            a, b = combos[i]
+            # Villain combos sharing a card with the holding are impossible; its
+            # own combo shares both, so it is added back once
+            own = villain_weights[i]
+            x = below - below_card[a] - below_card[b] + (tied - tied_card[a] - tied_card[b] + own) / 2
+            y = total - total_card[a] - total_card[b] + own
+            if count != 1:
+                x *= count
+                y *= count
+            won[i] += x
+            faced[i] += y
+            if moments:
+                self.won_sq[i] += x * x
+                self.won_faced[i] += x * y
+                self.faced_sq[i] += y * y
+            if buckets and y > 0:
+                self.category_counts[i][self._categories[rank]] += y
+                self.equity_counts[i][bucket(x / y, buckets)] += y
+
+        for i in range(52):
+            total_card[i] = 0.0
+            below_card[i] = 0.0
+            tied_card[i] = 0.0
+        self.trials += count
+
+    def _symmetrize(self):
+        """Average every holding's sums with those of its images under the symmetries."""
+        index = {combo: i for i, combo in enumerate(self.combos)}
+        images = [[index[(min(m[a], m[b]), max(m[a], m[b]))] for a, b in self.combos]
+                  for m in self.symmetries]
+        share = 1.0 / len(self.symmetries)
+        for name in ("won", "faced", "won_sq", "won_faced", "faced_sq"):
+            sums = getattr(self, name)
+            setattr(self, name, [sum(sums[image[i]] for image in images) * share
+                                 for i in range(len(sums))])
+        for name in ("category_counts", "equity_counts"):
+            rows = getattr(self, name)
+            if rows is not None:
+                setattr(self, name, [[sum(column) * share for column in zip(*(rows[image[i]] for image in images))]
+                                     for i in range(len(rows))])
+        self.symmetries = [CARD_MAPS[0]]
+
+    def result(self, exact: bool) -> EquityGrid:
+        """Equities of the hero holdings that faced any villain weight."""
+        if len(self.symmetries) > 1:
+            self._symmetrize()
+        combos, equities, errors, weights = [], [], [], []
+        distributions = [] if self.buckets else None
+        for i in self.heroes:
+            y = self.faced[i]
+            if y <= 0:
+                continue
+            ratio = self.won[i] / y
+            error = 0.0
+            if not exact:
+                spread = self.won_sq[i] - 2 * ratio * self.won_faced[i] + ratio * ratio * self.faced_sq[i]
+                error = sqrt(max(spread, 0.0)) / y * 100
+            combos.append(self.combos[i])
+            equities.append(ratio * 100)
+            errors.append(error)
+            weights.append(self.hero_weights[i] * y)
+            if distributions is not None:
+                distributions.append(Distribution([c / y for c in self.category_counts[i]],
+                                                  [e / y for e in self.equity_counts[i]]))
+        return EquityGrid(combos, equities, errors, weights, self.trials, exact, distributions)
+
+
+def enumerate_grid(tally: GridTally, board_ids: List[int], live: List[int]):
+    """Add every completion of the board to tally, one per orbit of its symmetries."""
+    board = board_ids + [0] * (5 - len(board_ids))
+    start = len(board_ids)
+    for runout, count in runout_orbits(live, 5 - start, tally.symmetries):
+        mask = 0
+        for k, card in enumerate(runout):
+            board[start + k] = card
+            mask |= CARD_MASKS[card]
+        tally.add_runout(board, mask, count=count)
+
+
+def simulate_grid(tally: GridTally, board_ids: List[int], dealer, num_trials: int, rng):
+    """Add num_trials random completions of the board, dealt by dealer, to tally."""
+    board = board_ids + [0] * (5 - len(board_ids))
+    start = len(board_ids)
+    for _ in range(num_trials):
+        dealer.deal_into(board, start, 5 - start, rng)
+        mask = 0
+        for card in board[start:]:
+            mask |= CARD_MASKS[card]
+        tally.add_runout(board, mask, moments=True)
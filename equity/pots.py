@@ -0,0 +1,116 @@
+"""
+pots.py
+
+Side pots of a multiway all-in.
+
+Players who put different amounts in can only win what they matched. With
+contributions of 100, 300 and 300 there is a main pot of 300 that all three
+players contest and a side pot of 400 between the two bigger stacks. Chips that
+nobody matched form a pot with a single eligible player, who simply gets them
+back.
+
+SidePots splits the contributions into pots once per query. Each trial is then
+settled from a single ranking of the players (see split()), and the common
+case - one winner who is eligible for every pot - needs no pot work at all
+(see covers).
+"""
+
+from typing import List, Sequence, Tuple
+
+
+class SidePots:
+    def __init__(self, contributions: Sequence[float]):
+        """
+        Build the pots.
+
+        Args:
+            contributions: Chips each player put in, hero first
+
+        Raises:
+            ValueError: If a contribution is negative or nothing was put in
+        """
+        if any(c < 0 for c in contributions):
+            raise ValueError("Contributions cannot be negative")
+        self.contributions = [float(c) for c in contributions]
+        self.total = sum(self.contributions)
+        if self.total <= 0:
+            raise ValueError("Contributions must add up to a positive pot")
+
+        # One pot per distinct contribution level, as fractions of the total
+        self.pots: List[Tuple[float, Tuple[int, ...]]] = []
+        previous = 0.0
+        for level in sorted(set(c for c in self.contributions if c > 0)):
+            eligible = tuple(p for p, c in enumerate(self.contributions) if c >= level)
+            self.pots.append(((level - previous) * len(eligible) / self.total, eligible))
+            previous = level
+        # Players eligible for every pot: a unique best hand among them wins it all
+        self.covers = [c == previous for c in self.contributions]
+
+        # For settling in a chain (see split): players who put chips in, deepest
+        # first; per player, how many have more chips in, and the share of the
+        # total pot in the pots they are eligible for
+        self.order = sorted((p for p, c in enumerate(self.contributions) if c > 0),
+                            key=lambda p: -self.contributions[p])
+        self.above = [sum(d > c for d in self.contributions) for c in self.contributions]
+        self.upto = [sum(f for f, eligible in self.pots if p in eligible) for p in range(len(self.contributions))]
+
+    def __len__(self):
+        return len(self.contributions)
+
+    def split(self, ranks: Sequence[int], best_player: int = -1) -> List[Tuple[int, float]]:
+        """
+        Settle every pot from one ranking of the players.
+
+        The best hand wins every pot it is eligible for. The pots above its
+        contribution go to the best hand among the deeper stacks, and so on up
+        the chain, so a trial costs a scan or two of the players however many
+        pots there are. Tied hands fall back to settling pot by pot.
+
+        Args:
+            ranks: Hand rank of every player (higher is better)
+            best_player: The player with the best hand, if the caller already
+                         knows it is the only one
+
+        Returns:
+            (player, share of the total pot) for every player who wins chips;
+            the shares add up to 1
+        """
+        won = []
+        order = self.order
+        claimed = 0.0
+        top = len(order)
+        if best_player >= 0 and self.upto[best_player]:
+            won.append((best_player, self.upto[best_player]))
+            claimed = self.upto[best_player]
+            top = self.above[best_player]
+        while top:
+            best = -1
+            winner = -1
+            tied = False
+            for i in range(top):
+                rank = ranks[order[i]]
+                if rank > best:
+                    best = rank
+                    winner = order[i]
+                    tied = False
+                elif rank == best:
+                    tied = True
+            if tied:
+                return self._split_pots(ranks)
+            won.append((winner, self.upto[winner] - claimed))
+            claimed = self.upto[winner]
+            top = self.above[winner]
+        return won
+
+    def _split_pots(self, ranks: Sequence[int]) -> List[Tuple[int, float]]:
+        shares = [0.0] * len(ranks)
+        for fraction, eligible in self.pots:
+            best = max(ranks[p] for p in eligible)
+            winners = [p for p in eligible if ranks[p] == best]
+            for p in winners:
+                shares[p] += fraction / len(winners)
+        return [(p, share) for p, share in enumerate(shares) if share]
+
+    def chips(self, equities: Sequence[float]) -> List[float]:
+        """Expected chips of each player from equity percentages of the total pot."""
+        return [e / 100 * self.total for e in equities]
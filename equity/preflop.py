@@ -0,0 +1,272 @@
+"""
+preflop.py
+
+Precomputed exact heads-up preflop equities.
+
+Every heads-up preflop matchup (two exact hands) is equivalent under suit
+relabelling to one of 93,769 canonical (hero, villain) pairs. build_preflop_table()
+enumerates all 1,712,304 boards for each of them once, on the NumPy backend, and
+writes hero's win and tie counts to a compact binary file:
+
+    header   b"PFEQ", version, entry count        (3 x uint32)
+    keys     sorted canonical matchup keys          (count x uint32)
+    wins     hero win counts                        (count x uint32)
+    ties     tie counts                             (count x uint32)
+
+PreflopTable opens the file with mmap, so lookups are a binary search over the
+page-cached keys with nothing parsed at load time.
+
+Build it with:
+
+    python -m equity.preflop build [--output PATH] [--workers N]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from bisect import bisect_left
+from itertools import combinations
+from math import comb
+from typing import Iterable, List, Optional, Tuple
+
+from equity.canonical import CARD_MAPS
+from evaluator.tables import cache_dir
+
+MAGIC = b"PFEQ"
+VERSION = 1
+BOARDS_PER_MATCHUP = comb(48, 5)
+DEFAULT_FILENAME = "preflop_hu.bin"
+
+
+def default_path() -> str:
+    return os.path.join(cache_dir(), DEFAULT_FILENAME)
+
+
+def _pair(card_map, a, b):
+    a, b = card_map[a], card_map[b]
+    return (a, b) if a < b else (b, a)
+
+
+def canonical_matchup(hero: List[int], villain: List[int]) -> Tuple[int, int, int, int]:
+    """Smallest (hero pair, villain pair) over all suit relabellings."""
+    return min(_pair(m, *hero) + _pair(m, *villain) for m in CARD_MAPS)
+
+
+def matchup_key(matchup: Tuple[int, int, int, int]) -> int:
+    a, b, c, d = matchup
+    return ((a * 52 + b) * 52 + c) * 52 + d
+
+
+def canonical_matchups() -> List[Tuple[int, int, int, int]]:
+    """All canonical (hero, villain) matchups, sorted by key."""
+    found = []
+    for hero in combinations(range(52), 2):
+        if canonical_matchup(list(hero), list(hero))[:2] != hero:
+            continue
+        # Relabellings that fix the canonical hero decide the villain's form
+        stabilizer = [m for m in CARD_MAPS if _pair(m, *hero) == hero]
+        for villain in combinations(range(52), 2):
+            if not set(hero) & set(villain) and min(_pair(m, *villain) for m in stabilizer) == villain:
+                found.append(hero + villain)
+    return sorted(found, key=matchup_key)
+
+
+class _BoardEnumerator:
+    """All 5-card boards with their summed keys and masks, filtered per matchup."""
+
+    def __init__(self):
+        import numpy as np
+        from equity.simulator import VectorSimulator
+        self.np = np
+        self.sim = VectorSimulator()
+        boards = np.array(list(combinations(range(52), 5)), dtype=np.int8)
+        self.board_key = self.sim.card_keys[boards].sum(axis=1)
+        self.board_mask = np.bitwise_or.reduce(self.sim.card_masks[boards], axis=1)
+
+    def count(self, matchup: Tuple[int, int, int, int]) -> Tuple[int, int]:
+        """Hero's (wins, ties) over every board that avoids the four hole cards."""
+        np = self.np
+        a, b, c, d = matchup
+        dead = np.uint64(self.sim.card_masks[[a, b, c, d]].sum())
+        live = (self.board_mask & dead) == 0
+        ranks = self.sim.rank_players([[a, b], [c, d]], self.board_key[live], self.board_mask[live])
+        return int((ranks[0] > ranks[1]).sum()), int((ranks[0] == ranks[1]).sum())
+
+
+_ENUMERATOR = None
+
+
+def _count_matchup(matchup):
+    global _ENUMERATOR
+    if _ENUMERATOR is None:
+        _ENUMERATOR = _BoardEnumerator()
+    return _ENUMERATOR.count(matchup)
+
+
+def build_preflop_table(path: Optional[str] = None,
+                        workers: int = 1,
+                        matchups: Optional[Iterable[Tuple[int, int, int, int]]] = None,
+                        progress=None) -> int:
+    """
+    Enumerate exact heads-up preflop equities and write the table file.
+
+    Each unordered pair of hands is enumerated once; the reverse matchup is
+    filled in from the same counts.
+
+    Args:
+        path: Output file (defaults to default_path())
+        workers: Number of processes to enumerate with
+        matchups: Canonical matchups to include (all of them by default; a subset
+                  is mainly useful for testing)
+        progress: Optional callback(done, total)
+
+    Returns:
+        Number of entries written
+    """
+    path = path or default_path()
+    matchups = canonical_matchups() if matchups is None else sorted(set(matchups), key=matchup_key)
+    wanted = set(matchups)
+
+    # Enumerate each unordered pair once
+    todo = []
+    for hero_a, hero_b, vil_a, vil_b in matchups:
+        reverse = canonical_matchup([vil_a, vil_b], [hero_a, hero_b])
+        if reverse not in wanted or matchup_key(reverse) >= matchup_key((hero_a, hero_b, vil_a, vil_b)):
+            todo.append((hero_a, hero_b, vil_a, vil_b))
+
+    counts = {}
+    if workers > 1:
+        from multiprocessing import Pool
+        with Pool(workers) as pool:
+            results = pool.imap(_count_matchup, todo, chunksize=16)
+            for i, (matchup, result) in enumerate(zip(todo, results)):
+                counts[matchup] = result
+                if progress:
+                    progress(i + 1, len(todo))
+    else:
+        for i, matchup in enumerate(todo):
+            counts[matchup] = _count_matchup(matchup)
+            if progress:
+                progress(i + 1, len(todo))
+
+    keys, wins, ties = [], [], []
+    for matchup in matchups:
+        if matchup in counts:
+            win, tie = counts[matchup]
+        else:
+            lose, tie = counts[canonical_matchup(list(matchup[2:]), list(matchup[:2]))]
+            win = BOARDS_PER_MATCHUP - lose - tie
+        keys.append(matchup_key(matchup))
+        wins.append(win)
+        ties.append(tie)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = len(keys)
+    with open(path + ".tmp", "wb") as f:
+        f.write(struct.pack("<4sII", MAGIC, VERSION, count))
+        f.write(struct.pack(f"<{count}I", *keys))
+        f.write(struct.pack(f"<{count}I", *wins))
+        f.write(struct.pack(f"<{count}I", *ties))
+    os.replace(path + ".tmp", path)
+    return count
+
+
+class PreflopTable:
+    def __init__(self, path: str):
+        """
+        Open a table written by build_preflop_table.
+
+        Args:
+            path: Table file
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a preflop table of this version
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = struct.unpack_from("<4sII", self._mmap)
+        if magic != MAGIC or version != VERSION or len(self._mmap) != 12 + 12 * count:
+            self._mmap.close()
+            raise ValueError(f"Not a version {VERSION} preflop table: {path}")
+        view = memoryview(self._mmap)[12:].cast("I")
+        self.keys = view[:count]
+        self.wins = view[count:2 * count]
+        self.ties = view[2 * count:]
+
+    @classmethod
+    def load_default(cls) -> Optional["PreflopTable"]:
+        """The table at default_path(), or None if it has not been built."""
+        try:
+            return cls(default_path())
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, hero: List[int], villain: List[int]) -> Optional[Tuple[int, int, int]]:
+        """
+        Exact counts for a heads-up matchup.
+
+        Args:
+            hero: Hero's hole card ids
+            villain: Villain's hole card ids
+
+        Returns:
+            Tuple of (hero wins, ties, boards), or None if the matchup is not in the table
+        """
+        key = matchup_key(canonical_matchup(hero, villain))
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        return self.wins[index], self.ties[index], BOARDS_PER_MATCHUP
+
+    def class_equity(self, hero: str, villain: str) -> Optional[float]:
+        """
+        Hero's equity percentage between two of the 169 starting-hand classes
+        (e.g. "AKs" vs "QQ"), averaged over every compatible pair of combos.
+
+        Returns:
+            Equity percentage, or None if some matchup is missing from the table
+        """
+        from equity.ranges import HandRange
+        total = 0.0
+        pairs = 0
+        for hero_combo in HandRange.parse(hero).combos:
+            for villain_combo in HandRange.parse(villain).combos:
+                if set(hero_combo) & set(villain_combo):
+                    continue
+                counts = self.lookup(list(hero_combo), list(villain_combo))
+                if counts is None:
+                    return None
+                wins, ties, boards = counts
+                total += (wins + ties / 2) / boards
+                pairs += 1
+        return total / pairs * 100 if pairs else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact heads-up preflop equity table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="enumerate every matchup and write the table")
+    build.add_argument("--output", default=default_path(), help="table file (default: %(default)s)")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    start = time.time()
+
+    def progress(done, total):
+        if done % 500 == 0 or done == total:
+            rate = done / max(time.time() - start, 1e-9)
+            print(f"\r{done}/{total} matchups ({rate:.1f}/s)", end="", file=sys.stderr)
+
+    count = build_preflop_table(args.output, args.workers, progress=progress)
+    print(f"\nWrote {count} matchups to {args.output} in {time.time() - start:.0f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
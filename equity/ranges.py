@@ -0,0 +1,234 @@
+"""
+ranges.py
+
+Villain hand ranges: parsing of standard range notation into weighted combo
+lists, and card-removal-aware sampling from them.
+
+Notation (tokens separated by commas or spaces, each optionally ending in
+":weight", e.g. "AKs:0.5"; a later token overrides an earlier one):
+
+- Pairs: "QQ", "QQ+" (QQ through AA), "QQ-99"
+- Suited, offsuit or both: "AKs", "AKo", "AK"
+- Kicker plus: "ATs+" (ATs, AJs, AQs, AKs)
+- Dash ranges: "A5s-A2s" (same top card), "76s-54s" (same gap)
+- Exact combos: "AhKh"
+
+Sampling is rejection-free. With several villains, each is drawn from the
+combos that do not clash with the cards already given to earlier villains; the
+trial is then weighted by the share of the range still available (sequential
+importance sampling), which keeps the joint distribution of holdings exact
+without re-drawing, however tight the ranges are.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple, Union
+
+from evaluator.hand import CARD_MASKS, RANKS, Card
+
+Combo = Tuple[int, int]
+
+_TOKEN = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)(\+?)$")
+
+
+def _combos_for(high: int, low: int, kind: str) -> List[Combo]:
+    """All card id pairs for rank indexes high >= low and kind '', 's' or 'o'."""
+    combos = []
+    for s1 in range(4):
+        for s2 in range(4):
+            a, b = high * 4 + s1, low * 4 + s2
+            if high == low and s1 >= s2:
+                continue
+            if kind == 's' and s1 != s2 or kind == 'o' and s1 == s2:
+                continue
+            combos.append((min(a, b), max(a, b)))
+    return combos
+
+
+def _parse_class(token: str) -> Tuple[int, int, str, bool]:
+    match = _TOKEN.match(token)
+    if match is None:
+        raise ValueError(f"Invalid range token: {token}")
+    r1, r2, kind, plus = match.groups()
+    high, low = sorted((RANKS.index(r1), RANKS.index(r2)), reverse=True)
+    if high == low and kind:
+        raise ValueError(f"Pairs cannot be suited or offsuit: {token}")
+    return high, low, kind, bool(plus)
+
+
+def _expand(token: str) -> List[Combo]:
+    if len(token) == 4 and token[1] in 'shdc' and token[3] in 'shdc':
+        try:
+            a, b = Card.from_str(token[:2]).id, Card.from_str(token[2:]).id
+        except ValueError as e:
+            raise ValueError(f"Invalid range token: {token} ({e})")
+        if a == b:
+            raise ValueError(f"Invalid range token: {token}")
+        return [(min(a, b), max(a, b))]
+
+    if '-' in token:
+        first, last = token.split('-')
+        h1, l1, kind, plus1 = _parse_class(first)
+        h2, l2, kind2, plus2 = _parse_class(last)
+        if plus1 or plus2 or kind != kind2:
+            raise ValueError(f"Invalid range token: {token}")
+        if h1 == l1 and h2 == l2:
+            classes = [(r, r) for r in range(min(h1, h2), max(h1, h2) + 1)]
+        elif h1 == h2:
+            classes = [(h1, r) for r in range(min(l1, l2), max(l1, l2) + 1)]
+        elif h1 - l1 == h2 - l2:
+            gap = h1 - l1
+            classes = [(r + gap, r) for r in range(min(l1, l2), max(l1, l2) + 1)]
+        else:
+            raise ValueError(f"Invalid range token: {token}")
+        return [c for high, low in classes for c in _combos_for(high, low, kind)]
+
+    high, low, kind, plus = _parse_class(token)
+    if not plus:
+        return _combos_for(high, low, kind)
+    if high == low:
+        return [c for r in range(high, 13) for c in _combos_for(r, r, '')]
+    return [c for r in range(low, high) for c in _combos_for(high, r, kind)]
+
+
+class HandRange:
+    def __init__(self, combos: Dict[Combo, float]):
+        """
+        A weighted set of two-card holdings.
+
+        Args:
+            combos: Mapping of (low card id, high card id) to a positive weight
+        """
+        self.combos = {c: w for c, w in combos.items() if w > 0}
+
+    @classmethod
+    def parse(cls, text: str) -> "HandRange":
+        """
+        Parse range notation (see module docstring).
+
+        Raises:
+            ValueError: If a token is malformed or a weight is not a number
+        """
+        combos = {}
+        for token in re.split(r"[,\s]+", text.strip()):
+            if not token:
+                continue
+            weight = 1.0
+            if ':' in token:
+                token, weight_str = token.split(':', 1)
+                try:
+                    weight = float(weight_str)
+                except ValueError:
+                    raise ValueError(f"Invalid weight in range token: {token}:{weight_str}")
+                if weight < 0:
+                    raise ValueError(f"Negative weight in range token: {token}:{weight_str}")
+            for combo in _expand(token):
+                combos[combo] = weight
+        if not combos:
+            raise ValueError(f"Empty range: {text!r}")
+        return cls(combos)
+
+    def __len__(self):
+        return len(self.combos)
+
+    def __repr__(self):
+        return f"HandRange({len(self.combos)} combos)"
+
+    def compile(self, dead_mask: int) -> "CompiledRange":
+        """Drop combos that use any dead card and build the sampling tables."""
+        live = {c: w for c, w in self.combos.items()
+                if not (CARD_MASKS[c[0]] | CARD_MASKS[c[1]]) & dead_mask}
+        return CompiledRange(sorted(live.items()))
+
+
+class CompiledRange:
+    def __init__(self, items: List[Tuple[Combo, float]]):
+        """
+        Sampling tables for a range with the dead cards already removed.
+
+        Args:
+            items: (combo, weight) pairs
+        """
+        self.combos = [c for c, _ in items]
+        self.weights = [w for _, w in items]
+        self.masks = [CARD_MASKS[a] | CARD_MASKS[b] for a, b in self.combos]
+        self.cumulative = list(accumulate(self.weights))
+        self.total = self.cumulative[-1] if self.cumulative else 0.0
+        # Weight of the combos holding each card, and of each exact pair,
+        # for computing the still-available weight after other deals
+        self.card_weights = [0.0] * 52
+        for (a, b), w in items:
+            self.card_weights[a] += w
+            self.card_weights[b] += w
+        self.pair_weights = dict(items)
+
+    def __len__(self):
+        return len(self.combos)
+
+    def without(self, dead_mask: int) -> "CompiledRange":
+        """The range minus every combo that uses a card in dead_mask."""
+        return CompiledRange([(c, w) for c, w, m in zip(self.combos, self.weights, self.masks)
+                              if not m & dead_mask])
+
+    def available_weight(self, dealt: List[int]) -> float:
+        """Total weight of combos that avoid every card in dealt."""
+        weight = self.total
+        for i, a in enumerate(dealt):
+            weight -= self.card_weights[a]
+            for b in dealt[i + 1:]:
+                weight += self.pair_weights.get((min(a, b), max(a, b)), 0.0)
+        return weight
+
+    def sample(self, rng, dealt: List[int], dealt_mask: int) -> Tuple[Optional[int], float]:
+        """
+        Draw a combo that avoids the dealt cards, with probability proportional
+        to its weight among those combos.
+
+        Args:
+            rng: random.Random
+            dealt: Card ids already given to other villains this trial
+            dealt_mask: Mask of the same cards
+
+        Returns:
+            Tuple of (combo index or None if nothing is available, share of the
+            range's weight that was available)
+        """
+        available = self.available_weight(dealt) if dealt else self.total
+        if available <= self.total * 1e-12:
+            return None, 0.0
+        # One draw from the full range; a clash falls back to an exact draw over
+        # the available combos, which gives the correct conditional probability
+        index = bisect_right(self.cumulative, rng.random() * self.total)
+        index = min(index, len(self.combos) - 1)
+        if self.masks[index] & dealt_mask:
+            target = rng.random() * available
+            for i, mask in enumerate(self.masks):
+                if not mask & dealt_mask:
+                    index = i
+                    target -= self.weights[i]
+                    if target < 0:
+                        break
+        return index, available / self.total
+
+
+def to_range(spec: Union[str, List[str], HandRange]) -> Union[List[Card], HandRange]:
+    """
+    Interpret one villain entry of calculate_equity.
+
+    Args:
+        spec: Two card strings (an exact hand), a range string or a HandRange
+
+    Returns:
+        Two Cards for an exact hand, otherwise a HandRange
+
+    Raises:
+        ValueError: If the entry is malformed
+    """
+    if isinstance(spec, HandRange):
+        return spec
+    if isinstance(spec, str):
+        return HandRange.parse(spec)
+    if len(spec) != 2:
+        raise ValueError("Each villain must have exactly 2 cards")
+    return [Card.from_str(c) for c in spec]
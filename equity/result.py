@@ -0,0 +1,90 @@
+"""
+result.py
+
+Containers for equity results.
+
+- Tally: running weighted sums of pot shares, merged across simulation chunks.
+  It keeps enough moments to estimate the standard error of each player's
+  equity (self-normalized weighted mean, delta method), which drives the
+  adaptive stopping in EquityCalculator.
+- EquityResult: what estimate_equity returns - equities plus their standard
+  errors, the number of trials behind them and whether they are exact (and,
+  on request, per-player hand-strength distributions).
+"""
+
+from dataclasses import dataclass
+from math import sqrt
+from typing import List, Optional, Tuple
+
+from equity.distribution import Distribution, Histograms
+from equity.stats import EquityStats, TrialTimings
+
+
+class Tally:
+    def __init__(self, num_players: int):
+        """
+        Empty sums for num_players players.
+        """
+        self.shares = [0.0] * num_players      # sum of w * share
+        self.shares_w = [0.0] * num_players    # sum of w^2 * share
+        self.shares_sq = [0.0] * num_players   # sum of w^2 * share^2
+        self.weight = 0.0                      # sum of w
+        self.weight_sq = 0.0                   # sum of w^2
+        self.trials = 0
+        self.timings: Optional[TrialTimings] = None   # when instrumented
+        self.histograms: Optional[Histograms] = None  # when distributions are asked for
+
+    def merge(self, other: "Tally") -> "Tally":
+        """Add another tally's sums into this one (in place) and return self."""
+        for i in range(len(self.shares)):
+            self.shares[i] += other.shares[i]
+            self.shares_w[i] += other.shares_w[i]
+            self.shares_sq[i] += other.shares_sq[i]
+        self.weight += other.weight
+        self.weight_sq += other.weight_sq
+        self.trials += other.trials
+        if other.timings is not None:
+            if self.timings is None:
+                self.timings = TrialTimings(other.timings.sample_every)
+            self.timings.merge(other.timings)
+        if other.histograms is not None:
+            if self.histograms is None:
+                self.histograms = Histograms(len(self.shares), other.histograms.buckets)
+            self.histograms.merge(other.histograms)
+        return self
+
+    def equities(self) -> List[float]:
+        """Equity percentages (weighted mean pot share)."""
+        return [s / self.weight * 100 for s in self.shares]
+
+    def stderr(self) -> List[float]:
+        """Standard error of each equity, in percentage points."""
+        errors = []
+        for s, s_w, s_sq in zip(self.shares, self.shares_w, self.shares_sq):
+            mean = s / self.weight
+            spread = s_sq - 2 * mean * s_w + mean * mean * self.weight_sq
+            errors.append(sqrt(max(spread, 0.0)) / self.weight * 100)
+        return errors
+
+
+@dataclass
+class EquityResult:
+    equities: List[float]   # percentages, hero first
+    stderr: List[float]     # standard error per player in percentage points (0 when exact)
+    trials: int             # simulated trials, or enumerated runouts when exact
+    exact: bool
+    stats: Optional[EquityStats] = None     # when the calculator is instrumented
+    chips: Optional[List[float]] = None     # expected chips per player, with side pots
+    distributions: Optional[List[Distribution]] = None   # per player, when buckets are asked for
+
+    def confidence_intervals(self, z: float = 1.96) -> List[Tuple[float, float]]:
+        """
+        Confidence interval per player (95% by default).
+
+        Args:
+            z: Normal quantile for the interval width
+
+        Returns:
+            List of (low, high) percentages
+        """
+        return [(e - z * s, e + z * s) for e, s in zip(self.equities, self.stderr)]
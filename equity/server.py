@@ -0,0 +1,387 @@
+"""
+server.py
+
+Long-running equity service over a local socket.
+
+    python -m equity.server --unix /tmp/equity.sock --workers 4
+    python -m equity.server --port 8765
+
+The protocol is newline-delimited JSON. Each request line is an object such as
+
+    {"id": 7, "hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"], "JJ+, AKs"],
+     "board": ["7h", "8h", "9c"], "num_simulations": 20000, "deadline_ms": 50}
+
+where every field except hero and villains is optional (also: exact,
+target_stderr, max_simulations, seed). The reply line carries the same id with
+equities, stderr, trials and exact, or an error. Replies on one connection are
+written as they complete, so they may come back out of order.
+{"op": "stats"} returns the server's counters.
+
+How requests are served:
+
+- The main process parses each request once, answers it from the result cache
+  or the preflop table when it can, and otherwise queues it.
+- Identical in-flight requests (same canonical situation - suit relabellings and
+  villain order included - and precision) share one computation, unless they
+  have a deadline.
+- Queued requests are coalesced: everything that arrives within batch_window
+  seconds (or max_batch requests) is split into one batch per worker and sent
+  to a process pool, whose workers keep their evaluator tables warm.
+- deadline_ms is a latency budget counted from arrival. A simulation stops at
+  the first chunk boundary past it and returns what it has, with fewer trials
+  and a correspondingly larger stderr; such partial results are not cached.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from equity.cache import EquityCache
+from equity.canonical import canonicalize, from_canonical_order, to_canonical_order
+from equity.equity_calc import (BACKENDS, DEFAULT_MAX_ENUMERATIONS, DEFAULT_MAX_SIMULATIONS,
+                                EquityCalculator)
+from equity.result import EquityResult
+from evaluator.evaluator import rank_tables
+
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 64
+
+# Warm calculator of each worker process
+_WORKER_CALCULATOR = None
+
+
+def _init_worker(backend: str, max_enumerations: int):
+    global _WORKER_CALCULATOR
+    _WORKER_CALCULATOR = EquityCalculator(max_enumerations, backend=backend)
+    rank_tables()
+
+
+def _solve_batch(jobs: List[tuple]) -> List[tuple]:
+    """
+    Run a batch of requests in a worker.
+
+    Args:
+        jobs: (hero, villains, board, options, deadline or None) per request, the
+              deadline a time.monotonic() value (the clock is shared by the
+              processes of one machine)
+
+    Returns:
+        Per request, ("ok", (equities, stderr, trials, exact, partial)) or
+        ("error", message), where partial marks a simulation that its deadline
+        may have cut short
+    """
+    results = []
+    for hero, villains, board, options, deadline in jobs:
+        try:
+            result = _WORKER_CALCULATOR.estimate_equity(hero, villains, board, deadline=deadline, **options)
+        except ValueError as e:
+            results.append(("error", str(e)))
+        else:
+            partial = deadline is not None and not result.exact and time.monotonic() >= deadline
+            results.append(("ok", (result.equities, result.stderr, result.trials, result.exact, partial)))
+    return results
+
+
+class _Job:
+    __slots__ = ("request", "options", "deadline", "future", "partial")
+
+    def __init__(self, request: dict, options: dict, deadline: Optional[float], future):
+        self.request = request
+        self.options = options
+        self.deadline = deadline
+        self.future = future
+        self.partial = False    # cut short by its deadline; not cached
+
+
+class EquityServer:
+    def __init__(self,
+                 workers: int = 1,
+                 backend: str = "python",
+                 cache: Optional[EquityCache] = None,
+                 batch_window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH,
+                 max_enumerations: int = DEFAULT_MAX_ENUMERATIONS):
+        """
+        Initialize the server (call start_unix or start_tcp to listen).
+
+        Args:
+            workers: Worker processes for the simulations
+            backend: Simulation backend of the workers ("python" or "numpy")
+            cache: Result cache shared by all connections (memory only if omitted)
+            batch_window: Seconds to wait for more requests before dispatching
+            max_batch: Queued requests that trigger an immediate dispatch
+            max_enumerations: Runout budget for exact enumeration
+
+        Raises:
+            ValueError: If the backend is unknown
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.workers = max(workers, 1)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # Parses, canonicalizes and answers cached or table lookups in-process
+        self.calc = EquityCalculator(max_enumerations, cache=cache if cache is not None else EquityCache())
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(backend, max_enumerations))
+        # Start the workers now: their tables are warm before the first request,
+        # and they do not inherit the sockets of connections accepted later
+        self.pool.submit(os.getpid).result()
+        self.queue: List[_Job] = []
+        self.in_flight: Dict[tuple, asyncio.Future] = {}
+        self._flush_handle = None
+        self.stats = {"requests": 0, "errors": 0, "cache_hits": 0, "preflop_hits": 0,
+                      "deduplicated": 0, "batches": 0, "computed": 0}
+
+    async def start_unix(self, path: str):
+        """Listen on a Unix socket; returns the asyncio server."""
+        if os.path.exists(path):
+            os.unlink(path)
+        return await asyncio.start_unix_server(self._serve_connection, path)
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0):
+        """Listen on a TCP socket; returns the asyncio server."""
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    def close(self):
+        """Shut down the worker pool and the cache."""
+        self.pool.shutdown(cancel_futures=True)
+        if self.calc.cache is not None:
+            self.calc.cache.close()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def reply(line: bytes):
+            response = await self.handle_line(line)
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(reply(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> dict:
+        """Decode one request line and produce its reply object."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            self.stats["errors"] += 1
+            return {"id": None, "error": f"Invalid request: {e}"}
+        reply = {"id": request.get("id")}
+        if request.get("op") == "stats":
+            reply.update(self.stats)
+            return reply
+        try:
+            result = await self.solve(request)
+        except (ValueError, TypeError) as e:
+            self.stats["errors"] += 1
+            reply["error"] = str(e)
+            return reply
+        reply.update(equities=result.equities, stderr=result.stderr,
+                     trials=result.trials, exact=result.exact)
+        return reply
+
+    async def solve(self, request: dict) -> EquityResult:
+        """
+        Answer one request: cache or preflop table, else join an identical
+        in-flight computation, else queue it for the next batch.
+
+        Raises:
+            ValueError: If the request is invalid
+        """
+        loop = asyncio.get_running_loop()
+        arrival = time.monotonic()
+        self.stats["requests"] += 1
+        if "hero" not in request or "villains" not in request:
+            raise ValueError("Request needs hero and villains")
+        hero, villains, board = request["hero"], request["villains"], request.get("board")
+        options = {
+            "num_simulations": int(request.get("num_simulations", 10000)),
+            "exact": request.get("exact"),
+            "target_stderr": request.get("target_stderr"),
+            "max_simulations": int(request.get("max_simulations", DEFAULT_MAX_SIMULATIONS)),
+            "seed": request.get("seed"),
+        }
+        deadline = None
+        if request.get("deadline_ms") is not None:
+            deadline = arrival + float(request["deadline_ms"]) / 1000
+
+        # Parse once; settle the enumerate-or-simulate choice as the workers will
+        calc = self.calc
+        hero_ids, villain_specs, board_ids, dead_mask = calc._prepare(hero, villains, board)
+        if options["exact"] is not False:
+            result = calc._preflop_lookup(hero_ids, villain_specs, board_ids)
+            if result is not None:
+                self.stats["preflop_hits"] += 1
+                return result
+        if options["exact"] is None:
+            live = calc.board_setup.live_deck(dead_mask)
+            options["exact"] = calc._count_runouts(villain_specs, board_ids, live) <= calc.max_enumerations
+        num_simulations = options["max_simulations"] if options["target_stderr"] is not None \
+            else options["num_simulations"]
+
+        situation = canonicalize(hero_ids, villain_specs, board_ids)
+        order = situation.villain_order
+        cached = calc.cache.get(situation.key, options["exact"], num_simulations, options["target_stderr"])
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return EquityResult(from_canonical_order(cached.equities, order),
+                                from_canonical_order(cached.stderr, order),
+                                cached.trials, cached.exact)
+
+        # Share the answer of an identical request that is already being computed.
+        # Requests with a deadline neither join nor can be joined: a shared job
+        # would hold one caller to another's budget.
+        key = (situation.key, options["exact"], num_simulations, options["target_stderr"], options["seed"])
+        future = self.in_flight.get(key) if deadline is None else None
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            future = loop.create_future()
+            if deadline is None:
+                self.in_flight[key] = future
+            job = _Job({"hero": hero, "villains": villains, "board": board, "order": order},
+                       options, deadline, future)
+            future.add_done_callback(lambda f: self._finish(key, situation.key, job))
+            self._enqueue(job)
+        canonical = await asyncio.shield(future)
+        return EquityResult(from_canonical_order(canonical.equities, order),
+                            from_canonical_order(canonical.stderr, order),
+                            canonical.trials, canonical.exact)
+
+    def _finish(self, key: tuple, cache_key: str, job: _Job):
+        if self.in_flight.get(key) is job.future:
+            del self.in_flight[key]
+        future = job.future
+        if not future.cancelled() and future.exception() is None and not job.partial:
+            self.calc.cache.put(cache_key, future.result())
+
+    def _enqueue(self, job: _Job):
+        self.queue.append(job)
+        if len(self.queue) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        """Split the queued requests into one batch per worker and dispatch them."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        jobs, self.queue = self.queue, []
+        if not jobs:
+            return
+        # Tightest deadlines first, so they are not stuck behind slower work
+        jobs.sort(key=lambda j: float("inf") if j.deadline is None else j.deadline)
+        groups = [jobs[i::self.workers] for i in range(min(self.workers, len(jobs)))]
+        for group in groups:
+            asyncio.ensure_future(self._run_batch(group))
+
+    async def _run_batch(self, jobs: List[_Job]):
+        loop = asyncio.get_running_loop()
+        # Deadlines stay absolute, so time spent queued or behind earlier jobs of
+        # the batch counts against each request's budget
+        payload = [(j.request["hero"], j.request["villains"], j.request["board"], j.options, j.deadline)
+                   for j in jobs]
+        self.stats["batches"] += 1
+        try:
+            results = await loop.run_in_executor(self.pool, _solve_batch, payload)
+        except Exception as e:  # the pool broke or shut down
+            results = [("error", f"Worker failed: {e}")] * len(jobs)
+        for job, (status, value) in zip(jobs, results):
+            if job.future.done():
+                continue
+            if status == "error":
+                job.future.set_exception(ValueError(value))
+                continue
+            self.stats["computed"] += 1
+            equities, stderr, trials, exact, job.partial = value
+            order = job.request["order"]
+            job.future.set_result(EquityResult(to_canonical_order(equities, order),
+                                               to_canonical_order(stderr, order), trials, exact))
+
+
+def request_equity(request: dict,
+                   path: Optional[str] = None,
+                   host: str = "127.0.0.1",
+                   port: Optional[int] = None,
+                   timeout: Optional[float] = None) -> dict:
+    """
+    Send one request to a running server and wait for the reply (blocking).
+
+    Args:
+        request: Request object (see module docstring)
+        path: Unix socket path, or
+        host, port: TCP address
+        timeout: Socket timeout in seconds
+
+    Returns:
+        The reply object
+    """
+    if path is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = path
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = (host, port)
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as reply:
+            return json.loads(reply.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Equity service over a local socket")
+    parser.add_argument("--unix", help="Unix socket path to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", choices=BACKENDS, default="python")
+    parser.add_argument("--cache", help="sqlite file for the result cache")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW * 1000)
+    args = parser.parse_args(argv)
+
+    server = EquityServer(args.workers, args.backend, EquityCache(args.cache),
+                          batch_window=args.batch_window_ms / 1000)
+
+    async def serve():
+        listener = await (server.start_unix(args.unix) if args.unix
+                          else server.start_tcp(args.host, args.port))
+        print(f"Serving equity on {args.unix or f'{args.host}:{args.port}'}")
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+session.py
+
+Street-by-street equity for one hand.
+
+EquitySession parses and validates the hand once and then follows it as board
+cards arrive (add_board_cards), reusing the work of earlier streets:
+
+- Exact enumeration keeps a record of every runout it visited: the cards still
+  to come, the cards drawn from villain ranges, the weight and each player's
+  pot share. The runouts of the next street are exactly the records that deal
+  the new cards, so once a street has been enumerated the later streets are
+  answered by filtering those records, with no evaluation at all.
+- Enumeration sums each player's hole cards and the known board into a partial
+  table key once per villain holding; a runout then adds its own cards once and
+  costs one table lookup per player. Runouts that differ only in suits nobody
+  can make a flush in are ranked once (see canonical.runout_classes).
+- Monte Carlo trials on the current street accumulate. Asking again for more
+  trials (or a tighter target_stderr) only simulates the difference.
+"""
+
+import secrets
+from typing import Iterator, List, Optional, Tuple, Union
+
+from evaluator.evaluator import rank_key
+from evaluator.hand import CARD_MASKS, CARD_STRS, Card, cards_mask
+from evaluator.tables import CARD_KEYS
+from equity.equity_calc import DEFAULT_MAX_SIMULATIONS, EquityCalculator, chunk_seed
+from equity.ranges import HandRange
+from equity.result import EquityResult, Tally
+
+# (mask of the runout cards not yet on the board, mask of the cards drawn from
+# ranges, weight, pot share per player)
+Runout = Tuple[int, int, float, Tuple[float, ...]]
+
+
+class EquitySession:
+    def __init__(self,
+                 hero_cards: List[str],
+                 villain_ranges: List[Union[List[str], str, HandRange]],
+                 board: Optional[List[str]] = None,
+                 calculator: Optional[EquityCalculator] = None,
+                 seed: Optional[int] = None):
+        """
+        Start following a hand.
+
+        Args:
+            hero_cards: List of two cards for the hero (e.g., ["As", "Kh"])
+            villain_ranges: Per villain, an exact hand, a range string or a HandRange
+                            (as for EquityCalculator.calculate_equity)
+            board: Board cards already dealt (None for preflop)
+            calculator: EquityCalculator to simulate with (a default one if omitted)
+            seed: Seed for reproducible simulation (random when omitted)
+
+        Raises:
+            ValueError: If inputs are invalid (see EquityCalculator.calculate_equity)
+        """
+        self.calculator = calculator if calculator is not None else EquityCalculator()
+        self.hero_ids, self.villains, self.board_ids, self.dead_mask = \
+            self.calculator._prepare(hero_cards, villain_ranges, board)
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self._runouts: Optional[List[Runout]] = None
+        self._tally: Optional[Tally] = None
+        self._simulations = 0
+
+    @property
+    def board(self) -> List[str]:
+        """The board dealt so far."""
+        return [CARD_STRS[c] for c in self.board_ids]
+
+    def add_board_cards(self, cards: List[str]):
+        """
+        Deal more board cards (the flop, the turn or the river).
+
+        Args:
+            cards: Card strings to add to the board
+
+        Raises:
+            ValueError: If a card is malformed or already known, if the board would
+                        not have 3, 4 or 5 cards, or if a villain range is left empty
+        """
+        try:
+            new_cards = [Card.from_str(c) for c in cards]
+        except ValueError as e:
+            raise ValueError(f"Invalid card format: {str(e)}")
+        if len(self.board_ids) + len(new_cards) not in [3, 4, 5]:
+            raise ValueError("Board must have 3 (flop), 4 (turn), or 5 (river) cards")
+        mask = cards_mask(c.id for c in new_cards)
+        if bin(mask).count('1') != len(new_cards) or mask & self.dead_mask:
+            raise ValueError("Duplicate cards detected")
+
+        villains = []
+        for villain in self.villains:
+            if not isinstance(villain, list):
+                villain = villain.without(mask)
+                if not len(villain):
+                    raise ValueError("Villain range has no holdings left after card removal")
+            villains.append(villain)
+        self.villains = villains
+        self.board_ids = self.board_ids + [c.id for c in new_cards]
+        self.dead_mask |= mask
+
+        # Runouts that dealt the new cards become the new street's runouts;
+        # sampled trials were for the old board and are dropped
+        if self._runouts is not None:
+            self._runouts = [(pending & ~mask, drawn, weight, shares)
+                             for pending, drawn, weight, shares in self._runouts
+                             if pending & mask == mask and not drawn & mask]
+        self._tally = None
+
+    def equities(self, num_simulations: int = 10000, **options) -> List[float]:
+        """Equity percentages for the current board (see result())."""
+        return self.result(num_simulations, **options).equities
+
+    def result(self,
+               num_simulations: int = 10000,
+               exact: Optional[bool] = None,
+               max_enumerations: Optional[int] = None,
+               workers: int = 1,
+               target_stderr: Optional[float] = None,
+               max_simulations: int = DEFAULT_MAX_SIMULATIONS) -> EquityResult:
+        """
+        Equity on the current board, from earlier work where possible.
+
+        Args:
+            num_simulations: Total Monte Carlo trials wanted on this street (trials
+                   already run on it count towards them)
+            exact, max_enumerations, workers, target_stderr, max_simulations: As
+                   for EquityCalculator.estimate_equity
+
+        Returns:
+            EquityResult with equities, standard errors and the trial count
+
+        Raises:
+            ValueError: If the villain ranges leave no possible holdings
+        """
+        calc = self.calculator
+        if exact is not False:
+            if self._runouts is not None:
+                return self._exact_result(self._runouts)
+            result = calc._preflop_lookup(self.hero_ids, self.villains, self.board_ids)
+            if result is not None:
+                return result
+
+        live = calc.board_setup.live_deck(self.dead_mask)
+        budget = calc.max_enumerations if max_enumerations is None else max_enumerations
+        within_budget = calc._count_runouts(self.villains, self.board_ids, live) <= budget
+        if exact is None:
+            exact = within_budget
+        if exact:
+            # Keep the records for later streets unless there are too many of them
+            runouts = self._enumerate(live)
+            if within_budget:
+                runouts = self._runouts = list(runouts)
+            return self._exact_result(runouts)
+
+        if target_stderr is not None:
+            num_simulations = max_simulations
+        tally = self._tally
+        done = tally.trials if tally is not None else 0
+        if target_stderr is not None and tally is not None and tally.weight > 0:
+            satisfied = max(tally.stderr()) <= target_stderr
+        else:
+            satisfied = done >= num_simulations
+        if not satisfied:
+            # Each top-up gets its own seed so its chunks are independent of earlier ones
+            seed = chunk_seed(self.seed, self._simulations)
+            self._simulations += 1
+            tally = self._tally = calc._simulate(
+                self.hero_ids, self.villains, self.board_ids, live, num_simulations - done,
+                seed, workers, target_stderr, prior=tally)
+        if tally.weight == 0:
+            raise ValueError("Villain ranges leave no possible holdings")
+        return EquityResult(tally.equities(), tally.stderr(), tally.trials, False)
+
+    def _enumerate(self, live: List[int]) -> Iterator[Runout]:
+        """Visit every villain holding and board completion, yielding one record each."""
+        known_key = sum(CARD_KEYS[c] for c in self.board_ids)
+        known_mask = cards_mask(self.board_ids)
+        to_come = 5 - len(self.board_ids)
+        for villain_ids, weight, drawn_mask in self.calculator._villain_assignments(self.villains):
+            # Partial key and mask of each player's hole cards plus the known board
+            holes = [self.hero_ids] + [villain_ids[i:i + 2] for i in range(0, len(villain_ids), 2)]
+            partial = [(known_key + CARD_KEYS[a] + CARD_KEYS[b],
+                        known_mask | CARD_MASKS[a] | CARD_MASKS[b]) for a, b in holes]
+            remaining = [c for c in live if not CARD_MASKS[c] & drawn_mask]
+            for runouts in self.calculator._runout_classes(self.hero_ids + villain_ids, self.board_ids,
+                                                           remaining):
+                # Rank one runout per class; every member gets its own record
+                key = 0
+                mask = 0
+                for c in runouts[0]:
+                    key += CARD_KEYS[c]
+                    mask |= CARD_MASKS[c]
+                ranks = [rank_key(k + key, m | mask) for k, m in partial]
+                best = max(ranks)
+                share = 1.0 / ranks.count(best)
+                shares = tuple(share if r == best else 0.0 for r in ranks)
+                for runout in runouts:
+                    yield cards_mask(runout), drawn_mask, weight, shares
+
+    def _exact_result(self, runouts) -> EquityResult:
+        tally = Tally(len(self.villains) + 1)
+        for _, _, weight, shares in runouts:
+            for player, share in enumerate(shares):
+                if share:
+                    tally.shares[player] += share * weight
+            tally.weight += weight
+            tally.trials += 1
+        if tally.weight == 0:
+            raise ValueError("Villain ranges leave no possible holdings")
+        return EquityResult(tally.equities(), [0.0] * len(tally.shares), tally.trials, True)
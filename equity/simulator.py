@@ -0,0 +1,292 @@
+"""
+simulator.py
+
+Vectorized Monte Carlo backend for EquityCalculator, built on NumPy.
+
+Instead of looping over trials in Python, a batch of N runouts is dealt at once as
+an (N, k) integer array and every player's 7-card hand is ranked for all N trials
+with array gathers from the evaluator's lookup tables (see evaluator/tables.py):
+
+- Dealing: a partial Fisher-Yates shuffle of the live deck (dead cards already
+  removed), applied to all N rows together, one column per card dealt.
+- Evaluation: the board's summed card keys and rank masks are computed once per
+  runout, then each player's hole-card key is added and looked up in the tables.
+- Reduction: winner masks are turned into pot shares and summed per player.
+
+NumPy is optional for the rest of the engine; it is only required here.
+"""
+
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from evaluator.batch import table_arrays
+from evaluator.hand import CARD_MASKS
+from evaluator.tables import CARD_KEYS, SUIT_BITS, SUIT_MASK
+from equity.distribution import Histograms
+from equity.pots import SidePots
+from equity.ranges import CompiledRange
+from equity.result import Tally
+
+DEFAULT_BATCH_SIZE = 1 << 16
+
+
+class VectorSimulator:
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Initialize the simulator and wrap the evaluator tables as NumPy arrays.
+
+        Args:
+            batch_size: Number of trials dealt and evaluated per batch
+        
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("The numpy backend requires NumPy (pip install numpy)")
+        self.batch_size = batch_size
+        # Views over the evaluator's arrays, no copies
+        (self.rank_table, self.flush_table, self.flush_suit,
+         self.card_keys, self.card_masks) = table_arrays()
+
+    def make_rng(self, seed: Optional[int] = None):
+        """numpy.random.Generator for a seed (fresh entropy when omitted)."""
+        return np.random.default_rng(seed)
+
+    def deal(self, live: List[int], num_cards: int, num_trials: int, rng) -> "np.ndarray":
+        """
+        Deal num_cards distinct cards from the live deck for every trial.
+
+        Args:
+            live: Live card ids (dead cards already removed)
+            num_cards: Cards dealt per trial
+            num_trials: Number of trials (rows)
+            rng: numpy.random.Generator
+
+        Returns:
+            (num_trials, num_cards) array of card ids
+        """
+        deck = np.asarray(live, dtype=np.int8)
+        size = len(deck)
+        perm = np.broadcast_to(np.arange(size, dtype=np.int8), (num_trials, size)).copy()
+        rows = np.arange(num_trials)
+        for j in range(num_cards):
+            swap = rng.integers(j, size, size=num_trials)
+            picked = perm[rows, swap]
+            perm[rows, swap] = perm[:, j]
+            perm[:, j] = picked
+        return deck[perm[:, :num_cards]]
+
+    def _hole_key_mask(self, hole):
+        """Summed keys and OR-ed masks of a fixed hole (scalars) or per-trial holes ((N, 2) array)."""
+        if isinstance(hole, list):
+            return (CARD_KEYS[hole[0]] + CARD_KEYS[hole[1]],
+                    np.uint64(CARD_MASKS[hole[0]] | CARD_MASKS[hole[1]]))
+        return (self.card_keys[hole[:, 0]] + self.card_keys[hole[:, 1]],
+                self.card_masks[hole[:, 0]] | self.card_masks[hole[:, 1]])
+
+    def rank_players(self,
+                     holes: list,
+                     board_key: "np.ndarray",
+                     board_mask: "np.ndarray") -> "np.ndarray":
+        """
+        Rank every player's 7-card hand for a batch of complete boards.
+
+        Args:
+            holes: Per player, either two card ids or an (N, 2) array of per-trial holes
+            board_key: (N,) summed card keys of each board
+            board_mask: (N,) OR-ed card masks of each board
+
+        Returns:
+            (players, N) array of dense hand ranks
+        """
+        ranks = np.empty((len(holes), len(board_key)), dtype=np.uint16)
+        for p, hole in enumerate(holes):
+            hole_key, hole_mask = self._hole_key_mask(hole)
+            key = board_key + hole_key
+            suit = self.flush_suit[key & SUIT_MASK]
+            ranks[p] = self.rank_table[key >> SUIT_BITS]
+            flush = np.flatnonzero(suit >= 0)
+            if len(flush):
+                if not np.isscalar(hole_mask) and hole_mask.ndim:
+                    hole_mask = hole_mask[flush]
+                lane = (board_mask[flush] | hole_mask) >> (suit[flush].astype(np.uint64) * np.uint64(16))
+                ranks[p, flush] = self.flush_table[(lane & np.uint64(0x1FFF)).astype(np.intp)]
+        return ranks
+
+    def showdown(self, ranks: "np.ndarray", pots: Optional[SidePots] = None) -> "np.ndarray":
+        """
+        Pot share of every player in every trial.
+
+        Args:
+            ranks: (players, N) hand ranks
+            pots: Side pots, each split among its best eligible hands
+
+        Returns:
+            (players, N) pot shares (fractions of the total pot with side pots)
+        """
+        if pots is None:
+            winners = ranks == ranks.max(axis=0)
+            return winners / winners.sum(axis=0)
+        shares = np.zeros(ranks.shape)
+        for fraction, eligible in pots.pots:
+            eligible = list(eligible)
+            contest = ranks[eligible]
+            winners = contest == contest.max(axis=0)
+            shares[eligible] += fraction * winners / winners.sum(axis=0)
+        return shares
+
+    def _add_to_tally(self, tally: Tally, shares: "np.ndarray", weights: Optional["np.ndarray"]):
+        if weights is None:
+            tally.weight += shares.shape[1]
+            tally.weight_sq += shares.shape[1]
+            sums, sums_w, sums_sq = shares.sum(axis=1), shares.sum(axis=1), (shares * shares).sum(axis=1)
+        else:
+            weighted = shares * weights
+            tally.weight += float(weights.sum())
+            tally.weight_sq += float((weights * weights).sum())
+            sums, sums_w, sums_sq = (weighted.sum(axis=1), (weighted * weights).sum(axis=1),
+                                     (weighted * weighted).sum(axis=1))
+        for p in range(len(tally.shares)):
+            tally.shares[p] += float(sums[p])
+            tally.shares_w[p] += float(sums_w[p])
+            tally.shares_sq[p] += float(sums_sq[p])
+
+    def _range_arrays(self, villain: CompiledRange) -> dict:
+        pair_weights = np.zeros((52, 52))
+        for (a, b), w in villain.pair_weights.items():
+            pair_weights[a, b] = pair_weights[b, a] = w
+        return {
+            "combos": np.array(villain.combos, dtype=np.int8).reshape(-1, 2),
+            "masks": np.array(villain.masks, dtype=np.uint64),
+            "weights": np.array(villain.weights),
+            "cumulative": np.array(villain.cumulative),
+            "card_weights": np.array(villain.card_weights),
+            "pair_weights": pair_weights,
+        }
+
+    def sample_villains(self, villains: list, num_trials: int, rng):
+        """
+        Vectorized counterpart of BoardSetup.deal_villains: one holding per villain
+        per trial, ranges sampled around earlier villains' cards and each trial
+        weighted by the share of every range that was still available.
+
+        Args:
+            villains: Per villain, either two card ids or a CompiledRange
+            num_trials: Number of trials
+            rng: numpy.random.Generator
+
+        Returns:
+            Tuple of (holes per villain, (N,) trial weights, list of (N,) arrays of
+            the card ids drawn from ranges)
+        """
+        holes = []
+        weights = np.ones(num_trials)
+        drawn = []
+        drawn_mask = np.zeros(num_trials, dtype=np.uint64)
+        for villain in villains:
+            if isinstance(villain, list):
+                holes.append(villain)
+                continue
+            t = self._range_arrays(villain)
+            size = len(villain)
+            index = np.searchsorted(t["cumulative"], rng.random(num_trials) * villain.total, side="right")
+            np.minimum(index, size - 1, out=index)
+            if drawn:
+                cards = np.stack(drawn, axis=1)
+                available = villain.total - t["card_weights"][cards].sum(axis=1)
+                for i in range(cards.shape[1]):
+                    for j in range(i + 1, cards.shape[1]):
+                        available += t["pair_weights"][cards[:, i], cards[:, j]]
+                available[available <= villain.total * 1e-12] = 0.0
+                weights *= available / villain.total
+                # Rows whose first draw clashes are redrawn exactly over the
+                # combos that are still available, in bounded blocks
+                clash = np.flatnonzero(t["masks"][index] & drawn_mask)
+                for start in range(0, len(clash), 4096):
+                    rows = clash[start:start + 4096]
+                    ok = (t["masks"][None, :] & drawn_mask[rows, None]) == 0
+                    cumulative = np.cumsum(ok * t["weights"], axis=1)
+                    target = rng.random(len(rows)) * cumulative[:, -1]
+                    index[rows] = np.minimum((cumulative <= target[:, None]).sum(axis=1), size - 1)
+            combos = t["combos"][index]
+            holes.append(combos)
+            drawn.extend([combos[:, 0], combos[:, 1]])
+            drawn_mask |= t["masks"][index]
+        return holes, weights, drawn
+
+    def simulate(self,
+                 players: list,
+                 board_ids: List[int],
+                 live: List[int],
+                 num_simulations: int,
+                 rng=None,
+                 pots: Optional[SidePots] = None,
+                 buckets: int = 0) -> Tally:
+        """
+        Run num_simulations trials in batches.
+
+        Args:
+            players: Hero's hole card ids, then per villain either two card ids or
+                     a CompiledRange
+            board_ids: Known board card ids
+            live: Live card ids
+            num_simulations: Number of trials
+            rng: Optional numpy.random.Generator (a fresh one is created if omitted)
+            pots: Side pots to settle instead of one pot shared by all players
+            buckets: If non-zero, fill tally.histograms (see equity/distribution.py)
+
+        Returns:
+            Tally over num_simulations trials
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        num_cards = 5 - len(board_ids)
+        known_key = sum(CARD_KEYS[i] for i in board_ids)
+        known_mask = 0
+        for i in board_ids:
+            known_mask |= CARD_MASKS[i]
+        has_ranges = any(not isinstance(p, list) for p in players)
+
+        tally = Tally(len(players))
+        tally.trials = num_simulations
+        if buckets:
+            tally.histograms = Histograms(len(players), buckets)
+        done = 0
+        while done < num_simulations:
+            n = min(self.batch_size, num_simulations - done)
+            done += n
+            weights = None
+            holes = players
+            dealt = None
+            if has_ranges:
+                villain_holes, weights, drawn = self.sample_villains(players[1:], n, rng)
+                holes = [players[0]] + villain_holes
+                # Drop trials where some range had nothing left
+                keep = np.flatnonzero(weights > 0)
+                if len(keep) < n:
+                    weights = weights[keep]
+                    holes = [h if isinstance(h, list) else h[keep] for h in holes]
+                    drawn = [d[keep] for d in drawn]
+                    n = len(keep)
+                # Over-deal and keep the first cards no villain holds
+                dealt = self.deal(live, num_cards + len(drawn), n, rng)
+                cards = np.stack(drawn, axis=1)
+                clash = (dealt[:, :, None] == cards[:, None, :]).any(axis=2)
+                order = np.argsort(clash, axis=1, kind="stable")[:, :num_cards]
+                dealt = np.take_along_axis(dealt, order, axis=1)
+            else:
+                dealt = self.deal(live, num_cards, n, rng)
+            board_key = np.full(n, known_key, dtype=np.int64)
+            board_mask = np.full(n, known_mask, dtype=np.uint64)
+            for j in range(num_cards):
+                board_key += self.card_keys[dealt[:, j]]
+                board_mask |= self.card_masks[dealt[:, j]]
+            ranks = self.rank_players(holes, board_key, board_mask)
+            shares = self.showdown(ranks, pots)
+            self._add_to_tally(tally, shares, weights)
+            if tally.histograms is not None:
+                tally.histograms.add_batch(ranks, shares, weights)
+        return tally
@@ -0,0 +1,169 @@
+"""
+stats.py
+
+Optional instrumentation of equity queries.
+
+- EquityStats: counters (queries, trials, hand evaluations, cache and preflop
+  table hits) and wall time per phase of one query, or summed over many.
+- TrialTimings: per-trial phase times sampled inside the Monte Carlo loop.
+  Only every sample_every-th trial reads the clock, so the overhead stays
+  small; the sums are scaled up to all trials when a query finishes.
+- profiled(): a context manager that runs a block under cProfile and
+  tracemalloc and writes a report.
+
+Phases:
+
+    parse      validating the request and building the live deck
+    lookup     preflop table and result cache lookups
+    enumerate  exact enumeration
+    simulate   Monte Carlo, in total
+    deal       dealing villain holdings and board runouts     } sampled estimates
+    evaluate   ranking every player's hand                    } within simulate,
+    aggregate  settling the pot and updating the tally        } summed over workers
+                                                                (python backend)
+    store      writing the result to the cache
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# Trials between clock reads in the Monte Carlo loop
+DEFAULT_SAMPLE_EVERY = 64
+
+PHASES = ("parse", "lookup", "enumerate", "simulate", "deal", "evaluate", "aggregate", "store")
+
+
+_CLOCK_COST = None
+
+
+def clock_cost() -> float:
+    """Seconds taken by one time.perf_counter() call (measured once)."""
+    global _CLOCK_COST
+    if _CLOCK_COST is None:
+        clock = time.perf_counter
+        runs = []
+        for _ in range(5):
+            start = clock()
+            for _ in range(1000):
+                clock()
+            runs.append((clock() - start) / 1000)
+        _CLOCK_COST = min(runs)
+    return _CLOCK_COST
+
+
+class TrialTimings:
+    def __init__(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        """Sampled phase times of the trial loop, merged across chunks like a Tally."""
+        self.sample_every = sample_every
+        self.samples = 0        # trials whose phases were timed
+        self.deal = 0.0
+        self.evaluate = 0.0
+        self.aggregate = 0.0
+        self.skipped = 0        # trials with no evaluation (no compatible holdings)
+
+    def merge(self, other: "TrialTimings") -> "TrialTimings":
+        self.samples += other.samples
+        self.deal += other.deal
+        self.evaluate += other.evaluate
+        self.aggregate += other.aggregate
+        self.skipped += other.skipped
+        return self
+
+
+@dataclass
+class EquityStats:
+    queries: int = 0
+    trials: int = 0             # simulated trials or enumerated runouts
+    evaluations: int = 0        # 7-card hands ranked
+    cache_hits: int = 0
+    cache_misses: int = 0
+    table_hits: int = 0         # answers from the preflop table
+    seconds: Dict[str, float] = field(default_factory=dict)   # wall time per phase
+
+    def lap(self, phase: str, start: float) -> float:
+        """Charge the time since start to phase and return the current time."""
+        now = time.perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + now - start
+        return now
+
+    def add_timings(self, timings: TrialTimings, trials: int):
+        """Scale sampled trial-loop times up to all evaluated trials."""
+        if not timings.samples:
+            return
+        scale = max(trials - timings.skipped, 0) / timings.samples
+        # Each sampled phase also paid for one clock read
+        overhead = clock_cost() * timings.samples
+        for phase in ("deal", "evaluate", "aggregate"):
+            value = max(getattr(timings, phase) - overhead, 0.0) * scale
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + value
+
+    def merge(self, other: "EquityStats") -> "EquityStats":
+        """Add another query's counters and times into these (in place) and return self."""
+        self.queries += other.queries
+        self.trials += other.trials
+        self.evaluations += other.evaluations
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.table_hits += other.table_hits
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        return self
+
+    def report(self) -> str:
+        """Human-readable summary."""
+        lines = [f"{self.queries} queries, {self.trials} trials, {self.evaluations} evaluations, "
+                 f"cache {self.cache_hits} hits / {self.cache_misses} misses, "
+                 f"{self.table_hits} preflop table hits"]
+        for phase in PHASES:
+            if phase in self.seconds:
+                lines.append(f"  {phase:<10}{self.seconds[phase] * 1000:>10.2f} ms")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiled(output: Optional[str] = None, limit: int = 25, memory: bool = True):
+    """
+    Profile a block with cProfile (and tracemalloc) and write a report.
+
+        with profiled("equity.prof.txt"):
+            calc.calculate_equity(["As", "Kh"], ["QQ+, AK"], num_simulations=50000)
+
+    Args:
+        output: Report file (stderr when omitted)
+        limit: Functions (and allocation sites) listed
+        memory: Also trace allocations with tracemalloc; this slows the block down
+    """
+    profile = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        elapsed = time.perf_counter() - start
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, cProfile.__file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+            tracemalloc.stop()
+        report = io.StringIO()
+        report.write(f"Wall time: {elapsed:.3f}s\n\n")
+        pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(limit)
+        if memory:
+            report.write(f"Memory: {current / 1024:.1f} KiB live, {peak / 1024:.1f} KiB peak\n")
+            for stat in snapshot.statistics("lineno")[:limit]:
+                report.write(f"  {stat}\n")
+        if output is None:
+            sys.stderr.write(report.getvalue())
+        else:
+            with open(output, "w") as f:
+                f.write(report.getvalue())
@@ -0,0 +1,162 @@
+"""
+batch.py
+
+Array evaluation of many hands at once, built on NumPy.
+
+compare_hands() works on Hand objects one showdown at a time. The functions here
+take card ids in bulk instead - an (N, players, 7) integer array, or any buffer
+of packed uint8 card ids (bytes, memoryview, mmap) - and rank every hand with
+gathers from the evaluator tables (see tables.py). Buffers are viewed in place,
+never copied, and the work is done in blocks of rows so temporaries stay small
+however many showdowns are passed in.
+
+NumPy is optional for the rest of the engine; it is only required here.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from .evaluator import rank_tables
+from .hand import CARD_MASKS
+from .tables import CARD_KEYS, SUIT_BITS, SUIT_MASK
+
+# Rows (showdowns) ranked per block
+DEFAULT_BLOCK_SIZE = 1 << 15
+
+
+class TableArrays(NamedTuple):
+    rank_table: "np.ndarray"   # uint16 view of the evaluator's rank table
+    flush_table: "np.ndarray"  # uint16 view of the flush table
+    flush_suit: "np.ndarray"   # int8 flush suit (or -1) by suit-count key bits
+    card_keys: "np.ndarray"    # int64 CARD_KEYS
+    card_masks: "np.ndarray"   # uint64 CARD_MASKS
+
+
+_ARRAYS = None
+
+
+def table_arrays() -> TableArrays:
+    """
+    The evaluator tables as NumPy arrays (the big ones are views, not copies).
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    global _ARRAYS
+    if np is None:
+        raise ImportError("Batch evaluation requires NumPy (pip install numpy)")
+    if _ARRAYS is None:
+        tables = rank_tables()
+        _ARRAYS = TableArrays(
+            np.frombuffer(tables.rank_table, dtype=np.uint16),
+            np.frombuffer(tables.flush_table, dtype=np.uint16),
+            np.frombuffer(tables.flush_suit, dtype=np.int8),
+            np.array(CARD_KEYS, dtype=np.int64),
+            np.array(CARD_MASKS, dtype=np.uint64),
+        )
+    return _ARRAYS
+
+
+def as_hands(hands, num_players: Optional[int] = None) -> "np.ndarray":
+    """
+    View hands as an integer array whose last axis holds 7 card ids.
+
+    Args:
+        hands: Array-like of card ids, or a buffer of packed uint8 card ids
+        num_players: If given, reshape to (N, num_players, 7)
+
+    Returns:
+        The array (a view of the input wherever NumPy allows)
+
+    Raises:
+        ValueError: If the shape does not fit, or a card id is outside 0-51
+    """
+    if isinstance(hands, (bytes, bytearray)):
+        hands = np.frombuffer(hands, dtype=np.uint8)
+    array = np.asarray(hands)
+    if array.dtype.kind not in "iu":
+        raise ValueError(f"Card ids must be integers, not {array.dtype}")
+    if num_players is not None:
+        if array.size % (num_players * 7):
+            raise ValueError(f"{array.size} card ids do not split into {num_players}-player showdowns")
+        array = array.reshape(-1, num_players, 7)
+    if array.ndim == 0 or array.shape[-1] != 7:
+        raise ValueError(f"Expected 7 cards per hand, got shape {array.shape}")
+    if array.size and (array.min() < 0 or array.max() > 51):
+        raise ValueError("Card ids must be between 0 and 51")
+    return array
+
+
+def _rank_block(hands: "np.ndarray", t: TableArrays) -> "np.ndarray":
+    key = t.card_keys[hands].sum(axis=-1)
+    ranks = t.rank_table[key >> SUIT_BITS]
+    suit = t.flush_suit[key & SUIT_MASK]
+    flush = suit >= 0
+    if flush.any():
+        mask = np.bitwise_or.reduce(t.card_masks[hands[flush]], axis=-1)
+        lane = (mask >> (suit[flush].astype(np.uint64) * np.uint64(16))) & np.uint64(0x1FFF)
+        ranks[flush] = t.flush_table[lane.astype(np.intp)]
+    return ranks
+
+
+def rank_hands(hands, out: Optional["np.ndarray"] = None,
+               block_size: int = DEFAULT_BLOCK_SIZE) -> "np.ndarray":
+    """
+    Dense rank (1-7462, higher is better) of every 7-card hand.
+
+    Args:
+        hands: (..., 7) array of card ids (see as_hands); cards within a hand are
+               assumed distinct
+        out: Optional uint16 array of shape hands.shape[:-1] to write into
+        block_size: Rows of the first axis ranked per block
+
+    Returns:
+        uint16 array of shape hands.shape[:-1]
+    """
+    t = table_arrays()
+    hands = as_hands(hands)
+    if out is None:
+        out = np.empty(hands.shape[:-1], dtype=np.uint16)
+    if hands.ndim == 1:
+        out[...] = _rank_block(hands, t)
+        return out
+    for start in range(0, hands.shape[0], block_size):
+        out[start:start + block_size] = _rank_block(hands[start:start + block_size], t)
+    return out
+
+
+def showdowns(hands, num_players: Optional[int] = None,
+              block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Rank and settle many showdowns in one call.
+
+    Args:
+        hands: (N, players, 7) array of card ids, or a flat buffer together with
+               num_players
+        num_players: Players per showdown, to reshape a flat buffer
+        block_size: Showdowns ranked per block
+
+    Returns:
+        Tuple of ((N, players) uint16 ranks, (N,) uint32 winner masks with bit p
+        set for every player p holding the best hand)
+
+    Raises:
+        ValueError: If the shape does not fit, a card id is out of range, or
+                    there are more than 32 players
+    """
+    hands = as_hands(hands, num_players)
+    if hands.ndim != 3:
+        raise ValueError(f"Expected (N, players, 7) hands, got shape {hands.shape}")
+    players = hands.shape[1]
+    if players > 32:
+        raise ValueError("At most 32 players per showdown")
+    ranks = rank_hands(hands, block_size=block_size)
+    bits = np.left_shift(np.uint32(1), np.arange(players, dtype=np.uint32))
+    winners = np.bitwise_or.reduce(
+        np.where(ranks == ranks.max(axis=1, keepdims=True), bits, np.uint32(0)), axis=1
+    ).astype(np.uint32)
+    return ranks, winners
@@ -1,6 +1,8 @@
 from collections import Counter
-from itertools import combinations
-from .hand import Card, Hand
+from itertools import combinations, combinations_with_replacement
+from typing import Optional
+from .hand import CARD_MASKS, Card, Hand
+from .tables import CARD_KEYS, SUIT_KEYS, SUIT_MASK, SUIT_BITS, load_tables
 
 HAND_RANKS = [
     "High Card", "One Pair", "Two Pair", "Three of a Kind",
@@ -29,24 +31,160 @@ def _evaluate_5(cards):
     if count == [2, 1, 1, 1]: return (1, tiebreak)
     return (0, values)
 
-def best_hand(hand: Hand):
+class _Unloaded:
+    """
+    Stands in for a table until the first lookup, which loads (or maps) them
+    all and rebinds the module globals. Importing the module stays cheap, and
+    once loaded the lookups go straight to the tables with no check per call.
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getitem__(self, index):
+        _load()
+        return globals()[self.name][index]
+
+_TABLES = None
+_RANK_TABLE = _Unloaded("_RANK_TABLE")
+_FLUSH_TABLE = _Unloaded("_FLUSH_TABLE")
+_FLUSH_SUIT = _Unloaded("_FLUSH_SUIT")
+_SCORES = _Unloaded("_SCORES")
+_CATEGORIES = _Unloaded("_CATEGORIES")
+
+def _load():
+    global _TABLES, _RANK_TABLE, _FLUSH_TABLE, _FLUSH_SUIT, _SCORES, _CATEGORIES
+    if _TABLES is None:
+        _TABLES = load_tables(_evaluate_5)
+        _RANK_TABLE = _TABLES.rank_table
+        _FLUSH_TABLE = _TABLES.flush_table
+        _FLUSH_SUIT = _TABLES.flush_suit
+        _SCORES = _TABLES.scores
+        _CATEGORIES = _TABLES.categories
+
+def rank_tables():
+    """The RankTables, loaded on first use (for vectorized evaluators that gather from them)."""
+    _load()
+    return _TABLES
+
+def rank_ids(ids) -> int:
+    """Dense rank (1-7462, higher is better) of 7 card ids in one table pass."""
+    key = 0
+    for i in ids:
+        key += CARD_KEYS[i]
+    suit = _FLUSH_SUIT[key & SUIT_MASK]
+    if suit < 0:
+        return _RANK_TABLE[key >> SUIT_BITS]
+    mask = 0
+    for i in ids:
+        mask |= CARD_MASKS[i]
+    return _FLUSH_TABLE[(mask >> (16 * suit)) & 0x1FFF]
+
+def rank_key(key: int, mask: int) -> int:
+    """
+    Dense rank of 7 cards from their summed CARD_KEYS and OR-ed CARD_MASKS, so
+    callers can add the cards up in stages (e.g. known cards once, runout later).
+    """
+    suit = _FLUSH_SUIT[key & SUIT_MASK]
+    if suit < 0:
+        return _RANK_TABLE[key >> SUIT_BITS]
+    return _FLUSH_TABLE[(mask >> (16 * suit)) & 0x1FFF]
+
+# Suit with at least 3 cards, by the suit-count bits of a 5-card board key
+def _board_flush_suits():
+    table = [-1] * (SUIT_MASK + 1)
+    for suits in combinations_with_replacement(range(4), 5):
+        for suit in range(4):
+            if suits.count(suit) >= 3:
+                table[sum(SUIT_KEYS[s] for s in suits)] = suit
+    return table
+
+_BOARD_FLUSH_SUIT = _board_flush_suits()
+
+def rank_showdown(board, holes, out: Optional[list] = None) -> list:
+    """
+    Dense ranks of every player at a showdown, sharing the board work: the
+    board's keys and masks are summed once and each player adds two hole cards.
+    Unless the board has three cards of a suit nobody can make a flush, and the
+    flush check is skipped.
+
+    Args:
+        board: The 5 board card ids
+        holes: Hole card ids of all players, two per player, concatenated
+        out: Optional list of one slot per player to write the ranks into, so a
+             trial loop can reuse it instead of allocating a list per showdown
+
+    Returns:
+        List with one rank per player (out, if given)
+    """
+    key = 0
+    mask = 0
+    for i in board:
+        key += CARD_KEYS[i]
+        mask |= CARD_MASKS[i]
+    suit = _BOARD_FLUSH_SUIT[key & SUIT_MASK]
+    ranks = [0] * (len(holes) >> 1) if out is None else out
+    for p in range(len(ranks)):
+        a = holes[2 * p]
+        b = holes[2 * p + 1]
+        hand_key = key + CARD_KEYS[a] + CARD_KEYS[b]
+        if suit >= 0 and (hand_key >> (3 * suit)) & 7 >= 5:
+            lane = ((mask | CARD_MASKS[a] | CARD_MASKS[b]) >> (16 * suit)) & 0x1FFF
+            ranks[p] = _FLUSH_TABLE[lane]
+        else:
+            ranks[p] = _RANK_TABLE[hand_key >> SUIT_BITS]
+    return ranks
+
+def _card_ids(hand: Hand):
     if len(hand.cards) != 7:
         raise ValueError("Hand must have exactly 7 cards")
-    combos = combinations(hand.cards, 5)
-    best_combo = max(combos, key=lambda c: _evaluate_5(c))
-    return _evaluate_5(best_combo), Hand(list(best_combo))
+    return hand.ids
+
+def _best_five(cards, score):
+    """The first 5-card combination of cards (in input order) that makes score."""
+    category, tiebreak = score
+    if category in (4, 8):
+        top = tiebreak[0]
+        needed = Counter([14, 5, 4, 3, 2] if top == 5 else range(top, top - 5, -1))
+    else:
+        needed = Counter(tiebreak)
+    suit = None
+    if category in (5, 8):
+        suit = Counter(c.suit for c in cards).most_common(1)[0][0]
+    combo = []
+    for card in cards:
+        value = RANK_ORDER[card.rank]
+        if needed[value] and (suit is None or card.suit == suit):
+            needed[value] -= 1
+            combo.append(card)
+    return combo
+
+def best_hand(hand: Hand):
+    score = _SCORES[rank_ids(_card_ids(hand))]
+    score = (score[0], list(score[1]))
+    return score, Hand(_best_five(hand.cards, score))
+
+def hand_rank(hand: Hand) -> int:
+    """Single comparable integer for a 7-card hand; higher ranks win."""
+    return rank_ids(_card_ids(hand))
+
+def category_name(rank: int) -> str:
+    """HAND_RANKS name of a dense rank (e.g. "Flush")."""
+    return HAND_RANKS[_CATEGORIES[rank]]
 
 def classify_hand(hand: Hand) -> str:
-    return HAND_RANKS[best_hand(hand)[0][0]]
+    return category_name(hand_rank(hand))
 
 def hand_strength(hand: Hand):
-    return best_hand(hand)[0]
+    category, tiebreak = _SCORES[hand_rank(hand)]
+    return category, list(tiebreak)
 
 def compare_hands(*hands):
     if len(hands) < 2:
         raise ValueError("compare_hands requires at least two Hand objects")
-    scores = [hand_strength(h) for h in hands]
+    scores = [hand_rank(h) for h in hands]
     if len(hands) == 2:
         return 1 if scores[0] > scores[1] else -1 if scores[0] < scores[1] else 0
     max_score = max(scores)
-    return [h for h, s in zip(hands, scores) if s == max_score]
\ No newline at end of file
+    return [h for h, s in zip(hands, scores) if s == max_score]
@@ -4,49 +4,123 @@ hand.py
 Defines classes for representing cards and poker hands used in Texas Hold'em.
 
 - Card: Represents a single playing card with a rank (e.g., 'A', 'K', '2') and a suit ('s', 'h', 'd', 'c').
-  - Validates input rank and suit
+  - Validates input rank and suit (ValueError, so the checks survive python -O)
   - Can be printed (e.g., 'As' for Ace of Spades)
-  - Supports creation from string via Card.from_str('Ah')
+  - Supports creation from string via Card.from_str('Ah') or from an int via Card.from_int(51)
+  - Cards are interned: Card('A', 's') always returns the same object
 
 - Hand: Represents a poker hand (5 or 7 cards).
   - Use Hand.seven_card_hand() or Hand.five_card_hand() to enforce length.
+  - Exposes its cards as an array of ints (Hand.ids) and a 64-bit mask (Hand.mask)
   - Provides a readable string representation of the hand
 
+Integer encoding used throughout the engine:
+
+- Card id: rank_index * 4 + suit_index, so 0 is '2s' and 51 is 'Ac'.
+- Card mask: 1 << (16 * suit_index + rank_index). Masks of several cards are OR-ed
+  into a 64-bit hand mask holding one 13-bit rank lane per suit.
+
 These classes are used by the evaluator module to analyze and compare hands.
 """
 
-from typing import List
+from array import array
+from typing import Iterable, List, Sequence
 
 SUITS = 'shdc'  # spades, hearts, diamonds, clubs
 RANKS = '23456789TJQKA' #2-Ace
 
+CARD_STRS = [r + s for r in RANKS for s in SUITS]  # indexed by card id
+CARD_MASKS = [1 << (16 * (i % 4) + i // 4) for i in range(52)]
+CARD_IDS = {s: i for i, s in enumerate(CARD_STRS)}  # card string -> card id
+
+def card_id(rank: str, suit: str) -> int:
+    return RANKS.index(rank) * 4 + SUITS.index(suit)
+
+def parse_cards(card_strs: Sequence[str]) -> List[int]:
+    """
+    Card ids of card strings, e.g. ["As", "Kd"] -> [48, 46].
+
+    Raises:
+        ValueError: If a card string is malformed
+    """
+    try:
+        return [CARD_IDS[c] for c in card_strs]
+    except (KeyError, TypeError):
+        return [Card.from_str(c).id for c in card_strs]  # raises for the bad one
+
+def cards_mask(ids: Iterable[int]) -> int:
+    mask = 0
+    for i in ids:
+        mask |= CARD_MASKS[i]
+    return mask
+
 class Card:
-    def __init__(self, rank: str, suit: str):
-        assert rank in RANKS, f"Invalid rank: {rank}"
-        assert suit in SUITS, f"Invalid suit: {suit}"
-        self.rank = rank
-        self.suit = suit
+    __slots__ = ('rank', 'suit', 'id', 'mask')
+    _interned = {}
+
+    def __new__(cls, rank: str, suit: str):
+        card = cls._interned.get((rank, suit))
+        if card is None:
+            if rank not in RANKS or len(rank) != 1:
+                raise ValueError(f"Invalid rank: {rank}")
+            if suit not in SUITS or len(suit) != 1:
+                raise ValueError(f"Invalid suit: {suit}")
+            card = super().__new__(cls)
+            card.rank = rank
+            card.suit = suit
+            card.id = card_id(rank, suit)
+            card.mask = CARD_MASKS[card.id]
+            cls._interned[(rank, suit)] = card
+        return card
 
     def __repr__(self):
         return f"{self.rank}{self.suit}"
 
+    def __reduce__(self):
+        return (Card.from_int, (self.id,))
+
     @staticmethod
     def from_str(card_str: str):
-        assert len(card_str) == 2, "Card string must be 2 characters"
-        return Card(card_str[0], card_str[1])
+        if not isinstance(card_str, str) or len(card_str) != 2:
+            raise ValueError("Card string must be 2 characters")
+        card_id = CARD_IDS.get(card_str)
+        if card_id is None:
+            return Card(card_str[0], card_str[1])  # raises for the bad rank or suit
+        return DECK[card_id]
+
+    @staticmethod
+    def from_int(card_id: int):
+        return DECK[card_id]
+
+DECK = [Card(r, s) for r in RANKS for s in SUITS]  # interned cards, indexed by id
 
 class Hand:
     def __init__(self, cards: List[Card]):
         self.cards = cards
 
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]):
+        return cls([DECK[i] for i in ids])
+
+    @property
+    def ids(self) -> array:
+        """Card ids as an unsigned byte array."""
+        return array('B', [c.id for c in self.cards])
+
+    @property
+    def mask(self) -> int:
+        return cards_mask(c.id for c in self.cards)
+
     @classmethod
     def seven_card_hand(cls, cards: List[Card]):
-        assert len(cards) == 7, "Hand must have exactly 7 cards (Texas Hold'em showdown)"
+        if len(cards) != 7:
+            raise ValueError("Hand must have exactly 7 cards (Texas Hold'em showdown)")
         return cls(cards)
 
     @classmethod
     def five_card_hand(cls, cards: List[Card]):
-        assert len(cards) == 5, "Hand must have exactly 5 cards"
+        if len(cards) != 5:
+            raise ValueError("Hand must have exactly 5 cards")
         return cls(cards)
 
     def __repr__(self):
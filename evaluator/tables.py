@@ -0,0 +1,257 @@
+"""
+tables.py
+
+Precomputed lookup tables for the 7-card evaluator.
+
+Every distinct 5-card hand value (as scored by evaluator._evaluate_5) is assigned
+a dense integer rank from 1 (worst high card) to 7462 (royal flush), so that a
+larger rank always means a stronger hand. A 7-card hand is then ranked in a
+single pass:
+
+- Each card has a combined key: a rank key in the high bits and a suit key in the
+  low 12 bits. The rank keys are chosen so that the sum over any 7 cards is unique
+  for every rank multiset, and the suit keys (1, 8, 64, 512) make the low bits a
+  base-8 count of each suit.
+- FLUSH_SUIT maps the summed suit key to the suit holding 5+ cards (or -1).
+- Without a flush, RANK_TABLE[rank key sum] is the answer.
+- With a flush, the 13-bit rank mask of the flush suit indexes FLUSH_TABLE.
+
+Building the tables takes about a second, so the first build writes them to
+one binary file in cache_dir():
+
+    header       b"EV7T", version, rank key count, hand classes, crc32 of the
+                 rest, padding                               (32 bytes)
+    rank table   uint16 x (MAX_RANK_KEY + 1)
+    flush table  uint16 x 8192
+    scores       uint32 x NUM_HAND_CLASSES (packed _evaluate_5 scores)
+    categories   uint8 x (NUM_HAND_CLASSES + 1)
+    flush suits  int8 x (7 * 512 + 1)
+
+Later loads map the file with mmap and look up straight through memoryviews,
+so nothing is parsed or copied, and worker processes share the same pages of
+the OS page cache. A file with the wrong magic, version, size or checksum is
+rebuilt.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from collections import Counter
+from itertools import combinations_with_replacement
+from typing import Callable, List, NamedTuple, Optional, Tuple
+from .hand import Card, RANKS
+
+# Rank keys with a unique sum for every 7-card rank multiset (at most 4 per rank).
+RANK_KEYS = [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181]
+SUIT_KEYS = [1, 8, 64, 512]
+SUIT_BITS = 12
+SUIT_MASK = (1 << SUIT_BITS) - 1
+MAX_RANK_KEY = 4 * RANK_KEYS[12] + 3 * RANK_KEYS[11]
+
+NUM_HAND_CLASSES = 7462
+
+TABLE_FILE = "rank_tables.bin"
+MAGIC = b"EV7T"
+VERSION = 1
+HEADER = struct.Struct("<4sIIII12x")
+
+# Combined evaluator key per card id (see hand.py for the id layout).
+CARD_KEYS = [(RANK_KEYS[i // 4] << SUIT_BITS) | SUIT_KEYS[i % 4] for i in range(52)]
+
+
+class Scores:
+    def __init__(self, packed):
+        """_evaluate_5 score of every dense rank, unpacked on lookup."""
+        self.packed = packed
+
+    def __len__(self):
+        return len(self.packed) + 1
+
+    def __getitem__(self, rank: int) -> Tuple[int, List[int]]:
+        return _unpack_score(self.packed[rank - 1]) if rank else (0, [])
+
+
+class RankTables(NamedTuple):
+    rank_table: array       # 'H', indexed by 7-card rank key sum
+    flush_table: array      # 'H', indexed by 13-bit rank mask of the flush suit
+    flush_suit: array       # 'b', indexed by 7-card suit key sum, -1 when no flush
+    scores: Scores          # dense rank -> _evaluate_5 score
+    categories: array       # 'B', dense rank -> HAND_RANKS index
+
+# Typecode and length of each table, in file order (after the header)
+_LAYOUT = [
+    ("rank_table", "H", MAX_RANK_KEY + 1),
+    ("flush_table", "H", 8192),
+    ("scores", "I", NUM_HAND_CLASSES),
+    ("categories", "B", NUM_HAND_CLASSES + 1),
+    ("flush_suit", "b", 7 * SUIT_KEYS[3] + 1),
+]
+
+
+def _flush_suit_table() -> List[int]:
+    table = [-1] * (7 * SUIT_KEYS[3] + 1)
+    for suits in combinations_with_replacement(range(4), 7):
+        counts = Counter(suits)
+        suit, count = counts.most_common(1)[0]
+        if count >= 5:
+            table[sum(SUIT_KEYS[s] for s in suits)] = suit
+    return table
+
+
+def _pack_score(score: Tuple[int, List[int]]) -> int:
+    category, tiebreak = score
+    packed = category
+    for value in tiebreak + [0] * (5 - len(tiebreak)):
+        packed = (packed << 4) | value
+    return packed
+
+
+def _unpack_score(packed: int) -> Tuple[int, List[int]]:
+    values = [(packed >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
+    category = packed >> 20
+    # Straights and straight flushes are scored by their top card alone
+    return (category, values[:1] if category in (4, 8) else values)
+
+
+def build_tables(evaluate_5: Callable) -> RankTables:
+    """
+    Build all lookup tables from scratch.
+
+    Args:
+        evaluate_5: Reference 5-card scorer; the dense ranks follow its ordering
+
+    Returns:
+        RankTables with every table filled in
+    """
+    def representative(ranks, flush):
+        suits = 's' * 5 if flush else 'shdcs'
+        cards = sorted(ranks)
+        # Spread non-flush cards over suits so no accidental flush appears
+        return [Card(RANKS[r], suits[i]) for i, r in enumerate(cards)]
+
+    five_card_multisets = [
+        ms for ms in combinations_with_replacement(range(13), 5)
+        if max(Counter(ms).values()) <= 4
+    ]
+    plain_scores = {ms: evaluate_5(representative(ms, False)) for ms in five_card_multisets}
+    flush_scores = {
+        ms: evaluate_5(representative(ms, True))
+        for ms in five_card_multisets if len(set(ms)) == 5
+    }
+
+    distinct = sorted({_pack_score(s) for s in plain_scores.values()} |
+                      {_pack_score(s) for s in flush_scores.values()})
+    dense = {packed: i + 1 for i, packed in enumerate(distinct)}
+    scores = Scores(array('I', distinct))
+    categories = array('B', [0] + [p >> 20 for p in distinct])
+
+    # Non-flush: best 5 of 6 and 7 ranks, by dropping one card at a time
+    best = {ms: dense[_pack_score(s)] for ms, s in plain_scores.items()}
+    for size in (6, 7):
+        for ms in combinations_with_replacement(range(13), size):
+            if max(Counter(ms).values()) > 4:
+                continue
+            best[ms] = max(best[ms[:i] + ms[i + 1:]] for i in range(size))
+
+    rank_table = array('H', bytes(2 * (MAX_RANK_KEY + 1)))
+    for ms, rank in best.items():
+        if len(ms) == 7:
+            rank_table[sum(RANK_KEYS[r] for r in ms)] = rank
+
+    flush_table = array('H', bytes(2 * 8192))
+    for mask in sorted(range(8192), key=lambda m: bin(m).count('1')):
+        bits = [r for r in range(13) if mask >> r & 1]
+        if len(bits) == 5:
+            flush_table[mask] = dense[_pack_score(flush_scores[tuple(bits)])]
+        elif 6 <= len(bits) <= 7:
+            flush_table[mask] = max(flush_table[mask & ~(1 << r)] for r in bits)
+
+    return RankTables(rank_table, flush_table, array('b', _flush_suit_table()), scores, categories)
+
+
+def cache_dir() -> str:
+    """Directory for cached tables, overridable with EVALUATOR_TABLE_DIR."""
+    return os.environ.get(
+        'EVALUATOR_TABLE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'evaluator_equity_engine'),
+    )
+
+
+def write_tables(tables: RankTables, path: str):
+    """
+    Write tables to a table file (see the module docstring), atomically.
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    payload = b"".join(
+        (tables.scores.packed if name == "scores" else getattr(tables, name)).tobytes()
+        for name, _, _ in _LAYOUT
+    )
+    header = HEADER.pack(MAGIC, VERSION, MAX_RANK_KEY + 1, NUM_HAND_CLASSES, zlib.crc32(payload))
+    with open(path + ".tmp", "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+
+
+def open_tables(path: str) -> RankTables:
+    """
+    Map a table file into memory.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a valid table file of this version
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    size = HEADER.size + sum(array(typecode).itemsize * count for _, typecode, count in _LAYOUT)
+    if len(mapped) != size:
+        mapped.close()
+        raise ValueError(f"Not a version {VERSION} table file: {path}")
+    magic, version, rank_keys, classes, checksum = HEADER.unpack_from(mapped)
+    view = memoryview(mapped)
+    if (magic, version, rank_keys, classes) != (MAGIC, VERSION, MAX_RANK_KEY + 1, NUM_HAND_CLASSES) \
+            or zlib.crc32(view[HEADER.size:]) != checksum:
+        view.release()
+        mapped.close()
+        raise ValueError(f"Not a version {VERSION} table file: {path}")
+    tables = {}
+    offset = HEADER.size
+    for name, typecode, count in _LAYOUT:
+        end = offset + array(typecode).itemsize * count
+        tables[name] = view[offset:end].cast(typecode)
+        offset = end
+    tables["scores"] = Scores(tables["scores"])
+    return RankTables(**tables)
+
+
+def load_tables(evaluate_5: Callable, directory: Optional[str] = None) -> RankTables:
+    """
+    Open the table file in the cache directory, building and writing it first
+    if it is missing or invalid.
+
+    Args:
+        evaluate_5: Reference 5-card scorer, used only when building
+        directory: Cache directory (defaults to cache_dir())
+
+    Returns:
+        RankTables ready for lookups (mapped from the file unless it could not
+        be written)
+    """
+    path = os.path.join(directory or cache_dir(), TABLE_FILE)
+    try:
+        return open_tables(path)
+    except (OSError, ValueError):
+        pass
+
+    tables = build_tables(evaluate_5)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_tables(tables, path)
+        return open_tables(path)
+    except (OSError, ValueError):
+        # A read-only cache location only costs a rebuild next time
+        return tables
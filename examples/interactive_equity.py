@@ -1,5 +1,5 @@
 import random
-from equity.equity_calc import EquityCalculator
+from equity.session import EquitySession
 from evaluator.hand import Card
 
 def get_card_input(prompt, used_cards, auto_randomize=False):
@@ -94,15 +94,15 @@ def print_final_summary(hero_hand, villain_hands, board, equity_progression):
 def print_equity_explanation():
     print("""
 How equity is calculated at each stage:
-- Preflop, Flop, Turn: Monte Carlo simulation runs thousands of times, dealing random remaining community cards, and averages the results. Each player's equity is the percentage of the pot they would win or split over all simulations.
-- River: With all 5 board cards known, only one simulation is run. The actual winner(s) get 100% (or split if tie).
+- Preflop: Monte Carlo simulation runs thousands of times, dealing random remaining community cards, and averages the results. Each player's equity is the percentage of the pot they would win or split over all simulations.
+- Flop, Turn: Every possible remaining runout is enumerated, so equities are exact.
+- River: With all 5 board cards known, the actual winner(s) get 100% (or split if tie).
     """)
 
 def main():
     print("\n♠️ Texas Hold'em Interactive Equity Calculator ♠️\n")
     print_equity_explanation()
     used_cards = set()
-    calc = EquityCalculator()
     equity_progression = []
 
     # Hero hand
@@ -123,29 +123,33 @@ def main():
     for i in range(num_villains):
         villain_hands.append(get_hand_input(f"Villain {i+1}", used_cards))
 
-    # Preflop equity
-    equity = calc.calculate_equity(hero_hand, villain_hands, board=None, num_simulations=5000)
+    # Preflop equity; the session carries the parsed hand and enumerated
+    # runouts from street to street
+    session = EquitySession(hero_hand, villain_hands)
+    equity = session.equities(num_simulations=5000)
     equity_progression.append(equity)
     print_equity(equity, "preflop", num_villains+1)
 
     # Flop
     flop = get_board_input("Flop", 3, used_cards)
-    equity = calc.calculate_equity(hero_hand, villain_hands, board=flop, num_simulations=5000)
+    session.add_board_cards(flop)
+    equity = session.equities()
     equity_progression.append(equity)
     print_equity(equity, "flop", num_villains+1)
 
     # Turn
     turn = get_board_input("Turn", 1, used_cards)
     board_turn = flop + turn
-    equity = calc.calculate_equity(hero_hand, villain_hands, board=board_turn, num_simulations=5000)
+    session.add_board_cards(turn)
+    equity = session.equities()
     equity_progression.append(equity)
     print_equity(equity, "turn", num_villains+1)
 
     # River
     river = get_board_input("River", 1, used_cards)
     board_river = board_turn + river
-    # On the river, only one simulation is needed (no randomness left)
-    equity = calc.calculate_equity(hero_hand, villain_hands, board=board_river, num_simulations=1)
+    session.add_board_cards(river)
+    equity = session.equities()
     equity_progression.append(equity)
     print_equity(equity, "river", num_villains+1, river=True)
 
@@ -0,0 +1,296 @@
+"""
+run_simulation.py
+
+Re-score an archive of played hands, streaming.
+
+    python -m examples.run_simulation hands.jsonl -o scored.jsonl
+    python -m examples.run_simulation hands.csv --format csv -o - --simulations 20000
+
+Each input record is one hand:
+
+    JSONL: {"id": "h1", "hero": ["As", "Kh"], "villains": [["Qs", "Qd"]],
+            "board": ["7h", "8h", "9c", "2d", "3s"], "allin": "flop"}
+    CSV:   id,hero,villains,board,allin
+           h1,As Kh,Qs Qd,7h 8h 9c 2d 3s,flop
+           (villains separated by "|", cards by spaces)
+
+With a complete board, the showdown is settled with classify_hand/compare_hands
+semantics: every player's hand category, rank and the winners. With "allin" (the
+street on which the money went in, or --allin for every record), the all-in
+equity is computed from the board known on that street.
+
+Records flow through a chain of generators (read, parse, batch, score, write),
+so only one batch is ever held in memory and files larger than RAM stream
+through. Results are written and flushed batch by batch; a record that cannot
+be scored produces an output row with an "error" instead of stopping the run.
+Throughput is reported on stderr as the run progresses; --stats adds equity
+counters and per-phase times at the end, and --profile FILE writes a cProfile
+and tracemalloc report of the whole run.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from equity.cache import EquityCache
+from equity.equity_calc import BACKENDS, EquityCalculator
+from equity.stats import profiled
+from evaluator.evaluator import category_name, rank_showdown
+from evaluator.hand import Card
+
+try:
+    import numpy as np
+    from evaluator.batch import showdowns
+except ImportError:
+    np = None
+
+STREETS = {"preflop": 0, "flop": 3, "turn": 4, "river": 5}
+CSV_FIELDS = ["id", "hands", "ranks", "winners", "equity", "stderr", "exact", "error"]
+
+
+class HandRecord(NamedTuple):
+    id: str
+    hero: List[str]
+    villains: List[List[str]]
+    board: List[str]
+    allin: Optional[str]
+
+
+def read_records(stream, fmt: str) -> Iterator[Union[dict, str]]:
+    """Yield raw records one at a time: CSV rows as dicts, JSONL lines as text."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _cards(value) -> List[str]:
+    return value.split() if isinstance(value, str) else list(value or [])
+
+
+def parse_record(raw: Union[dict, str], number: int, default_allin: Optional[str] = None) -> HandRecord:
+    """
+    Normalize a raw record (a JSON line or a CSV row; cards as lists or as
+    space/pipe-separated strings).
+
+    Raises:
+        ValueError: If the record is not valid JSON, the cards are malformed or
+                    duplicated, or the street is unknown
+    """
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(raw, dict):
+        raise ValueError("Record must be an object")
+    villains = raw.get("villains") or []
+    if isinstance(villains, str):
+        villains = [v for v in villains.split("|") if v.strip()]
+    record = HandRecord(
+        id=str(raw.get("id") or number),
+        hero=_cards(raw.get("hero")),
+        villains=[_cards(v) for v in villains],
+        board=_cards(raw.get("board")),
+        allin=raw.get("allin") or default_allin,
+    )
+    if len(record.hero) != 2 or not record.villains or any(len(v) != 2 for v in record.villains):
+        raise ValueError("Every player must have exactly 2 cards")
+    if len(record.board) not in STREETS.values():
+        raise ValueError("Board must have 0, 3, 4 or 5 cards")
+    if record.allin is not None and record.allin not in STREETS:
+        raise ValueError(f"Unknown all-in street: {record.allin}")
+    if record.allin is not None and len(record.board) < STREETS[record.allin]:
+        raise ValueError(f"Board has {len(record.board)} cards, too few for an all-in on the {record.allin}")
+    cards = record.hero + [c for v in record.villains for c in v] + record.board
+    try:
+        ids = {Card.from_str(c).id for c in cards}
+    except ValueError as e:
+        raise ValueError(f"Invalid card format: {str(e)}")
+    if len(ids) != len(cards):
+        raise ValueError("Duplicate cards detected")
+    return record
+
+
+def parse_records(raws: Iterable[Union[dict, str]], default_allin: Optional[str] = None) -> Iterator[tuple]:
+    """Yield (record, None) for good records and (line number, error) for bad ones."""
+    for number, raw in enumerate(raws, 1):
+        try:
+            yield parse_record(raw, number, default_allin), None
+        except (ValueError, TypeError, AttributeError) as e:
+            yield str(number), str(e)
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Consecutive lists of up to size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _settle(records: List[HandRecord]) -> List[List[int]]:
+    """Ranks of every player in every complete showdown, in one array call per table size."""
+    ranks = [None] * len(records)
+    by_size = {}
+    for i, record in enumerate(records):
+        by_size.setdefault(len(record.villains) + 1, []).append(i)
+    for players, indexes in by_size.items():
+        rows = []
+        for i in indexes:
+            record = records[i]
+            board = [Card.from_str(c).id for c in record.board]
+            holes = [[Card.from_str(c).id for c in hole] for hole in [record.hero] + record.villains]
+            rows.append([hole + board for hole in holes])
+        if np is not None:
+            table, _ = showdowns(np.array(rows, dtype=np.uint8))
+            settled = table.tolist()
+        else:
+            settled = [rank_showdown(row[0][2:], [c for hand in row for c in hand[:2]]) for row in rows]
+        for i, player_ranks in zip(indexes, settled):
+            ranks[i] = player_ranks
+    return ranks
+
+
+def score_batch(batch: List[tuple], calc: EquityCalculator, args) -> List[dict]:
+    """Settle showdowns and compute all-in equities for one batch of parsed records."""
+    complete = [i for i, (r, error) in enumerate(batch) if error is None and len(r.board) == 5]
+    settled = dict(zip(complete, _settle([batch[i][0] for i in complete]))) if complete else {}
+
+    results = []
+    for i, (record, error) in enumerate(batch):
+        if error is not None:
+            results.append({"id": record, "error": error})
+            continue
+        result = {"id": record.id}
+        ranks = settled.get(i)
+        if ranks is not None:
+            best = max(ranks)
+            result["hands"] = [category_name(r) for r in ranks]
+            result["ranks"] = ranks
+            result["winners"] = [p for p, r in enumerate(ranks) if r == best]
+        if record.allin is not None:
+            known = record.board[:STREETS[record.allin]]
+            try:
+                estimate = calc.estimate_equity(record.hero, record.villains, known or None,
+                                                num_simulations=args.simulations, seed=args.seed)
+            except ValueError as e:
+                result["error"] = str(e)
+            else:
+                result["equity"] = [round(e, 4) for e in estimate.equities]
+                result["stderr"] = [round(e, 4) for e in estimate.stderr]
+                result["exact"] = estimate.exact
+        results.append(result)
+    return results
+
+
+class ResultWriter:
+    def __init__(self, stream, fmt: str):
+        """Incremental JSONL or CSV output (lists are joined with '|' in CSV)."""
+        self.stream = stream
+        self.fmt = fmt
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(stream, CSV_FIELDS, extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, results: List[dict]):
+        for result in results:
+            if self.csv is None:
+                self.stream.write(json.dumps(result) + "\n")
+            else:
+                self.csv.writerow({k: "|".join(map(str, v)) if isinstance(v, list) else v
+                                   for k, v in result.items()})
+        self.stream.flush()
+
+
+class Throughput:
+    def __init__(self, every: float, stream=sys.stderr):
+        """Progress on stderr at most once per `every` seconds, and a final summary."""
+        self.every = every
+        self.stream = stream
+        self.start = self.last = time.perf_counter()
+        self.records = 0
+        self.showdowns = 0
+        self.errors = 0
+
+    def add(self, results: List[dict]):
+        self.records += len(results)
+        self.showdowns += sum(1 for r in results if "winners" in r)
+        self.errors += sum(1 for r in results if "error" in r)
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report(now)
+
+    def report(self, now: Optional[float] = None, final: bool = False):
+        elapsed = max((now or time.perf_counter()) - self.start, 1e-9)
+        print(f"{'Done: ' if final else ''}{self.records} records ({self.showdowns} showdowns, "
+              f"{self.errors} errors) in {elapsed:.1f}s, {self.records / elapsed:.0f} records/s",
+              file=self.stream)
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream hand records and score showdowns and all-in equity")
+    parser.add_argument("input", help="JSONL or CSV file of hand records ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout, the default)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from the extension)")
+    parser.add_argument("--output-format", choices=["jsonl", "csv"], help="output format (default: from the extension)")
+    parser.add_argument("--allin", choices=list(STREETS), help="all-in street for records that do not give one")
+    parser.add_argument("--simulations", type=int, default=10000, help="Monte Carlo trials per equity")
+    parser.add_argument("--seed", type=int, help="seed for reproducible equities")
+    parser.add_argument("--backend", choices=BACKENDS, default="python")
+    parser.add_argument("--cache", help="sqlite file caching equities across runs")
+    parser.add_argument("--batch-size", type=int, default=4096, help="records held in memory at once")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between progress lines (0: off)")
+    parser.add_argument("--stats", action="store_true", help="print equity phase timings and counters at the end")
+    parser.add_argument("--profile", metavar="FILE", help="run under cProfile and tracemalloc and write a report")
+    args = parser.parse_args(argv)
+
+    in_format = _detect_format(args.input, args.format)
+    out_format = _detect_format(args.output, args.output_format)
+    source = sys.stdin if args.input == "-" else open(args.input, newline="" if in_format == "csv" else None)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", newline="" if out_format == "csv" else None)
+    cache = EquityCache(args.cache) if args.cache else None
+    calc = EquityCalculator(backend=args.backend, cache=cache, instrument=args.stats)
+    writer = ResultWriter(sink, out_format)
+    throughput = Throughput(args.report_every)
+    profiler = profiled(args.profile) if args.profile else nullcontext()
+    try:
+        with profiler:
+            parsed = parse_records(read_records(source, in_format), args.allin)
+            for batch in batched(parsed, args.batch_size):
+                results = score_batch(batch, calc, args)
+                writer.write(results)
+                throughput.add(results)
+    finally:
+        throughput.report(final=True)
+        if calc.stats is not None:
+            print(calc.stats.report(), file=sys.stderr)
+        calc.close()
+        if cache is not None:
+            cache.close()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
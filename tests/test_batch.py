@@ -0,0 +1,59 @@
+import random
+import unittest
+from evaluator.evaluator import rank_ids
+
+try:
+    import numpy as np
+    from evaluator.batch import as_hands, rank_hands, showdowns
+except ImportError:
+    np = None
+
+
+def deal_showdowns(rng, num_showdowns, num_players):
+    rows = []
+    for _ in range(num_showdowns):
+        cards = rng.sample(range(52), 5 + 2 * num_players)
+        rows.append([cards[5 + 2 * p:7 + 2 * p] + cards[:5] for p in range(num_players)])
+    return rows
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestBatchEvaluation(unittest.TestCase):
+    def test_ranks_and_winners_match_scalar_evaluator(self):
+        rows = deal_showdowns(random.Random(5), 3000, 4)
+        ranks, winners = showdowns(np.array(rows, dtype=np.int16), block_size=512)
+        self.assertEqual(ranks.shape, (3000, 4))
+        for i, row in enumerate(rows):
+            expected = [rank_ids(hand) for hand in row]
+            self.assertEqual(ranks[i].tolist(), expected)
+            self.assertEqual(int(winners[i]), sum(1 << p for p, r in enumerate(expected) if r == max(expected)))
+
+    def test_packed_buffer_is_not_copied(self):
+        rows = deal_showdowns(random.Random(9), 100, 3)
+        packed = bytearray(card for row in rows for hand in row for card in hand)
+        view = memoryview(packed)
+        self.assertTrue(np.shares_memory(as_hands(view, 3), np.frombuffer(packed, dtype=np.uint8)))
+        ranks, winners = showdowns(view, num_players=3)
+        expected_ranks, expected_winners = showdowns(np.array(rows))
+        self.assertTrue((ranks == expected_ranks).all())
+        self.assertTrue((winners == expected_winners).all())
+        self.assertEqual(rank_hands(bytes(packed[:7])).tolist(), rank_ids(rows[0][0]))
+
+    def test_split_pot_sets_every_winner(self):
+        board = [0, 5, 22, 39, 50]  # 2s 3h 7d Jc Ad
+        ranks, winners = showdowns([[[48, 49] + board, [44, 45] + board, [46, 47] + board]])
+        self.assertEqual(int(winners[0]), 0b001)
+        ranks, winners = showdowns([[[8, 13] + board, [9, 12] + board]])
+        self.assertEqual(int(winners[0]), 0b11)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            showdowns(bytes(range(20)), num_players=2)
+        with self.assertRaises(ValueError):
+            rank_hands([[0, 1, 2, 3, 4, 5, 52]])
+        with self.assertRaises(ValueError):
+            rank_hands([[0, 1, 2, 3, 4, 5]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks import regression
+
+
+class TestRegressionSuite(unittest.TestCase):
+    def test_cases_cover_the_hot_paths(self):
+        names = {case.name for case in regression.cases()}
+        for expected in ["evaluate_5", "best_hand", "compare_hands_2p", "compare_hands_9p",
+                         "setup_and_deal_turn_6p", "calculate_equity_preflop_2p",
+                         "calculate_equity_flop_6p", "calculate_equity_turn_9p"]:
+            self.assertIn(expected, names)
+
+    def test_measure_and_compare(self):
+        """A case slower than the baseline by more than the threshold is reported"""
+        case = regression.Case("sum", "hands/s", 1000, lambda: sum(range(1000)))
+        result = regression.measure(case, repeats=1, min_time=0.001)
+        self.assertGreater(result["rate"], 0)
+        self.assertGreaterEqual(result["peak_kib"], 0)
+
+        report = {"results": {"a": {"unit": "hands/s", "rate": 70}, "b": {"unit": "hands/s", "rate": 90},
+                              "new": {"unit": "hands/s", "rate": 1}}}
+        baseline = {"results": {"a": {"rate": 100}, "b": {"rate": 100}}}
+        regressions = regression.compare(report, baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("a:"))
+
+    def test_compare_relative_speeds(self):
+        """Where both sides record relative speeds, a uniformly slower machine is no regression"""
+        result = regression.measure(regression.Case("sum", "hands/s", 1000, lambda: sum(range(1000))),
+                                    repeats=3, min_time=0.001)
+        self.assertGreater(result["relative"], 0)
+
+        report = {"implementation": "CPython", "python": "3.11.7",
+                  "results": {"a": {"unit": "hands/s", "rate": 50, "relative": 1.0},
+                              "b": {"unit": "hands/s", "rate": 50, "relative": 0.7}}}
+        baseline = {"implementation": "CPython", "python": "3.11.2",
+                    "results": {"a": {"rate": 100, "relative": 1.0}, "b": {"rate": 100, "relative": 1.0}}}
+        regressions = regression.compare(report, baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("b:"))
+        self.assertIsNone(regression.foreign(report, baseline))
+
+        # Another interpreter, or absolute rates only, is a warning instead
+        self.assertIsNotNone(regression.foreign(report, dict(baseline, python="3.12.1")))
+        self.assertIsNotNone(regression.foreign(report, dict(baseline, implementation="PyPy")))
+        self.assertIsNotNone(regression.foreign(report, {"implementation": "CPython", "python": "3.11.7",
+                                                         "results": {"a": {"rate": 100}}}))
+
+    def test_main_saves_and_checks_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            options = ["--baseline", path, "--filter", "compare_hands_2p", "--repeats", "1", "--min-time", "0.01"]
+            self.assertEqual(regression.main(options + ["--save"]), 0)
+            self.assertTrue(os.path.exists(path))
+            # A generous threshold cannot fail on timing noise
+            self.assertEqual(regression.main(options + ["--threshold", "0.99"]), 0)
+            # A baseline from another interpreter cannot fail the run
+            with open(path) as f:
+                baseline = json.load(f)
+            baseline["implementation"] = "other"
+            for result in baseline["results"].values():
+                result["relative"] *= 100
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            self.assertEqual(regression.main(options), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
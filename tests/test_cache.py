@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from equity.cache import EquityCache
+from itertools import combinations
+from equity.canonical import (canonical_flops, canonicalize, flush_suits, runout_classes, runout_orbits,
+                              suit_symmetries)
+from equity.equity_calc import EquityCalculator
+from equity.ranges import HandRange
+from equity.result import EquityResult
+from evaluator.evaluator import rank_showdown
+from evaluator.hand import Card
+
+
+def ids(cards):
+    return [Card.from_str(c).id for c in cards]
+
+
+class TestCanonicalize(unittest.TestCase):
+    def test_suit_relabelling_and_villain_order(self):
+        """Isomorphic situations share a key, different ones do not"""
+        a = canonicalize(ids(["Ah", "Kh"]), [ids(["Qs", "Qd"]), ids(["Jc", "Tc"])], ids(["7h", "8h", "9c"]))
+        b = canonicalize(ids(["As", "Ks"]), [ids(["Td", "Jd"]), ids(["Qh", "Qc"])], ids(["9d", "8s", "7s"]))
+        c = canonicalize(ids(["As", "Ks"]), [ids(["Td", "Jd"]), ids(["Qh", "Qc"])], ids(["9s", "8s", "7s"]))
+        self.assertEqual(a.key, b.key)
+        self.assertNotEqual(a.key, c.key)
+        self.assertEqual(sorted(a.villain_order), [0, 1])
+        self.assertNotEqual(a.villain_order, b.villain_order)
+
+    def test_ranges(self):
+        hero = ids(["Ah", "Kh"])
+        first = canonicalize(hero, [HandRange.parse("AsQs, KK").compile(0)], [])
+        second = canonicalize(ids(["Ad", "Kd"]), [HandRange.parse("AcQc, KK").compile(0)], [])
+        third = canonicalize(hero, [HandRange.parse("AhQh, KK").compile(0)], [])
+        self.assertEqual(first.key, second.key)
+        self.assertNotEqual(first.key, third.key)
+
+    def test_canonical_flops(self):
+        flops = canonical_flops()
+        self.assertEqual(len(flops), 1755)
+        self.assertEqual(sum(count for _, count in flops), 22100)
+        # Trips (no suit repeats): 4 flops per rank; monotone: 4 per rank set
+        counts = dict(flops)
+        self.assertEqual(counts[(0, 1, 2)], 4)
+        self.assertEqual(counts[(0, 4, 8)], 4)
+
+    def test_runout_classes(self):
+        """Classes partition the runouts, and every member ranks each player the same"""
+        holes = ids(["As", "Kh", "Qd", "Qc", "9h", "8h"])
+        for board in (["7h", "8s", "2c"], ["7h", "6h", "2c"], ["7d", "8d", "2d"], ["7h", "8s", "2c", "Jd"]):
+            board = ids(board)
+            num_cards = 5 - len(board)
+            suits = flush_suits(holes, board, num_cards)
+            live = [c for c in range(52) if c not in holes + board]
+            classes = runout_classes(live, num_cards, suits)
+            self.assertEqual(sorted(r for members in classes for r in members),
+                             list(combinations(live, num_cards)))
+            for members in classes:
+                ranks = {tuple(rank_showdown(board + list(r), holes)) for r in members}
+                self.assertEqual(len(ranks), 1)
+        self.assertEqual(flush_suits(holes, ids(["7h", "8s", "2c"]), 2), 0b0010)
+        self.assertEqual(len(runout_classes(list(range(52)), 2, 0)), 91)
+
+    def test_suit_symmetries(self):
+        """Orbits partition the runouts, and every member ranks each player the same"""
+        full = HandRange.parse("QQ+, AK").compile(0)
+        self.assertEqual(len(suit_symmetries([], [], [full])), 24)
+        self.assertEqual(len(suit_symmetries([], ids(["2s", "7s", "9s"]), [full])), 6)
+        self.assertEqual(len(suit_symmetries([], ids(["2s", "7s", "9h"]), [full])), 2)
+        self.assertEqual(len(suit_symmetries([], [], [HandRange.parse("QQ+, AhKh")])), 6)
+        holes = ids(["As", "Ks", "Qh", "Qd"])
+        maps = suit_symmetries(holes, [])
+        self.assertEqual(len(maps), 2)
+        live = [c for c in range(52) if c not in holes + ids(["2c"])]
+        orbits = list(runout_orbits(live, 3, maps))
+        self.assertEqual(sum(count for _, count in orbits), len(list(combinations(live, 3))))
+        for runout, count in orbits[:200]:
+            images = {tuple(sorted(m[c] for c in runout)) for m in maps}
+            self.assertEqual(len(images), count)
+            ranks = {tuple(rank_showdown(ids(["2c"]) + list(r), holes)) for r in images}
+            self.assertEqual(len(ranks), 1)
+        # Merged classes still partition the runouts and rank alike
+        board = ids(["2c", "7c", "8s"])
+        live = [c for c in range(52) if c not in holes + board]
+        self.assertEqual(len(suit_symmetries(holes, board)), 2)
+        for suits in (flush_suits(holes, board, 2), 0b1111):
+            classes = runout_classes(live, 2, suits, maps)
+            self.assertEqual(sorted(r for members in classes for r in members),
+                             list(combinations(live, 2)))
+            for members in classes:
+                ranks = {tuple(rank_showdown(board + list(r), holes)) for r in members}
+                self.assertEqual(len(ranks), 1)
+        self.assertEqual(len(runout_classes(live, 2, 0b1111, maps)), len(list(runout_orbits(live, 2, maps))))
+
+    def test_flop_enumeration_dedup_is_exact(self):
+        calc = EquityCalculator()
+        plain = EquityCalculator()
+        plain._runout_classes = lambda holes, board, remaining, card_maps=None: (
+            [r] for r in combinations(remaining, 5 - len(board)))
+        for board in (["7h", "8s", "2d"], ["7h", "8h", "2h"]):
+            args = (["Ah", "Kh"], [["Qs", "Qd"], "JJ+, 76s", ["4d", "5d"]], board)
+            for got, want in zip(calc.calculate_equity(*args, exact=True),
+                                 plain.calculate_equity(*args, exact=True)):
+                self.assertAlmostEqual(got, want)
+
+
+class TestEquityCache(unittest.TestCase):
+    def test_isomorphic_queries_hit(self):
+        calc = EquityCalculator(cache=EquityCache())
+        first = calc.calculate_equity(["Ah", "Kh"], [["Qs", "Qd"], ["Jc", "Tc"]], ["7h", "8h", "9c"])
+        second = calc.calculate_equity(["As", "Ks"], [["Td", "Jd"], ["Qh", "Qc"]], ["9d", "8s", "7s"])
+        self.assertEqual(calc.cache.hits, 1)
+        self.assertEqual(second, [first[0], first[2], first[1]])
+
+    def test_precision_tags(self):
+        """Exact entries satisfy sampling requests but not the other way round"""
+        cache = EquityCache()
+        sampled = EquityResult([55.0, 45.0], [0.5, 0.5], 5000, False)
+        cache.put("k", sampled)
+        self.assertIsNotNone(cache.get("k", num_simulations=5000))
+        self.assertIsNone(cache.get("k", num_simulations=10000))
+        self.assertIsNotNone(cache.get("k", target_stderr=0.5))
+        self.assertIsNone(cache.get("k", target_stderr=0.1))
+        self.assertIsNone(cache.get("k", exact=True))
+        cache.put("k", EquityResult([55.05, 44.95], [0.0, 0.0], 990, True))
+        self.assertTrue(cache.get("k", exact=True).exact)
+        cache.put("k", sampled)
+        self.assertTrue(cache.get("k", num_simulations=5000).exact)
+
+    def test_lru_eviction(self):
+        cache = EquityCache(max_entries=2)
+        for key in "abc":
+            cache.put(key, EquityResult([50.0, 50.0], [0.0, 0.0], 1, True))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_disk_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "equity.sqlite")
+            calc = EquityCalculator(cache=EquityCache(path))
+            expected = calc.calculate_equity(["Ah", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c", "2s"])
+            calc.cache.close()
+
+            restarted = EquityCalculator(cache=EquityCache(path))
+            result = restarted.calculate_equity(["Ad", "Kd"], [["Qs", "Qh"]], ["7d", "8d", "9c", "2s"])
+            self.assertEqual(restarted.cache.hits, 1)
+            self.assertEqual(result, expected)
+            restarted.cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import patch
+from equity.distribution import Histograms, bucket
+from equity.equity_calc import EquityCalculator
+from equity.pots import SidePots
+from evaluator.hand import Card
+
+try:
+    import numpy as np
+    from equity.distribution import cluster_flops, flop_features
+except ImportError:
+    np = None
+
+
+def ids(cards):
+    return [Card.from_str(c).id for c in cards]
+
+
+class TestHistograms(unittest.TestCase):
+    def test_river_showdown(self):
+        """One showdown: every player's category and pot-share bucket is certain"""
+        calc = EquityCalculator()
+        result = calc.estimate_equity(["As", "Ad"], [["Ks", "Kd"], ["Kh", "Kc"]],
+                                      ["2c", "7h", "8d", "Jd", "Ac"], buckets=4)
+        hero, first, second = result.distributions
+        self.assertEqual(hero.by_category()["Three of a Kind"], 1.0)
+        self.assertEqual(hero.equity, [0.0, 0.0, 0.0, 1.0])
+        self.assertEqual(first.by_category()["One Pair"], 1.0)
+        self.assertEqual(first.equity, [1.0, 0.0, 0.0, 0.0])
+        self.assertEqual(bucket(0.5, 4), 2)
+        self.assertEqual(bucket(1.0, 4), 3)
+
+    def test_simulation_agrees_with_enumeration(self):
+        calc = EquityCalculator()
+        args = (["As", "Kh"], [["Qs", "Qd"], "22+, AT+"], ["7h", "8h", "9c"])
+        exact = calc.estimate_equity(*args, exact=True, buckets=5)
+        sampled = calc.estimate_equity(*args, exact=False, num_simulations=20000, seed=2, buckets=5)
+        for want, got in zip(exact.distributions, sampled.distributions):
+            self.assertAlmostEqual(sum(got.categories), 1.0)
+            self.assertAlmostEqual(sum(got.equity), 1.0)
+            for p, q in zip(want.categories + want.equity, got.categories + got.equity):
+                self.assertLess(abs(p - q), 0.02)
+        # Without buckets nothing is collected
+        self.assertIsNone(calc.estimate_equity(*args, exact=True).distributions)
+
+    def test_merge(self):
+        a, b = Histograms(2, 3), Histograms(2, 3)
+        a.add_trial([5, 9], 1.0)
+        b.add_trial([7, 7], 2.0)
+        a.merge(b)
+        self.assertEqual(a.weight, 3.0)
+        self.assertEqual(a.equity, [[1.0, 2.0, 0.0], [0.0, 2.0, 1.0]])
+
+    def test_side_pots_settled_once(self):
+        """With side pots, histograms take the shares the trial already settled"""
+        h = Histograms(3, 4)
+        h.add_trial([5, 9, 7], 1.0, [(1, 0.25), (2, 0.75)])
+        self.assertEqual(h.equity, [[1.0, 0, 0, 0], [0, 1.0, 0, 0], [0, 0, 0, 1.0]])
+
+        args = (["As", "Kh"], [["Qs", "Qd"], ["7c", "7d"]], ["7h", "8h", "2c"])
+        calc = EquityCalculator()
+        for exact in (True, False):
+            calls = []
+            for buckets in (0, 4):
+                with patch.object(SidePots, "split", autospec=True, side_effect=SidePots.split) as split:
+                    calc.estimate_equity(*args, contributions=[100, 300, 50], exact=exact,
+                                         num_simulations=500, seed=1, buckets=buckets)
+                calls.append(split.call_count)
+            self.assertGreater(calls[0], 0)
+            self.assertEqual(calls[0], calls[1])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_backend(self):
+        args = (["As", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c"])
+        exact = EquityCalculator().estimate_equity(*args, exact=True, buckets=5)
+        sampled = EquityCalculator(backend="numpy").estimate_equity(
+            *args, exact=False, num_simulations=100000, seed=1, buckets=5)
+        for want, got in zip(exact.distributions, sampled.distributions):
+            for p, q in zip(want.categories + want.equity, got.categories + got.equity):
+                self.assertLess(abs(p - q), 0.01)
+
+    def test_grid_distributions(self):
+        grid = EquityCalculator().range_equity("QQ+, AK", ["7h", "8h", "9c", "2d"], buckets=5)
+        for equity, distribution in zip(grid.equities, grid.distributions):
+            self.assertAlmostEqual(sum(distribution.categories), 1.0)
+            self.assertAlmostEqual(sum(distribution.equity), 1.0)
+            # The mean equity lies within the occupied buckets
+            occupied = [i for i, p in enumerate(distribution.equity) if p > 0]
+            self.assertGreaterEqual(equity, occupied[0] * 20)
+            self.assertLessEqual(equity, (occupied[-1] + 1) * 20)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestFlopClusters(unittest.TestCase):
+    def test_features(self):
+        flops = [ids(f) for f in (["As", "Ks", "Qs"], ["2c", "7d", "Jh"], ["8h", "8d", "8c"])]
+        features = flop_features(flops, buckets=10, runouts=16, seed=1)
+        self.assertEqual(features.shape, (3, 19))
+        self.assertTrue(np.allclose(features[:, 9], 1.0))
+        self.assertTrue(np.allclose(features[:, 10:].sum(axis=1), 1.0))
+        # Trips on board: nobody is left with a high card
+        self.assertEqual(features[2, 10], 0.0)
+        # Monotone: flushes are common
+        self.assertGreater(features[0, 15], features[1, 15])
+
+    def test_cluster_flops(self):
+        flops = [ids([a + "s", b + "s", c + "s"]) for a, b, c in ("AKQ", "T98", "742", "J52")]
+        flops += [ids([r + "s", r + "h", r + "d"]) for r in "AT72"]
+        flops += [ids([a + "s", b + "h", c + "d"]) for a, b, c in ("AK2", "J73", "Q84", "K92")]
+        clusters = cluster_flops(k=3, flops=flops, runouts=24, seed=5)
+        self.assertEqual(len(clusters.labels), 12)
+        self.assertEqual(clusters.centers.shape, (3, 19))
+        labels = clusters.labels.tolist()
+        # Monotone flops and trips flops end up in different clusters
+        self.assertEqual(len(set(labels[:4])), 1)
+        self.assertEqual(len(set(labels[4:8])), 1)
+        self.assertNotEqual(labels[0], labels[4])
+        self.assertEqual(sum(len(clusters.members(c)) for c in range(3)), 12)
+        with self.assertRaises(ValueError):
+            cluster_flops(k=20, flops=flops)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,14 @@
+import os
+import random
+import statistics
+import tempfile
 import unittest
+from itertools import combinations
+from board_setup.board_setup import BoardSetup, Dealer
+from equity.cache import EquityCache
 from equity.equity_calc import EquityCalculator
+from equity.stats import profiled
+from evaluator.hand import CARD_MASKS, Card
 
 
 class TestEquityCalculator(unittest.TestCase):
@@ -21,22 +30,22 @@ class TestEquityCalculator(unittest.TestCase):
         hero = ["Ah", "Kh"]
         villain = [["Qs", "Qd"]]
         board = ["7h", "8h", "9c"]
-        equity = self.calc.calculate_equity(hero, villain, board, num_simulations=5000)
+        equity = self.calc.calculate_equity(hero, villain, board)
         print("Flush draw equity:", equity)
-        # Flush draw with overcards is a much bigger favorite in this scenario (AKh has 2 overcards + nut flush draw)
-        self.assertTrue(60 <= equity[0] <= 70)
-        self.assertTrue(30 <= equity[1] <= 40)
+        # All 990 turn/river runouts are enumerated: AKh wins 545 of them
+        self.assertAlmostEqual(equity[0], 100 * 545 / 990)
+        self.assertAlmostEqual(equity[1], 100 * 445 / 990)
 
     def test_made_flush_vs_overpair(self):
         """Test made flush vs overpair"""
         hero = ["Ah", "Kh"]
         villain = [["Qs", "Qd"]]
         board = ["7h", "8h", "9h"]
-        equity = self.calc.calculate_equity(hero, villain, board, num_simulations=5000)
+        equity = self.calc.calculate_equity(hero, villain, board)
         print("Made flush vs overpair equity:", equity)
-        # Made flush should be over 90% favorite
-        self.assertTrue(equity[0] >= 88)
-        self.assertTrue(equity[1] <= 12)
+        # QQ only wins by filling up, making quads or the Qh straight flush
+        self.assertAlmostEqual(equity[0], 100 * 960.5 / 990)
+        self.assertAlmostEqual(equity[1], 100 * 29.5 / 990)
 
     def test_multiway_pot(self):
         """Test AA vs KK vs QQ preflop"""
@@ -66,24 +75,161 @@ class TestEquityCalculator(unittest.TestCase):
         hero = ["Ah", "Kh"]
         villain = [["Qs", "Qd"]]
         board = ["7h", "8h", "9c", "2s"]
-        equity = self.calc.calculate_equity(hero, villain, board, num_simulations=5000)
+        equity = self.calc.calculate_equity(hero, villain, board)
         print("Turn equity:", equity)
-        # Verify equity calculation works with 4 board cards
-        self.assertTrue(0 <= equity[0] <= 100)
-        self.assertTrue(0 <= equity[1] <= 100)
-        self.assertAlmostEqual(sum(equity), 100, delta=0.1)
+        # 9 hearts + 3 aces + 3 kings win for AKh out of 44 rivers
+        self.assertAlmostEqual(equity[0], 100 * 15 / 44)
+        self.assertAlmostEqual(equity[1], 100 * 29 / 44)
 
     def test_river_equity(self):
         """Test equity calculation on the river"""
         hero = ["Ah", "Kh"]
         villain = [["Qs", "Qd"]]
         board = ["7h", "8h", "9c", "2s", "3d"]
-        equity = self.calc.calculate_equity(hero, villain, board, num_simulations=1)
+        equity = self.calc.calculate_equity(hero, villain, board)
         print("River equity:", equity)
-        # On river, equity should be either 0 or 100 for each player
-        self.assertTrue(equity[0] in [0, 100])
-        self.assertTrue(equity[1] in [0, 100])
-        self.assertAlmostEqual(sum(equity), 100, delta=0.1)
+        # The single runout is already known: QQ wins outright
+        self.assertEqual(equity, [0.0, 100.0])
+
+    def test_exact_enumeration_matches_sampling(self):
+        """Sampled flop equity converges on the enumerated value"""
+        hero = ["Ah", "Kh"]
+        villain = [["Qs", "Qd"]]
+        board = ["7h", "8h", "9c"]
+        exact = self.calc.calculate_equity(hero, villain, board, exact=True)
+        sampled = self.calc.calculate_equity(hero, villain, board, num_simulations=5000, exact=False)
+        self.assertAlmostEqual(sampled[0], exact[0], delta=3)
+        self.assertEqual(exact, self.calc.calculate_equity(hero, villain, board))
+
+    def test_enumeration_budget(self):
+        """Auto mode samples once the runout count exceeds the budget"""
+        hero = ["Ah", "Kh"]
+        villain = [["Qs", "Qd"]]
+        board = ["7h", "8h", "9c"]
+        exact = self.calc.calculate_equity(hero, villain, board)
+        sampled = self.calc.calculate_equity(hero, villain, board, num_simulations=200,
+                                             max_enumerations=500)
+        self.assertAlmostEqual(sum(sampled), 100, delta=0.1)
+        self.assertNotEqual(sampled, exact)
+
+    def test_seeded_simulation_is_reproducible(self):
+        """A seed fixes the result, whatever the worker count"""
+        hero = ["As", "Ac"]
+        villain = [["Ks", "Kc"]]
+        first = self.calc.calculate_equity(hero, villain, num_simulations=5000, seed=11)
+        again = self.calc.calculate_equity(hero, villain, num_simulations=5000, seed=11)
+        other = self.calc.calculate_equity(hero, villain, num_simulations=5000, seed=12)
+        with EquityCalculator() as calc:
+            parallel = calc.calculate_equity(hero, villain, num_simulations=5000, seed=11, workers=2)
+        self.assertEqual(first, again)
+        self.assertEqual(first, parallel)
+        self.assertNotEqual(first, other)
+
+    def test_target_stderr_stops_early(self):
+        """Adaptive mode stops once the interval is tight and reports it"""
+        hero = ["As", "Ac"]
+        villain = [["Ks", "Kc"]]
+        result = self.calc.estimate_equity(hero, villain, target_stderr=0.5, seed=4)
+        self.assertFalse(result.exact)
+        self.assertLess(result.trials, 20000)
+        self.assertTrue(all(err <= 0.5 for err in result.stderr))
+        low, high = result.confidence_intervals()[0]
+        self.assertTrue(low < result.equities[0] < high)
+        self.assertTrue(low < 82.6 < high)
+        capped = self.calc.estimate_equity(hero, villain, target_stderr=0.01,
+                                           max_simulations=3000, seed=3)
+        self.assertEqual(capped.trials, 3000)
+
+    def test_exact_result_has_no_error(self):
+        result = self.calc.estimate_equity(["Ah", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c", "2s"])
+        self.assertTrue(result.exact)
+        self.assertEqual(result.trials, 44)
+        self.assertEqual(result.stderr, [0.0, 0.0])
+
+    def test_sampling_strategies_cover_runouts(self):
+        """Each strategy deals valid completions; without_replacement visits each runout once"""
+        setup = BoardSetup()
+        live = list(range(20, 32))
+        everything = set(combinations(live, 2))
+        for strategy in ("random", "stratified", "without_replacement", "quasi"):
+            runouts = list(setup.runouts(live, 2, len(everything), strategy, random.Random(1)))
+            self.assertTrue(all(len(set(r)) == 2 and set(r) <= set(live) for r in runouts))
+            if strategy == "without_replacement":
+                self.assertEqual({tuple(sorted(r)) for r in runouts}, everything)
+        firsts = [r[0] for r in setup.runouts(live, 3, 2 * len(live), "stratified", random.Random(2))]
+        self.assertEqual(sorted(firsts), sorted(live * 2))
+
+    def test_instrumentation(self):
+        """Instrumented queries count their work, time their phases and report to the callback"""
+        self.assertIsNone(self.calc.estimate_equity(["As", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c"]).stats)
+        reported = []
+        calc = EquityCalculator(cache=EquityCache(), on_stats=reported.append)
+        calc.preflop_table = None
+        result = calc.estimate_equity(["As", "Kh"], [["Qs", "Qd"], "JJ+"], num_simulations=3000, seed=1)
+        stats = result.stats
+        self.assertEqual((stats.queries, stats.trials, stats.cache_misses), (1, 3000, 1))
+        self.assertLessEqual(stats.evaluations, 3 * 3000)
+        self.assertGreater(stats.evaluations, 2 * 3000)
+        for phase in ("parse", "lookup", "simulate", "deal", "evaluate", "aggregate", "store"):
+            self.assertGreater(stats.seconds[phase], 0)
+        calc.estimate_equity(["As", "Kh"], [["Qs", "Qd"], "JJ+"], num_simulations=3000, seed=1)
+        calc.estimate_equity(["As", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c"])
+        self.assertEqual(reported[0], stats)
+        self.assertEqual(reported[1].cache_hits, 1)
+        self.assertEqual(reported[2].evaluations, 2 * 990)
+        self.assertIn("enumerate", reported[2].seconds)
+        self.assertEqual((calc.stats.queries, calc.stats.cache_hits, calc.stats.trials), (3, 1, 3990))
+
+    def test_profiled_writes_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.txt")
+            with profiled(path, limit=5):
+                self.calc.calculate_equity(["As", "Kh"], [["Qs", "Qd"]], ["7h", "8h", "9c"])
+            with open(path) as f:
+                report = f.read()
+        self.assertIn("_enumerate", report)
+        self.assertIn("KiB peak", report)
+
+    def test_dealer_reuses_its_buffer(self):
+        """Dealer deals distinct live cards in place, passes over skipped ones, and stays uniform"""
+        live = list(range(10, 22))
+        dealer = Dealer(live)
+        board = [0, 1, 0, 0, 0]
+        rng = random.Random(5)
+        skip = CARD_MASKS[12] | CARD_MASKS[13]
+        counts = dict.fromkeys(live, 0)
+        for _ in range(3000):
+            dealer.deal_into(board, 2, 3, rng, skip_mask=skip)
+            self.assertEqual(board[:2], [0, 1])
+            self.assertEqual(len(set(board[2:])), 3)
+            self.assertFalse({12, 13} & set(board[2:]))
+            for c in board[2:]:
+                counts[c] += 1
+        self.assertEqual(sorted(dealer.cards), live)
+        self.assertTrue(all(800 < counts[c] < 1000 for c in live if c not in (12, 13)))
+        with self.assertRaises(ValueError):
+            dealer.deal_into([0] * 11, 0, 11, rng, skip_mask=skip)
+
+    def test_variance_reduced_sampling(self):
+        """Strategies stay unbiased and cut the spread of repeated estimates"""
+        hero, villain = ["Ah", "Kh"], [["Qs", "Qd"]]
+        turn = ["7h", "8h", "9c", "2s"]
+        # Two full passes over the 44 turn runouts give the exact answer
+        cycled = self.calc.calculate_equity(hero, villain, turn, num_simulations=88, exact=False,
+                                            sampling="without_replacement")
+        self.assertAlmostEqual(cycled[0], 100 * 15 / 44)
+
+        calc = EquityCalculator()
+        calc.preflop_table = None
+        spread = {}
+        for strategy in ("random", "quasi"):
+            estimates = [calc.calculate_equity(hero, villain, num_simulations=1000, seed=seed,
+                                               sampling=strategy)[0] for seed in range(40)]
+            self.assertAlmostEqual(statistics.mean(estimates), 46.21, delta=0.6)
+            spread[strategy] = statistics.variance(estimates)
+        self.assertLess(spread["quasi"] * 2, spread["random"])
+        with self.assertRaises(ValueError):
+            self.calc.calculate_equity(hero, villain, sampling="sobol")
 
     def test_invalid_input(self):
         """Test error handling for invalid inputs"""
@@ -101,6 +247,52 @@ class TestEquityCalculator(unittest.TestCase):
         # Test invalid card format
         with self.assertRaises(ValueError):
             self.calc.calculate_equity(["A1", "K2"], villain)  # Invalid card format
+        with self.assertRaises(ValueError):
+            Card.from_str("Ahh")
+
+    def test_calculate_equity_many(self):
+        """A batch answers each request as estimate_equity would, errors included"""
+        requests = [
+            (["As", "Kh"], [["Qs", "Qd"]], ["2c", "7d", "9h"]),
+            (["As", "Kh"], ["QQ+, AK"], ["2c", "7d", "9h", "Jc"]),
+            (["As", "As"], [["Qs", "Qd"]]),
+            (["As", "Kh"], [["Qs", "Qd"]], ["Xx", "7d", "9h"]),
+            (["As", "Kh"], ["AA"], ["Ad", "Ah", "Ac"]),
+            (["As", "Kh"], [["Qs", "Qd"], "QQ+, AK"]),
+        ]
+        results = self.calc.calculate_equity_many(requests, num_simulations=3000, seed=4)
+        self.assertEqual(len(results), len(requests))
+        for request, result in zip(requests, results):
+            try:
+                expected = self.calc.estimate_equity(*request, num_simulations=3000, seed=4)
+            except ValueError as e:
+                self.assertIsInstance(result, ValueError)
+                self.assertEqual(str(result), str(e))
+            else:
+                self.assertEqual(result.equities, expected.equities)
+                self.assertEqual(result.exact, expected.exact)
+        self.assertEqual([isinstance(r, ValueError) for r in results],
+                         [False, False, True, True, True, False])
+        with EquityCalculator() as calc:
+            pooled = calc.calculate_equity_many(requests, num_simulations=3000, seed=4, workers=2)
+        self.assertEqual(pooled[5].equities, results[5].equities)
+
+    def test_calculate_equity_many_malformed(self):
+        """Malformed requests get a ValueError each; the valid ones around them still run"""
+        valid = (["As", "Kh"], [["Qs", "Qd"]], ["2c", "7d", "9h"])
+        malformed = [None, (["As", "Ks"], [None]), (["As", "Ks"],), "AsKs", (["As", 5], ["QQ"]),
+                     ("AsKs", ["QQ"]), (["As", "Ks"], "QQ+"), (["As", "Ks"], ["QQ"], 7),
+                     (["As", "Ks"], [{"Qs", "Qd"}]), (["As", "Ks"], [["Qs", "Qd"]], ["2c", None, "9h"])]
+        requests = [valid]
+        for request in malformed:
+            requests += [request, valid]
+        results = self.calc.calculate_equity_many(requests, num_simulations=1000, seed=4)
+        expected = self.calc.estimate_equity(*valid, num_simulations=1000, seed=4)
+        for request, result in zip(requests, results):
+            if request is valid:
+                self.assertEqual(result.equities, expected.equities)
+            else:
+                self.assertIsInstance(result, ValueError, request)
 
 if __name__ == '__main__':
     unittest.main()
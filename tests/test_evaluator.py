@@ -3,7 +3,8 @@ import os
 import random
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from evaluator.hand import Card, Hand
-from evaluator.evaluator import compare_hands, classify_hand
+from itertools import combinations
+from evaluator.evaluator import compare_hands, classify_hand, best_hand, hand_rank, hand_strength, rank_ids, rank_showdown, _evaluate_5
 
 def generate_shuffled_deck():
     ranks = '23456789TJQKA'
@@ -66,6 +67,129 @@ def test_x_player_showdown(num_players=3):
     assert compare_hands(hands[0], duplicate_hand) == 0, "Identical hands should tie"
     print("Edge case passed: tie confirmed")
 
+def _scan_best_hand(hand):
+    # Reference implementation: score all 21 five-card combinations
+    combo = max(combinations(hand.cards, 5), key=_evaluate_5)
+    return _evaluate_5(combo), list(combo)
+
+def test_table_evaluator_matches_combination_scan():
+    rng = random.Random(7)
+    deck = [Card(r, s) for r in '23456789TJQKA' for s in 'shdc']
+    hands = [Hand(rng.sample(deck, 7)) for _ in range(3000)]
+    for hand in hands:
+        score, combo = _scan_best_hand(hand)
+        table_score, table_combo = best_hand(hand)
+        assert table_score == score, hand
+        assert table_combo.cards == combo, hand
+        assert hand_strength(hand) == score, hand
+    for a, b in zip(hands, hands[1:]):
+        assert (hand_rank(a) > hand_rank(b)) == (hand_strength(a) > hand_strength(b))
+        assert (hand_rank(a) == hand_rank(b)) == (hand_strength(a) == hand_strength(b))
+
+def test_table_evaluator_exhaustive():
+    from itertools import combinations_with_replacement
+    from evaluator.evaluator import rank_tables
+    tables = rank_tables()
+    # A non-flush 5-card score depends only on the ranks; suits cycle so that
+    # no 7 cards sorted by rank hold a flush or two equal cards
+    plain = {ranks: _evaluate_5([Card('23456789TJQKA'[r], 'shdc'[i % 4]) for i, r in enumerate(ranks)])
+             for ranks in combinations_with_replacement(range(13), 5) if len(set(ranks)) >= 2}
+    count = 0
+    for ranks in combinations_with_replacement(range(13), 7):
+        if any(ranks.count(r) > 4 for r in set(ranks)):
+            continue
+        expected = max(plain[five] for five in combinations(ranks, 5))
+        assert tables.scores[rank_ids([4 * r + i % 4 for i, r in enumerate(ranks)])] == expected, ranks
+        count += 1
+    assert count == 49205
+    # Every 5-7 card flush, straight from the flush table
+    flush = {}
+    for size in (5, 6, 7):
+        for ranks in combinations(range(13), size):
+            for five in combinations(ranks, 5):
+                if five not in flush:
+                    flush[five] = _evaluate_5([Card('23456789TJQKA'[r], 's') for r in five])
+            mask = sum(1 << r for r in ranks)
+            expected = max(flush[five] for five in combinations(ranks, 5))
+            assert tables.scores[tables.flush_table[mask]] == expected, ranks
+
+def test_table_evaluator_categories():
+    cases = {
+        "As Ks Qs Js Ts 2d 3c": "Straight Flush",
+        "5h 4h 3h 2h Ah Kd Kc": "Straight Flush",
+        "9s 9h 9d 9c 2s 3h 4d": "Four of a Kind",
+        "9s 9h 9d 2c 2s 3h 4d": "Full House",
+        "As 9s 7s 4s 2s Kd Kc": "Flush",
+        "5d 4h 3s 2c Ah Kd Qc": "Straight",
+        "9s 9h 9d 2c 5s 3h Kd": "Three of a Kind",
+        "9s 9h 2d 2c 5s 3h Kd": "Two Pair",
+        "9s 9h 2d 7c 5s 3h Kd": "One Pair",
+        "9s Th 2d 7c 5s 3h Kd": "High Card",
+    }
+    for cards, label in cases.items():
+        hand = Hand([Card.from_str(c) for c in cards.split()])
+        assert classify_hand(hand) == label, cards
+    # A wheel loses to a six-high straight
+    wheel = Hand([Card.from_str(c) for c in "5d 4h 3s 2c Ah Kd Kc".split()])
+    six_high = Hand([Card.from_str(c) for c in "5d 4h 3s 2c 6h Kd Kc".split()])
+    assert compare_hands(six_high, wheel) == 1
+
+def test_showdown_shares_board_work():
+    rng = random.Random(11)
+    for _ in range(3000):
+        num_players = rng.randint(2, 9)
+        cards = rng.sample(range(52), 5 + 2 * num_players)
+        board, holes = cards[:5], cards[5:]
+        expected = [rank_ids(holes[i:i + 2] + board) for i in range(0, len(holes), 2)]
+        assert rank_showdown(board, holes) == expected
+    # Four-flush board: only hands holding a heart can make a flush
+    board = [Card.from_str(c).id for c in "2h 7h 9h Jh 3c".split()]
+    holes = [Card.from_str(c).id for c in "Ah Kd Qs Qc".split()]
+    assert rank_showdown(board, holes) == [rank_ids(holes[:2] + board), rank_ids(holes[2:] + board)]
+
+def test_table_file():
+    import subprocess
+    import tempfile
+    from evaluator.evaluator import rank_tables
+    from evaluator.tables import TABLE_FILE, load_tables, open_tables, write_tables
+    tables = rank_tables()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, TABLE_FILE)
+        write_tables(tables, path)
+        mapped = open_tables(path)
+        for name in ("rank_table", "flush_table", "flush_suit", "categories"):
+            assert list(getattr(mapped, name)) == list(getattr(tables, name)), name
+        assert [mapped.scores[r] for r in (0, 1, 1000, 7462)] == [tables.scores[r] for r in (0, 1, 1000, 7462)]
+        # A damaged file is refused, then rebuilt by load_tables
+        with open(path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\x7f")
+        try:
+            open_tables(path)
+            assert False, "corrupt table file was opened"
+        except ValueError:
+            pass
+        rebuilt = load_tables(_evaluate_5, directory)
+        assert list(rebuilt.flush_suit) == list(tables.flush_suit)
+        open_tables(path)
+    # Importing the evaluator loads nothing until the first lookup
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("from evaluator import evaluator as e; assert e._TABLES is None; "
+              "e.rank_ids([0, 4, 8, 12, 16, 20, 24]); assert e._TABLES is not None")
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
+
+def test_card_integer_encoding():
+    import pickle
+    assert Card('A', 's') is Card.from_str('As')
+    assert Card.from_int(0) is Card('2', 's') and Card.from_int(51) is Card('A', 'c')
+    assert [Card.from_int(i).id for i in range(52)] == list(range(52))
+    assert repr(Card.from_int(Card('T', 'd').id)) == 'Td'
+    assert pickle.loads(pickle.dumps(Card('K', 'h'))) is Card('K', 'h')
+    hand = Hand([Card.from_str(c) for c in "As Kh 2c".split()])
+    assert list(hand.ids) == [48, 45, 3]
+    assert Hand.from_ids(hand.ids).cards == hand.cards
+    assert bin(hand.mask).count('1') == 3
+
 def test_split_pot_scenario(self):
     hero = ["Ah", "Kh"]
     villain = [["Ah", "Kh"]]  # Same hand
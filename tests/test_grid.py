@@ -0,0 +1,81 @@
+import random
+import unittest
+from equity.equity_calc import EquityCalculator
+from equity.grid import combo_class
+from evaluator.hand import CARD_STRS, Card
+
+
+class TestRangeEquity(unittest.TestCase):
+    def setUp(self):
+        self.calc = EquityCalculator()
+
+    def test_matches_per_holding_enumeration(self):
+        """Every holding's equity equals a separate exact query against the range"""
+        board = ["7h", "8h", "9c", "Kd"]
+        villain = "AA, KhQh, 72o:0.5, T9s"
+        grid = self.calc.range_equity(villain, board, hero_range="22+, AK, KQs, JTs")
+        self.assertTrue(grid.exact)
+        self.assertEqual(grid.trials, 48)
+        for combo, equity in random.Random(1).sample(list(zip(grid.combos, grid.equities)), 12):
+            hand = [CARD_STRS[combo[0]], CARD_STRS[combo[1]]]
+            expected = self.calc.estimate_equity(hand, [villain], board, exact=True).equities[0]
+            self.assertAlmostEqual(equity, expected)
+
+    def test_suit_symmetric_board(self):
+        """A monotone flop ranks one runout per orbit; each holding still matches its own query"""
+        board = ["2s", "7s", "9s"]
+        villain = "QQ+, AK, 76s"
+        grid = self.calc.range_equity(villain, board, buckets=4)
+        self.assertTrue(grid.exact)
+        self.assertEqual(grid.trials, 1176)
+        for hand in (["As", "Kd"], ["Ah", "Kd"], ["Qh", "Jc"], ["8h", "8d"], ["Ts", "Th"]):
+            expected = self.calc.estimate_equity(hand, [villain], board, exact=True, buckets=4)
+            self.assertAlmostEqual(grid.equity(hand), expected.equities[0])
+            a, b = (Card.from_str(c).id for c in hand)
+            distribution = grid.distributions[grid.combos.index((min(a, b), max(a, b)))]
+            for got, want in zip(distribution.categories, expected.distributions[0].categories):
+                self.assertAlmostEqual(got, want)
+            self.assertAlmostEqual(sum(distribution.equity), 1.0)
+
+    def test_simulation_agrees_with_enumeration(self):
+        board = ["2c", "3h", "8d", "Jd"]
+        exact = self.calc.range_equity("QQ+, AK, JTs", board, exact=True)
+        sampled = self.calc.range_equity("QQ+, AK, JTs", board, exact=False, num_simulations=600, seed=3)
+        self.assertFalse(sampled.exact)
+        self.assertEqual(sampled.combos, exact.combos)
+        misses = sum(abs(s - e) > 4 * err + 1e-9
+                     for s, e, err in zip(sampled.equities, exact.equities, sampled.stderr))
+        self.assertLess(misses, len(exact) * 0.01)
+
+    def test_classes_and_matrix(self):
+        grid = self.calc.range_equity(["As", "Ad"], ["2c", "3h", "8d", "Jd", "4s"])
+        # Every holding but the ones using an ace of spades or diamonds
+        self.assertEqual(len(grid), 1081 - 1 - 2 * 45)
+        self.assertEqual(grid.equity(["Ah", "Ac"]), 50.0)
+        self.assertEqual(grid.equity(["5h", "6h"]), 100.0)
+        with self.assertRaises(KeyError):
+            grid.equity(["As", "Kd"])
+        classes = grid.by_class()
+        self.assertEqual(len(classes), 169)
+        self.assertEqual(classes["AA"], 50.0)
+        matrix = grid.matrix()
+        self.assertEqual(len(matrix), 13)
+        self.assertEqual(matrix[0][0], classes["AA"])
+        self.assertEqual(matrix[0][1], classes["AKs"])
+        self.assertEqual(matrix[1][0], classes["AKo"])
+        self.assertEqual(combo_class((48, 44)), "AKs")
+        self.assertEqual(combo_class((0, 5)), "32o")
+
+    def test_invalid_inputs(self):
+        with self.assertRaises(ValueError):
+            self.calc.range_equity("QQ+", ["As", "As", "2c"])
+        with self.assertRaises(ValueError):
+            self.calc.range_equity("QQ+", ["As", "Kd"])
+        with self.assertRaises(ValueError):
+            self.calc.range_equity("XYZ")
+        with self.assertRaises(ValueError):
+            self.calc.range_equity("AsAh", ["As", "2c", "3d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
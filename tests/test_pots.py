@@ -0,0 +1,81 @@
+import random
+import unittest
+from equity.equity_calc import EquityCalculator
+from equity.pots import SidePots
+
+
+def settle_by_pot(contributions, ranks):
+    """Reference: every pot to the best hands among the players who matched it."""
+    chips = [0.0] * len(ranks)
+    levels = sorted(set(c for c in contributions if c > 0))
+    previous = 0
+    for level in levels:
+        eligible = [p for p, c in enumerate(contributions) if c >= level]
+        best = max(ranks[p] for p in eligible)
+        winners = [p for p in eligible if ranks[p] == best]
+        for p in winners:
+            chips[p] += (level - previous) * len(eligible) / len(winners)
+        previous = level
+    return chips
+
+
+class TestSidePots(unittest.TestCase):
+    def test_pots(self):
+        pots = SidePots([100, 300, 300, 50])
+        self.assertEqual(pots.total, 750)
+        self.assertEqual([(round(f * 750), e) for f, e in pots.pots],
+                         [(200, (0, 1, 2, 3)), (150, (0, 1, 2)), (400, (1, 2))])
+        self.assertEqual(pots.covers, [False, True, True, False])
+        with self.assertRaises(ValueError):
+            SidePots([100, -1])
+        with self.assertRaises(ValueError):
+            SidePots([0, 0])
+
+    def test_split_matches_pot_by_pot(self):
+        rng = random.Random(3)
+        for _ in range(3000):
+            players = rng.randint(2, 9)
+            contributions = [rng.choice([0, 50, 100, 100, 250, 400]) for _ in range(players)]
+            if not any(contributions):
+                continue
+            pots = SidePots(contributions)
+            ranks = [rng.randint(1, 5) for _ in range(players)]
+            expected = settle_by_pot(contributions, ranks)
+            chips = [0.0] * players
+            for player, share in pots.split(ranks):
+                chips[player] += share * pots.total
+            for got, want in zip(chips, expected):
+                self.assertAlmostEqual(got, want)
+
+    def test_river_all_in(self):
+        """Short-stacked best hand wins the main pot; the side pot goes to the next best"""
+        calc = EquityCalculator()
+        board = ["2c", "3h", "8d", "Jd", "4s"]
+        result = calc.estimate_equity(["As", "Ad"], [["Ks", "Kd"], ["Qs", "Qd"]], board,
+                                      contributions=[100, 300, 250])
+        self.assertTrue(result.exact)
+        self.assertEqual(result.chips, [300.0, 350.0, 0.0])
+        self.assertAlmostEqual(sum(result.equities), 100)
+
+    def test_chips_agree_across_methods(self):
+        hero, villains, board = ["As", "Ad"], [["Ks", "Kd"], ["Qs", "Qd"], ["7c", "2h"]], ["2c", "3h", "8d"]
+        contributions = [100, 300, 300, 50]
+        calc = EquityCalculator()
+        exact = calc.estimate_equity(hero, villains, board, contributions=contributions, exact=True)
+        self.assertAlmostEqual(sum(exact.chips), 750)
+        sampled = calc.estimate_equity(hero, villains, board, contributions=contributions,
+                                       num_simulations=20000, seed=5, exact=False)
+        for got, want, err in zip(sampled.equities, exact.equities, sampled.stderr):
+            self.assertLess(abs(got - want), 4 * err + 1e-9)
+        # Equal stacks are a single pot
+        plain = calc.estimate_equity(hero, villains, board, exact=True)
+        even = calc.estimate_equity(hero, villains, board, contributions=[20] * 4, exact=True)
+        for got, want in zip(even.equities, plain.equities):
+            self.assertAlmostEqual(got, want)
+        self.assertAlmostEqual(even.chips[0], plain.equities[0] / 100 * 80)
+        with self.assertRaises(ValueError):
+            calc.estimate_equity(hero, villains, board, contributions=[100, 100])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from equity.equity_calc import EquityCalculator
+from equity.preflop import (BOARDS_PER_MATCHUP, PreflopTable, build_preflop_table,
+                            canonical_matchup, canonical_matchups)
+from equity.ranges import HandRange
+from evaluator.hand import Card
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def ids(cards):
+    return [Card.from_str(c).id for c in cards]
+
+
+class TestCanonicalMatchups(unittest.TestCase):
+    def test_matchup_count(self):
+        """1326 x 1225 ordered matchups collapse to 93,769 under suit relabelling"""
+        matchups = canonical_matchups()
+        self.assertEqual(len(matchups), 93769)
+        self.assertIn(canonical_matchup(ids(["Ad", "Ac"]), ids(["Kh", "Ks"])), set(matchups))
+
+    def test_isomorphic_matchups(self):
+        self.assertEqual(canonical_matchup(ids(["As", "Ac"]), ids(["Ks", "Kc"])),
+                         canonical_matchup(ids(["Ah", "Ad"]), ids(["Kd", "Kh"])))
+        self.assertNotEqual(canonical_matchup(ids(["As", "Ac"]), ids(["Ks", "Kc"])),
+                            canonical_matchup(ids(["As", "Ac"]), ids(["Kh", "Kd"])))
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestPreflopTable(unittest.TestCase):
+    def test_build_and_lookup(self):
+        aces_kings = canonical_matchup(ids(["As", "Ac"]), ids(["Ks", "Kc"]))
+        kings_aces = canonical_matchup(ids(["Ks", "Kc"]), ids(["As", "Ac"]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "preflop.bin")
+            self.assertEqual(build_preflop_table(path, matchups=[aces_kings, kings_aces]), 2)
+            table = PreflopTable(path)
+            wins, ties, boards = table.lookup(ids(["Ah", "Ad"]), ids(["Kh", "Kd"]))
+            self.assertEqual(boards, BOARDS_PER_MATCHUP)
+            self.assertEqual((wins, ties), (1410336, 9308))
+            self.assertEqual(table.lookup(ids(["Kh", "Kd"]), ids(["Ah", "Ad"])),
+                             (boards - wins - ties, ties, boards))
+            self.assertIsNone(table.lookup(ids(["As", "Ks"]), ids(["Qh", "Qd"])))
+
+            calc = EquityCalculator(preflop_table=table)
+            result = calc.estimate_equity(["Ah", "Ad"], [["Kh", "Kd"]])
+            self.assertTrue(result.exact)
+            self.assertAlmostEqual(result.equities[0], 100 * (wins + ties / 2) / boards)
+            # Multiway and sampling-only requests bypass the table
+            self.assertFalse(calc.estimate_equity(["Ah", "Ad"], [["Kh", "Kd"]], exact=False,
+                                                  num_simulations=100).exact)
+
+    def test_class_equity(self):
+        matchups = {canonical_matchup(list(a), list(b))
+                    for a in HandRange.parse("AA").combos for b in HandRange.parse("KK").combos}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "preflop.bin")
+            build_preflop_table(path, matchups=matchups)
+            table = PreflopTable(path)
+            self.assertAlmostEqual(table.class_equity("AA", "KK"), 81.95, places=2)
+            self.assertIsNone(table.class_equity("KK", "AA"))
+
+    def test_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bogus.bin")
+            with open(path, "wb") as f:
+                f.write(b"not a table at all")
+            with self.assertRaises(ValueError):
+                PreflopTable(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+from equity.equity_calc import EquityCalculator
+from equity.ranges import HandRange
+from evaluator.hand import Card
+
+
+class TestHandRange(unittest.TestCase):
+    def test_combo_counts(self):
+        """Standard notation expands to the usual combo counts"""
+        self.assertEqual(len(HandRange.parse("AA")), 6)
+        self.assertEqual(len(HandRange.parse("AKs")), 4)
+        self.assertEqual(len(HandRange.parse("AKo")), 12)
+        self.assertEqual(len(HandRange.parse("AK")), 16)
+        self.assertEqual(len(HandRange.parse("QQ+")), 18)
+        self.assertEqual(len(HandRange.parse("JJ-88")), 24)
+        self.assertEqual(len(HandRange.parse("ATs+")), 16)
+        self.assertEqual(len(HandRange.parse("76s-54s")), 12)
+        self.assertEqual(len(HandRange.parse("A5s-A2s")), 16)
+        self.assertEqual(len(HandRange.parse("QQ+, AKs, 76s-54s")), 34)
+        self.assertEqual(len(HandRange.parse("AhKh")), 1)
+
+    def test_weights(self):
+        """A later token overrides the weight of an earlier one"""
+        hand_range = HandRange.parse("AK, AKs:0.25")
+        suited = (Card('K', 's').id, Card('A', 's').id)
+        offsuit = (Card('K', 'h').id, Card('A', 's').id)
+        self.assertEqual(hand_range.combos[suited], 0.25)
+        self.assertEqual(hand_range.combos[offsuit], 1.0)
+        self.assertEqual(len(HandRange.parse("AK, AKs:0")), 12)
+
+    def test_invalid_notation(self):
+        for text in ("", "AAs", "AX", "AKs-QJo", "AKs:x", "AsAs", "QQ+-99"):
+            with self.assertRaises(ValueError):
+                HandRange.parse(text)
+
+    def test_card_removal(self):
+        """Compiling drops combos that use a dead card"""
+        dead = Card('A', 's').mask | Card('K', 'h').mask
+        compiled = HandRange.parse("AA, AK").compile(dead)
+        self.assertEqual(len(compiled), 3 + 9)
+        self.assertAlmostEqual(compiled.available_weight([Card('A', 'h').id]), 12 - 2 - 3)
+
+    def test_sampling_respects_dealt_cards(self):
+        """Samples avoid the dealt cards and follow the available weights"""
+        compiled = HandRange.parse("AA, KK:0.5").compile(0)
+        dealt = [Card('A', 's').id, Card('A', 'h').id, Card('K', 's').id]
+        dealt_mask = sum(Card.from_int(i).mask for i in dealt)
+        rng = random.Random(1)
+        counts = {"AA": 0, "KK": 0}
+        for _ in range(4000):
+            index, share = compiled.sample(rng, dealt, dealt_mask)
+            self.assertFalse(compiled.masks[index] & dealt_mask)
+            self.assertAlmostEqual(share, (1 + 0.5 * 3) / 9)
+            counts["AA" if compiled.combos[index][0] >= 48 else "KK"] += 1
+        # 1 AA combo at weight 1 against 3 KK combos at weight 0.5
+        self.assertAlmostEqual(counts["AA"] / 4000, 1 / 2.5, delta=0.03)
+
+
+class TestRangeEquity(unittest.TestCase):
+    def setUp(self):
+        self.calc = EquityCalculator()
+
+    def test_single_combo_range_matches_exact_hand(self):
+        board = ["7h", "8h", "9c"]
+        exact_hand = self.calc.calculate_equity(["Ah", "Kh"], [["Qs", "Qd"]], board)
+        one_combo = self.calc.calculate_equity(["Ah", "Kh"], ["QsQd"], board)
+        self.assertEqual(exact_hand, one_combo)
+
+    def test_multiway_ranges_sampling_matches_enumeration(self):
+        """Weighted sampling with card removal converges on the exact answer"""
+        args = (["As", "Ks"], ["AA, KK", "AA, KK, AK:0.5"], ["Qs", "Js", "2d", "3c"])
+        exact = self.calc.calculate_equity(*args, exact=True)
+        sampled = self.calc.calculate_equity(*args, exact=False, num_simulations=20000, seed=5)
+        for e, s in zip(exact, sampled):
+            self.assertAlmostEqual(e, s, delta=1.5)
+
+    def test_range_with_no_holdings_left(self):
+        with self.assertRaises(ValueError):
+            self.calc.calculate_equity(["As", "Ah"], ["AdAc", "AA"])
+        with self.assertRaises(ValueError):
+            self.calc.calculate_equity(["As", "Ah"], ["AsKs"])
+
+
+if __name__ == '__main__':
+    unittest.main()
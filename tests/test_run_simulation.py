@@ -0,0 +1,45 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from examples.run_simulation import main, parse_records, read_records
+
+
+class TestRunSimulation(unittest.TestCase):
+    def test_streams_records_to_results(self):
+        lines = [
+            {"id": "a", "hero": ["As", "Kh"], "villains": [["Qs", "Qd"]],
+             "board": ["7h", "8h", "9c", "2d", "3s"], "allin": "flop"},
+            {"id": "b", "hero": "5h 4c", "villains": "5d 4s", "board": "2s 3h 7d Jc Ad"},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "hands.jsonl")
+            target = os.path.join(directory, "scored.jsonl")
+            with open(source, "w") as f:
+                f.write("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+            main([source, "-o", target, "--batch-size", "2", "--report-every", "0"])
+            with open(target) as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual([r["id"] for r in results], ["a", "b", "3"])
+        self.assertEqual(results[0]["winners"], [1])
+        self.assertEqual(results[0]["hands"], ["High Card", "One Pair"])
+        self.assertAlmostEqual(results[0]["equity"][0], 100 * 32 / 110, places=3)
+        self.assertTrue(results[0]["exact"])
+        self.assertEqual(results[1]["winners"], [0, 1])
+        self.assertIn("error", results[2])
+
+    def test_csv_rows(self):
+        text = "id,hero,villains,board,allin\nx,Ah Kh,Qs Qd|Jc Tc,7h 8h 9c,\ny,Ah Kh,Ah Qd,2c 3c 4c,\nz,Ah Kh,Qs Qd,7h 8h 9c,river\n"
+        parsed = list(parse_records(read_records(io.StringIO(text), "csv"), default_allin="flop"))
+        record, error = parsed[0]
+        self.assertIsNone(error)
+        self.assertEqual(record.villains, [["Qs", "Qd"], ["Jc", "Tc"]])
+        self.assertEqual(record.allin, "flop")
+        self.assertEqual(parsed[1], ("2", "Duplicate cards detected"))
+        # An all-in street the board has not reached yet
+        self.assertEqual(parsed[2], ("3", "Board has 3 cards, too few for an all-in on the river"))
+
+
+if __name__ == '__main__':
+    unittest.main()
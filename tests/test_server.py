@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from equity.cache import EquityCache
+from equity.equity_calc import CHUNK_SIZES
+from equity.preflop import PreflopTable, build_preflop_table, canonical_matchup
+from equity.server import EquityServer, _init_worker, _solve_batch, request_equity
+from evaluator.hand import Card
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+async def exchange(port, requests):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    replies = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    return {reply["id"]: reply for reply in replies}
+
+
+class TestEquityServer(unittest.TestCase):
+    def setUp(self):
+        self.server = EquityServer(workers=1, batch_window=0.01)
+
+    def tearDown(self):
+        self.server.close()
+
+    def run_with_server(self, requests):
+        async def scenario():
+            listener = await self.server.start_tcp()
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                return await exchange(port, requests)
+        return asyncio.run(scenario())
+
+    def test_batched_and_deduplicated(self):
+        flop = {"hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"]], "board": ["7h", "8h", "9c"]}
+        # A suit relabelling of the first query, with villains swapped
+        multi = {"hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"], ["Jc", "Tc"]], "board": ["7h", "8h", "9c"]}
+        relabelled = {"hero": ["As", "Ks"], "villains": [["Td", "Jd"], ["Qh", "Qc"]], "board": ["9d", "8s", "7s"]}
+        replies = self.run_with_server([
+            dict(flop, id=1), dict(multi, id=2), dict(relabelled, id=3),
+            {"id": 4, "hero": ["Ah", "Ah"], "villains": [["Qs", "Qd"]]},
+            {"id": 5, "op": "stats"},
+        ])
+        self.assertAlmostEqual(replies[1]["equities"][0], 100 * 545 / 990)
+        self.assertTrue(replies[1]["exact"])
+        a, b = replies[2]["equities"], replies[3]["equities"]
+        self.assertEqual(b, [a[0], a[2], a[1]])
+        self.assertIn("error", replies[4])
+        self.assertEqual(self.server.stats["deduplicated"], 1)
+        self.assertLessEqual(self.server.stats["batches"], 2)
+
+    def test_deadline_returns_partial_simulation(self):
+        replies = self.run_with_server([
+            {"id": "late", "hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"], ["Jc", "Tc"]],
+             "num_simulations": 10 ** 7, "deadline_ms": 0, "seed": 1},
+        ])
+        reply = replies["late"]
+        self.assertFalse(reply["exact"])
+        self.assertLess(reply["trials"], 10 ** 7)
+        self.assertGreater(max(reply["stderr"]), 0)
+
+    def test_deadline_is_absolute(self):
+        """A job whose deadline passed while it was queued runs a single chunk"""
+        _init_worker("python", 20000)
+        options = {"num_simulations": 10 ** 6, "seed": 1}
+        [(status, value)] = _solve_batch([(["Ah", "Kh"], [["Qs", "Qd"]], None, options, time.monotonic() - 1)])
+        self.assertEqual(status, "ok")
+        self.assertEqual(value[2], CHUNK_SIZES["python"])
+        self.assertTrue(value[4])
+
+    def test_deadline_requests_are_not_shared_or_cached(self):
+        spot = {"hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"], ["Jc", "Tc"]], "seed": 1,
+                "num_simulations": 3 * CHUNK_SIZES["python"]}
+        replies = self.run_with_server([dict(spot, id="late", deadline_ms=0), dict(spot, id="full")])
+        self.assertEqual(replies["late"]["trials"], CHUNK_SIZES["python"])
+        self.assertEqual(replies["full"]["trials"], 3 * CHUNK_SIZES["python"])
+        self.assertEqual(self.server.stats["deduplicated"], 0)
+        # A result cut short is not cached, though its trials would satisfy this
+        self.server.calc.cache = EquityCache()
+        self.run_with_server([dict(spot, id="late", deadline_ms=0)])
+        replies = self.run_with_server([dict(spot, id="small", num_simulations=CHUNK_SIZES["python"])])
+        self.assertEqual(self.server.stats["cache_hits"], 0)
+        self.assertEqual(replies["small"]["trials"], CHUNK_SIZES["python"])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_preflop_hits_counted_apart_from_cache_hits(self):
+        aces_kings = canonical_matchup([Card.from_str(c).id for c in ("As", "Ac")],
+                                       [Card.from_str(c).id for c in ("Ks", "Kc")])
+        flop = {"hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"]], "board": ["7h", "8h", "9c"]}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "preflop.bin")
+            build_preflop_table(path, matchups=[aces_kings])
+            self.server.calc.preflop_table = PreflopTable(path)
+            replies = self.run_with_server([{"id": 1, "hero": ["Ah", "Ad"], "villains": [["Kh", "Kd"]]},
+                                            dict(flop, id=2)])
+            self.assertTrue(replies[1]["exact"])
+            self.run_with_server([dict(flop, id=3)])
+        self.assertEqual(self.server.stats["preflop_hits"], 1)
+        self.assertEqual(self.server.stats["cache_hits"], 1)
+
+    def test_unix_socket_client(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "equity.sock")
+            loop = asyncio.new_event_loop()
+            listener = loop.run_until_complete(self.server.start_unix(path))
+            thread = threading.Thread(target=loop.run_forever, daemon=True)
+            thread.start()
+            try:
+                reply = request_equity({"id": 9, "hero": ["Ah", "Kh"], "villains": [["Qs", "Qd"]],
+                                        "board": ["7h", "8h", "9c", "2s", "3s"]}, path=path, timeout=30)
+            finally:
+                # Let the connection handler see the client hang up before stopping
+                asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), loop).result()
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                listener.close()
+                loop.close()
+        self.assertEqual(reply["id"], 9)
+        self.assertEqual(reply["equities"], [0.0, 100.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from equity.equity_calc import EquityCalculator
+from equity.session import EquitySession
+
+
+class TestEquitySession(unittest.TestCase):
+    def setUp(self):
+        self.calc = EquityCalculator()
+
+    def test_streets_match_calculator(self):
+        """Each street agrees exactly with a fresh calculate_equity call"""
+        hero, villains = ["Ah", "Kh"], [["Qs", "Qd"], "JJ, T9s"]
+        session = EquitySession(hero, villains, calculator=self.calc, seed=7)
+        for cards in (["7h", "8h", "9c"], ["2d"], ["Ts"]):
+            session.add_board_cards(cards)
+            expected = self.calc.estimate_equity(hero, villains, board=session.board)
+            result = session.result()
+            self.assertTrue(result.exact)
+            self.assertEqual(result.trials, expected.trials)
+            for got, want in zip(result.equities, expected.equities):
+                self.assertAlmostEqual(got, want)
+
+    def test_later_streets_filter_flop_runouts(self):
+        session = EquitySession(["Ah", "Kh"], [["Qs", "Qd"]], board=["7h", "8h", "9c"],
+                                calculator=self.calc)
+        self.assertEqual(session.result().trials, 990)
+        session.add_board_cards(["2s"])
+        self.assertEqual(len(session._runouts), 44)
+        self.assertEqual(session.result().trials, 44)
+        session.add_board_cards(["3s"])
+        self.assertEqual(session.equities(), [0.0, 100.0])
+
+    def test_sampled_trials_accumulate(self):
+        session = EquitySession(["Ah", "Kh"], [["Qs", "Qd"], ["Jc", "Tc"]], calculator=self.calc, seed=3)
+        first = session.result(num_simulations=3000)
+        self.assertFalse(first.exact)
+        self.assertEqual(session.result(num_simulations=2000), first)
+        self.assertEqual(session.result(num_simulations=5000).trials, 5000)
+        self.assertLessEqual(max(session.result(target_stderr=0.5).stderr), 0.5)
+
+    def test_invalid_board_cards(self):
+        session = EquitySession(["Ah", "Kh"], [["Qs", "Qd"]], calculator=self.calc)
+        with self.assertRaises(ValueError):
+            session.add_board_cards(["7h", "8h"])
+        with self.assertRaises(ValueError):
+            session.add_board_cards(["7h", "8h", "Qs"])
+        with self.assertRaises(ValueError):
+            session.add_board_cards(["7h", "8h", "Xx"])
+        session.add_board_cards(["7h", "8h", "9c"])
+        with self.assertRaises(ValueError):
+            session.add_board_cards(["9c"])
+
+
+if __name__ == '__main__':
+    unittest.main()